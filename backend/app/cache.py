@@ -0,0 +1,185 @@
+"""
+Read-through cache for hot lookups (business profiles, latest analysis)
+In-process TTL LRU with an optional shared Redis tier (REDIS_URL)
+"""
+import asyncio
+import copy
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Awaitable, Callable, Tuple
+from app.config import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - optional dependency
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """LRU of (entity, key) -> value with a per-entry expiry"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, cache_key: Tuple[str, str]) -> Tuple[bool, Any]:
+        entry = self._entries.get(cache_key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[cache_key]
+            return False, None
+        self._entries.move_to_end(cache_key)
+        return True, value
+
+    def set(self, cache_key: Tuple[str, str], value: Any):
+        self._entries[cache_key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, cache_key: Tuple[str, str]):
+        self._entries.pop(cache_key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class ReadThroughCache:
+    """Local LRU -> Redis (optional) -> loader.
+
+    Concurrent misses for the same key share one load, and callers get their
+    own copy of the value. Missing rows (None) are not cached. Redis errors
+    are treated as misses and pause the Redis tier briefly, so the database
+    stays the source of truth. Local entries expire quickly because other
+    workers only see invalidations through Redis.
+    """
+
+    REDIS_RETRY_SECONDS = 30.0
+
+    def __init__(self, max_entries: int, local_ttl: float, redis_ttl: int, redis_url: str = ""):
+        self.local = TTLCache(max_entries, local_ttl)
+        self.redis_ttl = redis_ttl
+        self.redis_url = redis_url if aioredis is not None else ""
+        self._redis = None
+        self._redis_down_until = 0.0
+        # In-flight loads; invalidate() drops the entry so a load that raced a write is not cached
+        self._loading: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def get_redis(self):
+        """Shared Redis client, or None when Redis is not configured or backing off"""
+        if not self.redis_url or time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is None:
+            self._redis = aioredis.from_url(self.redis_url, socket_timeout=1, socket_connect_timeout=1)
+        return self._redis
+
+    def redis_failed(self, action: str, error: Exception):
+        logger.warning(f"Redis cache {action} failed, using local cache only for {self.REDIS_RETRY_SECONDS:.0f}s: {str(error)}")
+        self._redis_down_until = time.monotonic() + self.REDIS_RETRY_SECONDS
+
+    @staticmethod
+    def _redis_key(entity: str, key: str) -> str:
+        return f"sfc:cache:{entity}:{key}"
+
+    def _count(self, entity: str, outcome: str):
+        stats = self._stats.setdefault(entity, {"local_hits": 0, "redis_hits": 0, "misses": 0, "invalidations": 0})
+        stats[outcome] += 1
+
+    async def get_or_load(self, entity: str, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached value of (entity, key), calling `loader` on a miss"""
+        cache_key = (entity, key)
+        found, value = self.local.get(cache_key)
+        if found:
+            self._count(entity, "local_hits")
+            return copy.deepcopy(value)
+
+        pending = self._loading.get(cache_key)
+        if pending is not None:
+            self._count(entity, "local_hits")
+            return copy.deepcopy(await asyncio.shield(pending))
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[cache_key] = future
+        try:
+            value, source = await self._load(entity, key, loader)
+            self._count(entity, source)
+            if value is not None and self._loading.get(cache_key) is future:
+                self.local.set(cache_key, value)
+                if source == "misses":
+                    await self._store_redis(entity, key, value)
+            future.set_result(value)
+            return copy.deepcopy(value)
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so waiter-less failures are not logged as unhandled
+            future.exception()
+            raise
+        finally:
+            if self._loading.get(cache_key) is future:
+                del self._loading[cache_key]
+
+    async def _load(self, entity: str, key: str, loader: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+        client = self.get_redis()
+        if client is not None:
+            try:
+                cached = await client.get(self._redis_key(entity, key))
+                if cached is not None:
+                    return json.loads(cached), "redis_hits"
+            except Exception as e:
+                self.redis_failed("read", e)
+        return await loader(), "misses"
+
+    async def _store_redis(self, entity: str, key: str, value: Any):
+        client = self.get_redis()
+        if client is not None:
+            try:
+                await client.set(self._redis_key(entity, key), json.dumps(value, default=str), ex=self.redis_ttl)
+            except Exception as e:
+                self.redis_failed("write", e)
+
+    async def invalidate(self, entity: str, key: str):
+        """Drop (entity, key) from both tiers after a write"""
+        cache_key = (entity, key)
+        self.local.delete(cache_key)
+        self._loading.pop(cache_key, None)
+        self._count(entity, "invalidations")
+        client = self.get_redis()
+        if client is not None:
+            try:
+                await client.delete(self._redis_key(entity, key))
+            except Exception as e:
+                self.redis_failed("invalidation", e)
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Per-entity hit rates"""
+        entities = {}
+        for entity, stats in self._stats.items():
+            lookups = stats["local_hits"] + stats["redis_hits"] + stats["misses"]
+            entities[entity] = {
+                **stats,
+                "hit_rate": (stats["local_hits"] + stats["redis_hits"]) / lookups if lookups else 0.0
+            }
+        return {
+            "redis_enabled": bool(self.redis_url),
+            "local_entries": len(self.local),
+            "entities": entities
+        }
+
+# Singleton instance
+cache = ReadThroughCache(
+    max_entries=settings.CACHE_MAX_ENTRIES,
+    local_ttl=settings.CACHE_LOCAL_TTL_SECONDS,
+    redis_ttl=settings.CACHE_REDIS_TTL_SECONDS,
+    redis_url=settings.REDIS_URL
+)
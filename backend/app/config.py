@@ -30,21 +30,72 @@ class Settings(BaseSettings):
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
     SUPABASE_SERVICE_KEY: str = os.getenv("SUPABASE_SERVICE_KEY", "")
-    DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "")  # direct Postgres; Supabase client is used when empty
+    DB_POOL_MIN_SIZE: int = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+    DB_POOL_MAX_SIZE: int = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+    DB_COMMAND_TIMEOUT: float = float(os.getenv("DB_COMMAND_TIMEOUT", "30"))  # seconds
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))  # 0 behind PgBouncer transaction pooling
+    WRITE_BEHIND_BATCH_SIZE: int = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "50"))
+    WRITE_BEHIND_FLUSH_INTERVAL: float = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.1"))  # seconds
+    WRITE_BEHIND_MAX_RETRIES: int = int(os.getenv("WRITE_BEHIND_MAX_RETRIES", "3"))
+    PAGE_SIZE_DEFAULT: int = 20  # list endpoints (keyset pagination)
+    PAGE_SIZE_MAX: int = 100
     
     # OpenRouter API (for LLM)
     OPENROUTER_API_KEY: str = os.getenv("OPENROUTER_API_KEY", "")
     OPENROUTER_BASE_URL: str = "https://openrouter.ai/api/v1"
     DEFAULT_MODEL: str = "openai/gpt-4-turbo-preview"  # or "anthropic/claude-3-opus"
     FALLBACK_MODEL: str = "openai/gpt-3.5-turbo"
-    
+
+    # LLM admission control (OpenRouter rate limits)
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    LLM_MAX_CONCURRENCY_PER_MODEL: int = int(os.getenv("LLM_MAX_CONCURRENCY_PER_MODEL", "4"))
+    LLM_REQUESTS_PER_MINUTE: int = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+    LLM_TOKENS_PER_MINUTE: int = int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+    LLM_QUEUE_TIMEOUT: float = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    LLM_RETRY_BASE_DELAY: float = 1.0  # seconds, doubled per attempt
+    LLM_RETRY_MAX_DELAY: float = 30.0
+
+    # LLM request hedging (race FALLBACK_MODEL against a slow primary)
+    LLM_HEDGING_ENABLED: bool = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_PERCENTILE: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+    LLM_HEDGE_MIN_DELAY: float = float(os.getenv("LLM_HEDGE_MIN_DELAY", "2"))  # seconds
+    LLM_HEDGE_DEFAULT_DELAY: float = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "15"))  # until p95 is known
+    LLM_HEDGE_BUDGET_RATIO: float = float(os.getenv("LLM_HEDGE_BUDGET_RATIO", "0.1"))  # max share of hedged requests
+
+    # LLM circuit breaker and adaptive timeouts
+    LLM_BREAKER_WINDOW: int = 50  # calls in the rolling window
+    LLM_BREAKER_MIN_CALLS: int = 10
+    LLM_BREAKER_FAILURE_RATE: float = float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5"))
+    LLM_BREAKER_SLOW_CALL_SECONDS: float = float(os.getenv("LLM_BREAKER_SLOW_CALL_SECONDS", "30"))
+    LLM_BREAKER_SLOW_CALL_RATE: float = 0.8
+    LLM_BREAKER_OPEN_SECONDS: float = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))
+    LLM_TIMEOUT_MIN: float = 10.0  # seconds
+    LLM_TIMEOUT_MAX: float = 60.0
+    LLM_TIMEOUT_MULTIPLIER: float = 2.0  # read timeout = p99 latency x multiplier
+
+    # Prompt token budgets (estimated locally)
+    LLM_PROMPT_TOKEN_BUDGET: int = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "3000"))
+    LLM_CHAT_TOKEN_BUDGET: int = int(os.getenv("LLM_CHAT_TOKEN_BUDGET", "1500"))
+    LLM_FORECAST_DATA_TOKEN_BUDGET: int = 400  # historical table inside the forecast prompt
+
     # Banking APIs
     PLAID_CLIENT_ID: str = os.getenv("PLAID_CLIENT_ID", "")
     PLAID_SECRET: str = os.getenv("PLAID_SECRET", "")
     PLAID_ENV: str = os.getenv("PLAID_ENV", "sandbox")  # sandbox, development, production
+    PLAID_BASE_URL: str = os.getenv("PLAID_BASE_URL", "")  # overrides PLAID_ENV, e.g. a local mock server
+    PLAID_WEBHOOK_URL: str = os.getenv("PLAID_WEBHOOK_URL", "")  # public URL of /api/banking/webhooks/plaid
     
     RAZORPAY_KEY_ID: str = os.getenv("RAZORPAY_KEY_ID", "")
     RAZORPAY_KEY_SECRET: str = os.getenv("RAZORPAY_KEY_SECRET", "")
+    RAZORPAY_WEBHOOK_SECRET: str = os.getenv("RAZORPAY_WEBHOOK_SECRET", "")
+    BANKING_SYNC_MAX_AGE_SECONDS: int = int(os.getenv("BANKING_SYNC_MAX_AGE_SECONDS", "900"))  # transactions older than this trigger a provider sync on read
+    BANKING_SYNC_TIMEOUT_SECONDS: float = float(os.getenv("BANKING_SYNC_TIMEOUT_SECONDS", "20"))  # per-connection wait when refreshing several accounts
+    BANKING_WEBHOOK_DEBOUNCE_SECONDS: float = float(os.getenv("BANKING_WEBHOOK_DEBOUNCE_SECONDS", "2"))  # webhook bursts per connection within this window share one sync
+    BANKING_SYNC_WORKERS: int = int(os.getenv("BANKING_SYNC_WORKERS", "2"))  # webhook-triggered syncs run at once
+    BANKING_PAGE_CONCURRENCY: int = int(os.getenv("BANKING_PAGE_CONCURRENCY", "4"))  # statement pages fetched at once
+    BANKING_PARTITION_MONTHS_AHEAD: int = int(os.getenv("BANKING_PARTITION_MONTHS_AHEAD", "3"))  # monthly transaction partitions kept ahead
     
     # GST API (optional)
     GST_API_KEY: str = os.getenv("GST_API_KEY", "")
@@ -57,10 +108,21 @@ class Settings(BaseSettings):
     
     # Redis (for caching - optional)
     REDIS_URL: str = os.getenv("REDIS_URL", "")
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "1000"))
+    CACHE_LOCAL_TTL_SECONDS: float = float(os.getenv("CACHE_LOCAL_TTL_SECONDS", "30"))  # short: other workers invalidate via Redis only
+    CACHE_REDIS_TTL_SECONDS: int = int(os.getenv("CACHE_REDIS_TTL_SECONDS", "300"))
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "3600"))  # how long a key replays its response
+    IDEMPOTENCY_WAIT_SECONDS: int = int(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "180"))  # max wait on another worker's in-flight request
     
     # Supported Languages
     SUPPORTED_LANGUAGES: List[str] = ["en", "hi", "te", "ta", "kn", "mr", "gu", "bn"]
     DEFAULT_LANGUAGE: str = "en"
+    TRANSLATION_BATCH_MAX_TOKENS: int = 600  # source tokens packed into one LLM request
+    TRANSLATION_BATCH_MAX_SEGMENTS: int = 25
+    TRANSLATION_MEMORY_PATH: str = os.getenv("TRANSLATION_MEMORY_PATH", "data/translation_memory.db")  # empty disables persistence
+    TRANSLATION_MEMORY_LRU_SIZE: int = int(os.getenv("TRANSLATION_MEMORY_LRU_SIZE", "5000"))
+    TRANSLATION_GLOSSARY_VERSION: str = os.getenv("TRANSLATION_GLOSSARY_VERSION", "1")  # bump to invalidate stored translations
+    TRANSLATION_WARMUP_ON_STARTUP: bool = os.getenv("TRANSLATION_WARMUP_ON_STARTUP", "true").lower() == "true"
     
     # Industry Benchmarks
     SUPPORTED_INDUSTRIES: List[str] = [
@@ -0,0 +1,63 @@
+"""
+Business context for the AI and report endpoints
+Profile, latest analysis, latest financial period and bank connection are
+independent lookups, so they are fetched concurrently
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+from app.repositories import (
+    business_repository,
+    analysis_repository,
+    financial_data_repository,
+    banking_connection_repository
+)
+
+@dataclass
+class BusinessContext:
+    business_id: str
+    business: Optional[Dict[str, Any]] = None
+    analysis: Optional[Dict[str, Any]] = None
+    financial_period: Optional[Dict[str, Any]] = None
+    connection: Optional[Dict[str, Any]] = None
+
+    @property
+    def connection_status(self) -> str:
+        return self.connection.get('connection_status') if self.connection else "not_connected"
+
+    @property
+    def revenue(self) -> Optional[float]:
+        """Latest period revenue, falling back to the declared annual revenue"""
+        if self.financial_period and self.financial_period.get('total_revenue') is not None:
+            return self.financial_period['total_revenue']
+        return self.business.get('annual_revenue') if self.business else None
+
+    def to_prompt_context(self) -> Dict[str, Any]:
+        """Flat dict used by the chat prompt"""
+        prompt_context = dict(self.business or {})
+        if self.revenue is not None:
+            prompt_context['revenue'] = self.revenue
+        if self.analysis:
+            prompt_context.update({
+                'health_score': self.analysis.get('health_score'),
+                'credit_score': self.analysis.get('credit_score'),
+                'risk_level': self.analysis.get('risk_level')
+            })
+        prompt_context['bank_connection_status'] = self.connection_status
+        return prompt_context
+
+async def load_business_context(business_id: str) -> BusinessContext:
+    """Fetch all context for a business at once; latency is the slowest lookup"""
+    business, analysis, financial_period, connection = await asyncio.gather(
+        business_repository.get_cached(business_id),
+        analysis_repository.latest_cached(business_id),
+        financial_data_repository.latest(business_id, financial_data_repository.summary_columns),
+        banking_connection_repository.latest_for_business(business_id)
+    )
+    return BusinessContext(
+        business_id=business_id,
+        business=business,
+        analysis=analysis,
+        financial_period=financial_period,
+        connection=connection
+    )
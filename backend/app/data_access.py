@@ -0,0 +1,494 @@
+"""
+Async data-access layer
+Talks to Postgres directly over DATABASE_URL (asyncpg pool, prepared statements)
+and falls back to the Supabase client, run off the event loop, when it is unavailable
+"""
+import asyncio
+import json
+import logging
+import re
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
+from postgrest.types import ReturnMethod
+from app.config import settings
+
+try:
+    import asyncpg
+except ImportError:  # pragma: no cover - optional dependency
+    asyncpg = None
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - installed with supabase
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+# (column, operator, value) with PostgREST operator names; a plain dict means equality.
+# A tuple of columns with lt/gt compares row values, e.g. (("created_at", "id"), "lt", (ts, id))
+Filters = Union[Dict[str, Any], Sequence[Tuple[str, str, Any]]]
+# (column, descending)
+Order = Sequence[Tuple[str, bool]]
+
+SQL_OPERATORS = {
+    "eq": "=",
+    "neq": "<>",
+    "gt": ">",
+    "gte": ">=",
+    "lt": "<",
+    "lte": "<="
+}
+
+# Rows per INSERT ... ON CONFLICT statement (keeps bind parameters well under 32767)
+UPSERT_CHUNK_SIZE = 500
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+class DataAccessError(Exception):
+    """Raised when a query cannot be built or executed"""
+
+def normalize_filters(filters: Optional[Filters]) -> List[Tuple[str, str, Any]]:
+    if not filters:
+        return []
+    if isinstance(filters, dict):
+        return [(column, "eq", value) for column, value in filters.items()]
+    return list(filters)
+
+def is_transient_error(error: Exception) -> bool:
+    """Connection drops, timeouts, pool exhaustion and serialization conflicts (safe to retry)"""
+    if isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError, OSError)):
+        return True
+    if asyncpg is not None and isinstance(error, (
+        asyncpg.PostgresConnectionError,
+        asyncpg.InterfaceError,
+        asyncpg.TooManyConnectionsError,
+        asyncpg.CannotConnectNowError,
+        asyncpg.SerializationError,
+        asyncpg.DeadlockDetectedError
+    )):
+        return True
+    return httpx is not None and isinstance(error, httpx.TransportError)
+
+def _quote(identifier: str) -> str:
+    if not _IDENTIFIER.match(identifier):
+        raise DataAccessError(f"Invalid identifier: {identifier!r}")
+    return f'"{identifier}"'
+
+def _columns_sql(columns: str) -> str:
+    if columns.strip() == "*":
+        return "*"
+    return ", ".join(_quote(column.strip()) for column in columns.split(","))
+
+class PostgresBackend:
+    """Direct Postgres access through a bounded asyncpg connection pool.
+
+    asyncpg prepares every statement and keeps it in a per-connection cache,
+    so the fixed set of queries the routers issue is parsed and planned once.
+    Values are returned with the same shapes PostgREST uses (ISO timestamps,
+    numbers, string UUIDs, decoded JSON) so both backends are interchangeable.
+    """
+
+    name = "postgres"
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._pool = None
+        self._pool_lock = asyncio.Lock()
+
+    async def _init_connection(self, conn):
+        await conn.set_type_codec("json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+        await conn.set_type_codec("jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+        await conn.set_type_codec("uuid", encoder=str, decoder=str, schema="pg_catalog", format="text")
+        await conn.set_type_codec("numeric", encoder=str, decoder=float, schema="pg_catalog", format="text")
+        for type_name in ("timestamp", "timestamptz", "date"):
+            await conn.set_type_codec(
+                type_name,
+                encoder=lambda value: value if isinstance(value, str) else value.isoformat(),
+                decoder=lambda value: value.replace(" ", "T", 1),
+                schema="pg_catalog",
+                format="text"
+            )
+
+    async def connect(self):
+        """Create the pool (idempotent)"""
+        if self._pool is not None:
+            return
+        async with self._pool_lock:
+            if self._pool is None:
+                self._pool = await asyncpg.create_pool(
+                    self.dsn,
+                    min_size=settings.DB_POOL_MIN_SIZE,
+                    max_size=settings.DB_POOL_MAX_SIZE,
+                    command_timeout=settings.DB_COMMAND_TIMEOUT,
+                    statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+                    init=self._init_connection
+                )
+                logger.info(f"Postgres pool ready ({settings.DB_POOL_MIN_SIZE}-{settings.DB_POOL_MAX_SIZE} connections)")
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    def _where(self, filters: Optional[Filters], params: List[Any]) -> str:
+        clauses = []
+        for column, operator, value in normalize_filters(filters):
+            if isinstance(column, tuple):
+                if operator not in ("lt", "gt") or len(column) != len(value):
+                    raise DataAccessError("Row comparisons need lt/gt and one value per column")
+                placeholders = []
+                for item in value:
+                    params.append(item)
+                    placeholders.append(f"${len(params)}")
+                clauses.append(
+                    f"({', '.join(_quote(c) for c in column)}) {SQL_OPERATORS[operator]} ({', '.join(placeholders)})"
+                )
+            elif operator == "in":
+                params.append(list(value))
+                clauses.append(f"{_quote(column)} = ANY(${len(params)})")
+            elif operator == "is":
+                clauses.append(f"{_quote(column)} IS {'NULL' if value is None else 'NOT NULL'}")
+            elif operator in SQL_OPERATORS:
+                params.append(value)
+                clauses.append(f"{_quote(column)} {SQL_OPERATORS[operator]} ${len(params)}")
+            else:
+                raise DataAccessError(f"Unsupported operator: {operator}")
+        return f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    async def fetch(self, query: str, *args) -> List[Dict[str, Any]]:
+        """Run raw SQL and return rows as dicts"""
+        await self.connect()
+        async with self._pool.acquire() as conn:
+            rows = await conn.fetch(query, *args)
+        return [dict(row) for row in rows]
+
+    async def select(
+        self,
+        table: str,
+        columns: str = "*",
+        filters: Optional[Filters] = None,
+        order: Optional[Order] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        params: List[Any] = []
+        query = f"SELECT {_columns_sql(columns)} FROM {_quote(table)}{self._where(filters, params)}"
+        if order:
+            query += " ORDER BY " + ", ".join(
+                f"{_quote(column)} {'DESC' if descending else 'ASC'}" for column, descending in order
+            )
+        if limit is not None:
+            params.append(int(limit))
+            query += f" LIMIT ${len(params)}"
+        return await self.fetch(query, *params)
+
+    async def insert(self, table: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        columns = list(record)
+        placeholders = ", ".join(f"${i}" for i in range(1, len(columns) + 1))
+        query = (
+            f"INSERT INTO {_quote(table)} ({', '.join(_quote(c) for c in columns)}) "
+            f"VALUES ({placeholders}) RETURNING *"
+        )
+        rows = await self.fetch(query, *[record[c] for c in columns])
+        return rows[0]
+
+    async def insert_many(self, table: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """One multi-row INSERT; records must share the same columns"""
+        columns = list(records[0])
+        params: List[Any] = []
+        values = []
+        for record in records:
+            placeholders = []
+            for column in columns:
+                params.append(record[column])
+                placeholders.append(f"${len(params)}")
+            values.append(f"({', '.join(placeholders)})")
+        query = (
+            f"INSERT INTO {_quote(table)} ({', '.join(_quote(c) for c in columns)}) "
+            f"VALUES {', '.join(values)} RETURNING *"
+        )
+        return await self.fetch(query, *params)
+
+    async def upsert_many(
+        self,
+        table: str,
+        records: List[Dict[str, Any]],
+        conflict_columns: Sequence[str],
+        update_columns: Sequence[str]
+    ) -> int:
+        """Multi-row INSERT ... ON CONFLICT DO UPDATE; unchanged rows are not rewritten"""
+        columns = list(records[0])
+        params: List[Any] = []
+        values = []
+        for record in records:
+            placeholders = []
+            for column in columns:
+                params.append(record[column])
+                placeholders.append(f"${len(params)}")
+            values.append(f"({', '.join(placeholders)})")
+        target = ", ".join(_quote(c) for c in update_columns)
+        excluded = ", ".join(f"EXCLUDED.{_quote(c)}" for c in update_columns)
+        query = (
+            f"INSERT INTO {_quote(table)} ({', '.join(_quote(c) for c in columns)}) VALUES {', '.join(values)} "
+            f"ON CONFLICT ({', '.join(_quote(c) for c in conflict_columns)}) DO UPDATE SET ({target}) = ROW({excluded}) "
+            f"WHERE ({', '.join(f'{_quote(table)}.{_quote(c)}' for c in update_columns)}) IS DISTINCT FROM ({excluded}) "
+            f"RETURNING 1"
+        )
+        return len(await self.fetch(query, *params))
+
+    async def update(self, table: str, values: Dict[str, Any], filters: Filters) -> List[Dict[str, Any]]:
+        params: List[Any] = list(values.values())
+        assignments = ", ".join(f"{_quote(column)} = ${i}" for i, column in enumerate(values, start=1))
+        where = self._where(filters, params)
+        if not where:
+            raise DataAccessError("Refusing to update without filters")
+        return await self.fetch(f"UPDATE {_quote(table)} SET {assignments}{where} RETURNING *", *params)
+
+    async def delete(self, table: str, filters: Filters) -> List[Dict[str, Any]]:
+        params: List[Any] = []
+        where = self._where(filters, params)
+        if not where:
+            raise DataAccessError("Refusing to delete without filters")
+        return await self.fetch(f"DELETE FROM {_quote(table)}{where} RETURNING *", *params)
+
+    async def call(self, function: str, params: Dict[str, Any]) -> Any:
+        arguments = ", ".join(f"{_quote(name)} => ${i}" for i, name in enumerate(params, start=1))
+        rows = await self.fetch(f"SELECT {_quote(function)}({arguments}) AS result", *params.values())
+        return rows[0]["result"]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        if self._pool is None:
+            return {"backend": self.name, "connected": False}
+        return {
+            "backend": self.name,
+            "connected": True,
+            "pool_size": self._pool.get_size(),
+            "pool_idle": self._pool.get_idle_size(),
+            "pool_max_size": self._pool.get_max_size()
+        }
+
+class SupabaseBackend:
+    """Supabase (PostgREST) fallback; the blocking client runs in worker threads"""
+
+    name = "supabase"
+
+    async def connect(self):
+        from app.database import get_supabase
+        await asyncio.to_thread(get_supabase)
+
+    async def close(self):
+        pass
+
+    @staticmethod
+    def _row_comparison(columns: Tuple[str, ...], operator: str, values: Sequence[Any]) -> str:
+        """PostgREST `or` expression equivalent to (c1, c2, ...) < (v1, v2, ...)"""
+        column, value = columns[0], f'"{values[0]}"'
+        if len(columns) == 1:
+            return f"{column}.{operator}.{value}"
+        rest = SupabaseBackend._row_comparison(columns[1:], operator, values[1:])
+        rest = f"or({rest})" if len(columns) > 2 else rest
+        return f"{column}.{operator}.{value},and({column}.eq.{value},{rest})"
+
+    def _apply_filters(self, query, filters: Optional[Filters]):
+        for column, operator, value in normalize_filters(filters):
+            if isinstance(column, tuple):
+                if operator not in ("lt", "gt") or len(column) != len(value):
+                    raise DataAccessError("Row comparisons need lt/gt and one value per column")
+                # postgrest-py has no or_() builder yet, so add the raw parameter
+                query.params = query.params.add("or", f"({self._row_comparison(column, operator, list(value))})")
+            elif operator == "in":
+                query = query.in_(column, list(value))
+            elif operator == "is":
+                query = query.is_(column, "null") if value is None else query.not_.is_(column, "null")
+            elif operator in SQL_OPERATORS:
+                query = getattr(query, operator)(column, value)
+            else:
+                raise DataAccessError(f"Unsupported operator: {operator}")
+        return query
+
+    async def _execute(self, build) -> List[Dict[str, Any]]:
+        from app.database import get_supabase
+
+        def run():
+            return build(get_supabase()).execute().data or []
+        return await asyncio.to_thread(run)
+
+    async def select(
+        self,
+        table: str,
+        columns: str = "*",
+        filters: Optional[Filters] = None,
+        order: Optional[Order] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        def build(client):
+            query = self._apply_filters(client.table(table).select(columns), filters)
+            for column, descending in order or []:
+                query = query.order(column, desc=descending)
+            if limit is not None:
+                query = query.limit(limit)
+            return query
+        return await self._execute(build)
+
+    async def insert(self, table: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        rows = await self._execute(lambda client: client.table(table).insert(record))
+        return rows[0] if rows else {}
+
+    async def insert_many(self, table: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return await self._execute(lambda client: client.table(table).insert(records))
+
+    async def upsert_many(
+        self,
+        table: str,
+        records: List[Dict[str, Any]],
+        conflict_columns: Sequence[str],
+        update_columns: Sequence[str]
+    ) -> int:
+        # PostgREST rewrites every conflicting row, so the count is the batch size
+        await self._execute(lambda client: client.table(table).upsert(
+            records, on_conflict=",".join(conflict_columns), returning=ReturnMethod.minimal
+        ))
+        return len(records)
+
+    async def update(self, table: str, values: Dict[str, Any], filters: Filters) -> List[Dict[str, Any]]:
+        if not filters:
+            raise DataAccessError("Refusing to update without filters")
+        return await self._execute(lambda client: self._apply_filters(client.table(table).update(values), filters))
+
+    async def delete(self, table: str, filters: Filters) -> List[Dict[str, Any]]:
+        if not filters:
+            raise DataAccessError("Refusing to delete without filters")
+        return await self._execute(lambda client: self._apply_filters(client.table(table).delete(), filters))
+
+    async def call(self, function: str, params: Dict[str, Any]) -> Any:
+        from app.database import get_supabase
+
+        def run():
+            return get_supabase().rpc(function, params).execute().data
+        return await asyncio.to_thread(run)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+class Database:
+    """Table-level async queries against the configured backend"""
+
+    def __init__(self):
+        self.backend = None
+
+    def _get_backend(self):
+        if self.backend is None:
+            if settings.DATABASE_URL and asyncpg is not None:
+                self.backend = PostgresBackend(settings.DATABASE_URL)
+            else:
+                if settings.DATABASE_URL:
+                    logger.warning("asyncpg not installed, using the Supabase client")
+                self.backend = SupabaseBackend()
+        return self.backend
+
+    async def connect(self):
+        """Open the preferred backend, falling back to Supabase if Postgres is unreachable"""
+        backend = self._get_backend()
+        try:
+            await backend.connect()
+        except Exception as e:
+            if isinstance(backend, SupabaseBackend):
+                raise
+            logger.error(f"Postgres connection failed, falling back to Supabase: {str(e)}")
+            self.backend = SupabaseBackend()
+            await self.backend.connect()
+
+    async def close(self):
+        if self.backend is not None:
+            await self.backend.close()
+
+    @property
+    def supports_sql(self) -> bool:
+        """True when raw SQL (joins, DISTINCT ON, LATERAL) can be sent to the backend"""
+        return isinstance(self._get_backend(), PostgresBackend)
+
+    async def fetch(self, query: str, *args) -> List[Dict[str, Any]]:
+        """Raw SQL; only available on the Postgres backend (check supports_sql)"""
+        if not self.supports_sql:
+            raise DataAccessError("Raw SQL needs the Postgres backend (DATABASE_URL)")
+        return await self.backend.fetch(query, *args)
+
+    async def select(
+        self,
+        table: str,
+        columns: str = "*",
+        filters: Optional[Filters] = None,
+        order: Optional[Order] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Rows of `table` matching `filters`"""
+        return await self._get_backend().select(table, columns, filters, order, limit)
+
+    async def select_one(
+        self,
+        table: str,
+        columns: str = "*",
+        filters: Optional[Filters] = None,
+        order: Optional[Order] = None
+    ) -> Optional[Dict[str, Any]]:
+        """First matching row or None"""
+        rows = await self.select(table, columns, filters, order, limit=1)
+        return rows[0] if rows else None
+
+    async def insert(self, table: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a row and return it as stored"""
+        return await self._get_backend().insert(table, record)
+
+    async def insert_many(self, table: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert rows with one statement per column set and return them as stored"""
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for record in records:
+            groups.setdefault(tuple(record), []).append(record)
+        inserted: List[Dict[str, Any]] = []
+        for group in groups.values():
+            inserted.extend(await self._get_backend().insert_many(table, group))
+        return inserted
+
+    async def upsert_many(
+        self,
+        table: str,
+        records: List[Dict[str, Any]],
+        conflict_columns: Sequence[str],
+        update_columns: Optional[Sequence[str]] = None
+    ) -> int:
+        """Bulk insert-or-update on `conflict_columns` in chunks; returns rows inserted or changed.
+
+        Later duplicates of a conflict key win (one statement cannot touch a
+        row twice). By default every non-key column except `id` is updated.
+        """
+        latest: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        for record in records:
+            latest[tuple(record[column] for column in conflict_columns)] = record
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for record in latest.values():
+            groups.setdefault(tuple(record), []).append(record)
+
+        written = 0
+        for columns, group in groups.items():
+            updates = update_columns or [c for c in columns if c not in conflict_columns and c != 'id']
+            for start in range(0, len(group), UPSERT_CHUNK_SIZE):
+                written += await self._get_backend().upsert_many(
+                    table, group[start:start + UPSERT_CHUNK_SIZE], conflict_columns, updates
+                )
+        return written
+
+    async def update(self, table: str, values: Dict[str, Any], filters: Filters) -> List[Dict[str, Any]]:
+        """Update matching rows and return them"""
+        return await self._get_backend().update(table, values, filters)
+
+    async def delete(self, table: str, filters: Filters) -> List[Dict[str, Any]]:
+        """Delete matching rows and return them"""
+        return await self._get_backend().delete(table, filters)
+
+    async def call(self, function: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """Call a SQL function with named arguments (PostgREST rpc on Supabase)"""
+        return await self._get_backend().call(function, params or {})
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return self._get_backend().get_metrics()
+
+# Singleton instance
+db = Database()
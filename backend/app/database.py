@@ -3,6 +3,8 @@ Database connection and schema management using Supabase
 """
 from supabase import create_client, Client
 from app.config import settings
+from app.data_access import db
+import asyncio
 import logging
 from typing import Optional
 
@@ -23,15 +25,35 @@ def get_supabase() -> Client:
 async def init_db():
     """Initialize database connection and create tables if needed"""
     try:
-        client = get_supabase()
-        logger.info("Database connection established successfully")
+        await db.connect()
+        logger.info(f"Database connection established successfully ({db.backend.name})")
         # Test connection
-        response = client.table('businesses').select("id").limit(1).execute()
+        await db.select('businesses', 'id', limit=1)
         logger.info("Database tables verified")
     except Exception as e:
         logger.error(f"Database initialization error: {str(e)}")
         logger.warning("Continuing without database - some features may not work")
 
+async def close_db():
+    """Release pooled database connections"""
+    await db.close()
+
+PARTITION_MAINTENANCE_INTERVAL = 24 * 60 * 60  # seconds
+
+async def maintain_banking_partitions():
+    """Keep monthly banking_transactions partitions ahead of the calendar (runs daily)"""
+    while True:
+        try:
+            created = await db.call(
+                'ensure_banking_transactions_partitions',
+                {'p_months_ahead': settings.BANKING_PARTITION_MONTHS_AHEAD}
+            )
+            if created:
+                logger.info(f"Created {created} banking transaction partition(s)")
+        except Exception as e:
+            logger.error(f"Banking partition maintenance failed: {str(e)}")
+        await asyncio.sleep(PARTITION_MAINTENANCE_INTERVAL)
+
 # Database schema SQL (to be run in Supabase SQL editor)
 SCHEMA_SQL = """
 -- Enable UUID extension
@@ -103,6 +125,7 @@ CREATE TABLE IF NOT EXISTS analysis_results (
     credit_score DECIMAL(5, 2),
     risk_level VARCHAR(50),
     insights JSONB,
+    insights_status VARCHAR(20) DEFAULT 'completed',
     recommendations JSONB,
     financial_ratios JSONB,
     benchmarks JSONB,
@@ -140,16 +163,35 @@ CREATE TABLE IF NOT EXISTS banking_connections (
     provider VARCHAR(50) NOT NULL,
     institution_name VARCHAR(255),
     account_id VARCHAR(255),
+    item_id VARCHAR(255),
     access_token_encrypted TEXT,
     connection_status VARCHAR(50) DEFAULT 'active',
     last_sync TIMESTAMP,
+    sync_cursor TEXT,
     created_at TIMESTAMP DEFAULT NOW(),
     updated_at TIMESTAMP DEFAULT NOW()
 );
 
--- Banking transactions
+-- Migration: move an unpartitioned banking_transactions aside; its rows are
+-- copied into the partitioned table further down
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_class
+        WHERE oid = to_regclass('public.banking_transactions') AND relkind = 'r'
+    ) THEN
+        ALTER TABLE banking_transactions RENAME TO banking_transactions_unpartitioned;
+        ALTER TABLE banking_transactions_unpartitioned
+            RENAME CONSTRAINT banking_transactions_pkey TO banking_transactions_unpartitioned_pkey;
+        DROP INDEX IF EXISTS idx_banking_transactions_connection_id;
+        DROP INDEX IF EXISTS idx_banking_transactions_date;
+    END IF;
+END $$;
+
+-- Banking transactions, range partitioned by month on transaction_date
+-- (keys must include the partition column)
 CREATE TABLE IF NOT EXISTS banking_transactions (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     connection_id UUID NOT NULL REFERENCES banking_connections(id) ON DELETE CASCADE,
     transaction_id VARCHAR(255) NOT NULL,
     transaction_date DATE NOT NULL,
@@ -160,20 +202,270 @@ CREATE TABLE IF NOT EXISTS banking_transactions (
     transaction_type VARCHAR(50),
     balance DECIMAL(15, 2),
     created_at TIMESTAMP DEFAULT NOW(),
-    UNIQUE(connection_id, transaction_id)
+    -- Provider account within the connection (a Plaid item can hold several)
+    account_id VARCHAR(255),
+    merchant VARCHAR(255),
+    PRIMARY KEY (id, transaction_date),
+    UNIQUE (connection_id, transaction_id, transaction_date)
+) PARTITION BY RANGE (transaction_date);
+
+-- Catches rows for months without a partition until maintenance moves them
+CREATE TABLE IF NOT EXISTS banking_transactions_default PARTITION OF banking_transactions DEFAULT;
+
+-- Monthly / quarterly / annual aggregates of financial_data, bucketed by period_end
+-- (maintained by the financial_data_rollups trigger below)
+CREATE TABLE IF NOT EXISTS financial_rollups (
+    business_id UUID NOT NULL REFERENCES businesses(id) ON DELETE CASCADE,
+    granularity VARCHAR(10) NOT NULL,
+    period_start DATE NOT NULL,
+    period_end DATE NOT NULL,
+    total_revenue DECIMAL(15, 2),
+    total_expenses DECIMAL(15, 2),
+    gross_profit DECIMAL(15, 2),
+    net_profit DECIMAL(15, 2),
+    closing_cash_balance DECIMAL(15, 2),
+    source_periods INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (business_id, granularity, period_start)
 );
 
+-- Migrations for databases created before the column existed
+ALTER TABLE analysis_results ADD COLUMN IF NOT EXISTS insights_status VARCHAR(20) DEFAULT 'completed';
+ALTER TABLE banking_connections ADD COLUMN IF NOT EXISTS sync_cursor TEXT;
+ALTER TABLE banking_connections ADD COLUMN IF NOT EXISTS item_id VARCHAR(255);
+ALTER TABLE banking_transactions ADD COLUMN IF NOT EXISTS account_id VARCHAR(255);
+ALTER TABLE banking_transactions ADD COLUMN IF NOT EXISTS merchant VARCHAR(255);
+-- Single-column business_id indexes are covered by the composite per-business indexes below
+DROP INDEX IF EXISTS idx_uploaded_documents_business_id;
+DROP INDEX IF EXISTS idx_analysis_results_business_id;
+DROP INDEX IF EXISTS idx_forecasts_business_id;
+DROP INDEX IF EXISTS idx_reports_business_id;
+DROP INDEX IF EXISTS idx_financial_data_business_id;
+
 -- Create indexes
 CREATE INDEX IF NOT EXISTS idx_businesses_user_id ON businesses(user_id);
-CREATE INDEX IF NOT EXISTS idx_financial_data_business_id ON financial_data(business_id);
+CREATE INDEX IF NOT EXISTS idx_financial_data_business_period ON financial_data(business_id, period_end DESC);
 CREATE INDEX IF NOT EXISTS idx_financial_data_period ON financial_data(period_start, period_end);
-CREATE INDEX IF NOT EXISTS idx_uploaded_documents_business_id ON uploaded_documents(business_id);
-CREATE INDEX IF NOT EXISTS idx_analysis_results_business_id ON analysis_results(business_id);
-CREATE INDEX IF NOT EXISTS idx_forecasts_business_id ON forecasts(business_id);
-CREATE INDEX IF NOT EXISTS idx_reports_business_id ON reports(business_id);
+CREATE INDEX IF NOT EXISTS idx_uploaded_documents_business_created ON uploaded_documents(business_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_analysis_results_business_created ON analysis_results(business_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_forecasts_business_created ON forecasts(business_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_reports_business_created ON reports(business_id, created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_banking_connections_business_id ON banking_connections(business_id);
-CREATE INDEX IF NOT EXISTS idx_banking_transactions_connection_id ON banking_transactions(connection_id);
-CREATE INDEX IF NOT EXISTS idx_banking_transactions_date ON banking_transactions(transaction_date);
+-- Webhook lookups (Plaid item / Razorpay account -> connection)
+CREATE INDEX IF NOT EXISTS idx_banking_connections_item_id ON banking_connections(item_id) WHERE item_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_banking_connections_account_id ON banking_connections(account_id) WHERE account_id IS NOT NULL;
+-- Transactions arrive roughly in date order, so a BRIN index stays tiny and
+-- still prunes date-range scans; per-connection reads use the covering index
+CREATE INDEX IF NOT EXISTS idx_banking_transactions_date_brin ON banking_transactions USING BRIN (transaction_date);
+CREATE INDEX IF NOT EXISTS idx_banking_transactions_connection_date
+    ON banking_transactions(connection_id, transaction_date)
+    INCLUDE (amount, transaction_type, category);
+
+-- Portfolio for PostgREST clients: the same LATERAL query as the direct
+-- Postgres path, returned as one JSON array so the response is not cut at max-rows
+CREATE OR REPLACE FUNCTION business_portfolio(p_user_id UUID, p_industry TEXT DEFAULT NULL, p_risk_level TEXT DEFAULT NULL)
+RETURNS JSONB AS $$
+    SELECT COALESCE(jsonb_agg(portfolio), '[]'::jsonb)
+    FROM (
+        SELECT b.id, b.business_name, b.industry,
+               a.health_score, a.credit_score, a.risk_level, a.created_at AS last_analysis_at,
+               f.period_start AS last_period_start, f.period_end AS last_period_end
+        FROM businesses b
+        LEFT JOIN LATERAL (
+            SELECT health_score, credit_score, risk_level, created_at
+            FROM analysis_results
+            WHERE business_id = b.id
+            ORDER BY created_at DESC, id DESC
+            LIMIT 1
+        ) a ON true
+        LEFT JOIN LATERAL (
+            SELECT period_start, period_end
+            FROM financial_data
+            WHERE business_id = b.id
+            ORDER BY period_end DESC
+            LIMIT 1
+        ) f ON true
+        WHERE b.user_id = p_user_id
+          AND (p_industry IS NULL OR b.industry = p_industry)
+          AND (p_risk_level IS NULL OR a.risk_level = p_risk_level)
+    ) portfolio;
+$$ LANGUAGE sql STABLE;
+
+-- Rollup maintenance: each financial_data write recomputes only the
+-- month, quarter and year buckets containing the affected period_end
+CREATE OR REPLACE FUNCTION refresh_financial_rollup_buckets(p_business_id UUID, p_period_end DATE)
+RETURNS void AS $$
+DECLARE
+    bucket TEXT;
+    bucket_start DATE;
+    bucket_end DATE;
+BEGIN
+    -- Rows removed by a business delete cascade need no rollups
+    IF NOT EXISTS (SELECT 1 FROM businesses WHERE id = p_business_id) THEN
+        RETURN;
+    END IF;
+    FOREACH bucket IN ARRAY ARRAY['month', 'quarter', 'year'] LOOP
+        bucket_start := date_trunc(bucket, p_period_end)::date;
+        bucket_end := (bucket_start + CASE bucket
+            WHEN 'month' THEN interval '1 month'
+            WHEN 'quarter' THEN interval '3 months'
+            ELSE interval '1 year'
+        END - interval '1 day')::date;
+
+        INSERT INTO financial_rollups (
+            business_id, granularity, period_start, period_end, total_revenue, total_expenses,
+            gross_profit, net_profit, closing_cash_balance, source_periods, updated_at
+        )
+        SELECT p_business_id, bucket, bucket_start, bucket_end,
+               SUM(total_revenue), SUM(total_expenses), SUM(gross_profit), SUM(net_profit),
+               (array_agg(cash_balance ORDER BY period_end DESC))[1], COUNT(*), NOW()
+        FROM financial_data
+        WHERE business_id = p_business_id AND period_end BETWEEN bucket_start AND bucket_end
+        HAVING COUNT(*) > 0
+        ON CONFLICT (business_id, granularity, period_start) DO UPDATE SET
+            total_revenue = EXCLUDED.total_revenue,
+            total_expenses = EXCLUDED.total_expenses,
+            gross_profit = EXCLUDED.gross_profit,
+            net_profit = EXCLUDED.net_profit,
+            closing_cash_balance = EXCLUDED.closing_cash_balance,
+            source_periods = EXCLUDED.source_periods,
+            updated_at = EXCLUDED.updated_at;
+
+        IF NOT FOUND THEN
+            DELETE FROM financial_rollups
+            WHERE business_id = p_business_id AND granularity = bucket AND period_start = bucket_start;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION financial_data_rollup_trigger()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM refresh_financial_rollup_buckets(OLD.business_id, OLD.period_end);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM refresh_financial_rollup_buckets(NEW.business_id, NEW.period_end);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS financial_data_rollups ON financial_data;
+CREATE TRIGGER financial_data_rollups
+    AFTER INSERT OR UPDATE OR DELETE ON financial_data
+    FOR EACH ROW EXECUTE FUNCTION financial_data_rollup_trigger();
+
+-- Backfill rollups for rows written before the trigger existed
+SELECT refresh_financial_rollup_buckets(business_id, period_end)
+FROM (SELECT DISTINCT business_id, period_end FROM financial_data) AS periods;
+
+-- Banking transaction partitions: one per month, named banking_transactions_yYYYYmMM.
+-- Rows in the default partition are moved into the new partition when it is created.
+CREATE OR REPLACE FUNCTION create_banking_transactions_partition(p_month DATE)
+RETURNS TEXT AS $$
+DECLARE
+    month_start DATE := date_trunc('month', p_month)::date;
+    month_end DATE := (date_trunc('month', p_month) + interval '1 month')::date;
+    partition_name TEXT := format('banking_transactions_y%sm%s', to_char(p_month, 'YYYY'), to_char(p_month, 'MM'));
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('banking_transactions_partitions'));
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM banking_transactions_default
+        WHERE transaction_date >= month_start AND transaction_date < month_end
+    ) THEN
+        EXECUTE format('CREATE TABLE %I (LIKE banking_transactions INCLUDING DEFAULTS)', partition_name);
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM banking_transactions_default
+                            WHERE transaction_date >= %L AND transaction_date < %L RETURNING *)
+             INSERT INTO %I SELECT * FROM moved',
+            month_start, month_end, partition_name
+        );
+        EXECUTE format(
+            'ALTER TABLE banking_transactions ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+            partition_name, month_start, month_end
+        );
+    ELSE
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF banking_transactions FOR VALUES FROM (%L) TO (%L)',
+            partition_name, month_start, month_end
+        );
+    END IF;
+    -- Partitions are reachable through PostgREST on their own
+    EXECUTE format('ALTER TABLE %I ENABLE ROW LEVEL SECURITY', partition_name);
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Partitions for the current month and p_months_ahead more, plus any month
+-- that has collected rows in the default partition (e.g. historical imports)
+CREATE OR REPLACE FUNCTION ensure_banking_transactions_partitions(p_months_ahead INTEGER DEFAULT 3)
+RETURNS INTEGER AS $$
+DECLARE
+    month DATE;
+    created INTEGER := 0;
+BEGIN
+    FOR month IN
+        SELECT generate_series(date_trunc('month', CURRENT_DATE), date_trunc('month', CURRENT_DATE) + make_interval(months => p_months_ahead), interval '1 month')::date
+        UNION
+        SELECT DISTINCT date_trunc('month', transaction_date)::date FROM banking_transactions_default
+    LOOP
+        IF to_regclass(format('banking_transactions_y%sm%s', to_char(month, 'YYYY'), to_char(month, 'MM'))) IS NULL THEN
+            PERFORM create_banking_transactions_partition(month);
+            created := created + 1;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Retention: drop monthly partitions that end on or before p_before
+CREATE OR REPLACE FUNCTION drop_banking_transactions_partitions(p_before DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    partition_name TEXT;
+    dropped INTEGER := 0;
+BEGIN
+    FOR partition_name IN
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = 'banking_transactions'::regclass
+          AND child.relname ~ '^banking_transactions_y[0-9]{4}m[0-9]{2}$'
+          AND (to_date(substring(child.relname FROM 'y([0-9]{4})m') || substring(child.relname FROM 'm([0-9]{2})$'), 'YYYYMM')
+               + interval '1 month')::date <= p_before
+    LOOP
+        EXECUTE format('DROP TABLE %I', partition_name);
+        dropped := dropped + 1;
+    END LOOP;
+    RETURN dropped;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Migration: copy rows from the pre-partitioning table
+DO $$
+BEGIN
+    IF to_regclass('public.banking_transactions_unpartitioned') IS NOT NULL THEN
+        PERFORM create_banking_transactions_partition(month)
+        FROM (SELECT DISTINCT date_trunc('month', transaction_date)::date AS month
+              FROM banking_transactions_unpartitioned) AS months;
+        INSERT INTO banking_transactions (
+            id, connection_id, transaction_id, transaction_date, amount, currency,
+            description, category, transaction_type, balance, created_at
+        )
+        SELECT id, connection_id, transaction_id, transaction_date, amount, currency,
+               description, category, transaction_type, balance, created_at
+        FROM banking_transactions_unpartitioned;
+        DROP TABLE banking_transactions_unpartitioned;
+    END IF;
+END $$;
+
+SELECT ensure_banking_transactions_partitions(3);
 
 -- Enable Row Level Security
 ALTER TABLE businesses ENABLE ROW LEVEL SECURITY;
@@ -184,4 +476,6 @@ ALTER TABLE forecasts ENABLE ROW LEVEL SECURITY;
 ALTER TABLE reports ENABLE ROW LEVEL SECURITY;
 ALTER TABLE banking_connections ENABLE ROW LEVEL SECURITY;
 ALTER TABLE banking_transactions ENABLE ROW LEVEL SECURITY;
+ALTER TABLE banking_transactions_default ENABLE ROW LEVEL SECURITY;
+ALTER TABLE financial_rollups ENABLE ROW LEVEL SECURITY;
 """
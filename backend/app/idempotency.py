@@ -0,0 +1,165 @@
+"""
+Idempotency-Key support for expensive POST endpoints
+The first request with a key runs; concurrent and repeated requests with the
+same key get its stored response instead of another LLM call and insert
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import time
+from typing import Dict, Any, Awaitable, Callable, Optional, Tuple
+from fastapi import HTTPException, status
+from app.cache import cache, TTLCache
+from app.config import settings
+
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+def request_fingerprint(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class IdempotencyStore:
+    """Completed responses by key, with in-flight locking.
+
+    Within a worker, duplicates wait on the first request's future. Across
+    workers (when REDIS_URL is set) the first request takes a Redis lock and
+    the others poll for its stored response. Only successful responses are
+    stored, so a failed request can be retried with the same key.
+    """
+
+    POLL_INTERVAL = 0.25  # seconds between Redis checks while another worker holds the key
+
+    def __init__(self, ttl: int, wait_timeout: int, max_entries: int):
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.local = TTLCache(max_entries, ttl)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def _redis_keys(store_key: str) -> Tuple[str, str]:
+        return f"sfc:idempotency:{store_key}", f"sfc:idempotency-lock:{store_key}"
+
+    async def run(
+        self,
+        scope: str,
+        key: Optional[str],
+        payload: Any,
+        handler: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Tuple[Dict[str, Any], bool]:
+        """(response, replayed); without a key the handler simply runs"""
+        if not key:
+            return await handler(), False
+        if len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters"
+            )
+
+        store_key = f"{scope}:{key}"
+        fingerprint = request_fingerprint(payload)
+        found, entry = self.local.get(store_key)
+        if found:
+            return self._replay(entry, fingerprint)
+        pending = self._in_flight.get(store_key)
+        if pending is not None:
+            return self._replay(await asyncio.shield(pending), fingerprint)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[store_key] = future
+        owner = False
+        try:
+            entry = await self._claim(store_key)
+            if entry is None:
+                owner = True
+                response = await handler()
+                entry = {"fingerprint": fingerprint, "response": response}
+                await self._store(store_key, entry)
+                replayed = False
+            else:
+                replayed = True
+            self.local.set(store_key, entry)
+            future.set_result(entry)
+            if replayed:
+                return self._replay(entry, fingerprint)
+            return copy.deepcopy(entry["response"]), False
+        except BaseException as e:
+            # Also on cancellation (client disconnect, timeout): waiters must
+            # not hang and other workers must be able to retry the key
+            if not future.done():
+                if not isinstance(e, Exception):
+                    e = HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail="The request with this Idempotency-Key was interrupted; retry it"
+                    )
+                future.set_exception(e)
+                # Mark retrieved so failures without waiters are not logged as unhandled
+                future.exception()
+            if owner:
+                await asyncio.shield(self._release(store_key))
+            raise
+        finally:
+            if self._in_flight.get(store_key) is future:
+                del self._in_flight[store_key]
+
+    @staticmethod
+    def _replay(entry: Dict[str, Any], fingerprint: str) -> Tuple[Dict[str, Any], bool]:
+        if entry["fingerprint"] != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used with a different request"
+            )
+        return copy.deepcopy(entry["response"]), True
+
+    async def _claim(self, store_key: str) -> Optional[Dict[str, Any]]:
+        """None once this worker owns the key, else the response another worker stored"""
+        client = cache.get_redis()
+        if client is None:
+            return None
+        result_key, lock_key = self._redis_keys(store_key)
+        deadline = time.monotonic() + self.wait_timeout
+        try:
+            while True:
+                stored = await client.get(result_key)
+                if stored is not None:
+                    return json.loads(stored)
+                if await client.set(lock_key, "1", nx=True, ex=self.wait_timeout):
+                    return None
+                if time.monotonic() >= deadline:
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail="A request with this Idempotency-Key is still in progress"
+                    )
+                await asyncio.sleep(self.POLL_INTERVAL)
+        except HTTPException:
+            raise
+        except Exception as e:
+            cache.redis_failed("idempotency lock", e)
+            return None
+
+    async def _store(self, store_key: str, entry: Dict[str, Any]):
+        client = cache.get_redis()
+        if client is None:
+            return
+        result_key, lock_key = self._redis_keys(store_key)
+        try:
+            await client.set(result_key, json.dumps(entry, default=str), ex=self.ttl)
+            await client.delete(lock_key)
+        except Exception as e:
+            cache.redis_failed("idempotency write", e)
+
+    async def _release(self, store_key: str):
+        client = cache.get_redis()
+        if client is None:
+            return
+        try:
+            await client.delete(self._redis_keys(store_key)[1])
+        except Exception as e:
+            cache.redis_failed("idempotency unlock", e)
+
+# Singleton instance
+idempotency = IdempotencyStore(
+    ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+    wait_timeout=settings.IDEMPOTENCY_WAIT_SECONDS,
+    max_entries=settings.CACHE_MAX_ENTRIES
+)
@@ -0,0 +1,45 @@
+"""
+Keyset pagination on (created_at, id) with opaque cursors
+"""
+import base64
+import json
+from typing import Dict, Any, List, Optional, Tuple
+from fastapi import HTTPException, status
+from app.config import settings
+
+KEYSET_COLUMNS = ("created_at", "id")
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    """Default and bound a requested page size"""
+    if not limit or limit < 1:
+        return settings.PAGE_SIZE_DEFAULT
+    return min(limit, settings.PAGE_SIZE_MAX)
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Cursor pointing just after `row`"""
+    payload = json.dumps([row[column] for column in KEYSET_COLUMNS], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[Any, ...]:
+    """Keyset values of a cursor; 400 if it was not issued by encode_cursor"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(payload)
+    except (ValueError, UnicodeDecodeError):
+        values = None
+    if not isinstance(values, list) or len(values) != len(KEYSET_COLUMNS) or not all(values):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return tuple(values)
+
+def build_page(rows: List[Dict[str, Any]], limit: int) -> Dict[str, Any]:
+    """Trim the look-ahead row and derive the next cursor"""
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(items[-1]) if has_more else None,
+        "has_more": has_more
+    }
@@ -0,0 +1,364 @@
+"""
+Table repositories
+List views fetch an explicit column projection; large JSONB blobs
+(extracted document data, ratios, forecasts, report bodies) are only
+loaded by the detail fetches
+"""
+from typing import Dict, Any, List, Optional
+from app.cache import cache
+from app.data_access import db, Database, Filters, normalize_filters
+from app.pagination import KEYSET_COLUMNS, build_page, decode_cursor
+from app.write_behind import write_behind
+
+# Portfolio sort keys -> columns of the portfolio query
+PORTFOLIO_SORT_COLUMNS = {
+    "business_name": "b.business_name",
+    "health_score": "a.health_score",
+    "credit_score": "a.credit_score",
+    "last_analysis_at": "a.created_at",
+    "last_period_end": "f.period_end"
+}
+
+class Repository:
+    """Shared CRUD for one table"""
+
+    table: str = ""
+    list_columns: str = "*"
+    detail_columns: str = "*"
+
+    def __init__(self, database: Database = db):
+        self.db = database
+
+    async def get(self, record_id: str, columns: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Full row (or `columns`) by id, waiting for it if it is still in the write-behind queue"""
+        row = await self.db.select_one(self.table, columns or self.detail_columns, {'id': record_id})
+        if row is None and await write_behind.wait_for(self.table, record_id):
+            row = await self.db.select_one(self.table, columns or self.detail_columns, {'id': record_id})
+        return row
+
+    async def list(
+        self,
+        filters: Optional[Filters] = None,
+        limit: Optional[int] = None,
+        columns: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Newest rows first, list projection by default"""
+        return await self.db.select(
+            self.table, columns or self.list_columns, filters, [('created_at', True)], limit
+        )
+
+    async def page(
+        self,
+        filters: Optional[Filters],
+        limit: int,
+        cursor: Optional[str] = None,
+        columns: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """One keyset page, newest first: {items, next_cursor, has_more}"""
+        conditions = normalize_filters(filters)
+        if cursor:
+            conditions.append((KEYSET_COLUMNS, 'lt', decode_cursor(cursor)))
+        rows = await self.db.select(
+            self.table,
+            columns or self.list_columns,
+            conditions,
+            [(column, True) for column in KEYSET_COLUMNS],
+            limit + 1
+        )
+        return build_page(rows, limit)
+
+    async def page_for_business(self, business_id: str, limit: int, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """One page of a business's rows, including results still in the write-behind queue"""
+        await write_behind.wait_for_rows(self.table, 'business_id', business_id)
+        return await self.page({'business_id': business_id}, limit, cursor)
+
+    async def create(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.db.insert(self.table, record)
+
+    async def create_many(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return await self.db.insert_many(self.table, records)
+
+    async def update(self, record_id: str, values: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        rows = await self.db.update(self.table, values, {'id': record_id})
+        return rows[0] if rows else None
+
+    async def delete(self, record_id: str) -> bool:
+        return bool(await self.db.delete(self.table, {'id': record_id}))
+
+class BusinessRepository(Repository):
+    table = "businesses"
+
+    async def get_cached(self, business_id: str) -> Optional[Dict[str, Any]]:
+        """Business profile through the read-through cache"""
+        return await cache.get_or_load("business", business_id, lambda: self.get(business_id))
+
+    async def update(self, record_id: str, values: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        updated = await super().update(record_id, values)
+        await cache.invalidate("business", record_id)
+        return updated
+
+    async def list_for_user(self, user_id: str) -> List[Dict[str, Any]]:
+        return await self.list({'user_id': user_id})
+
+    async def portfolio(
+        self,
+        user_id: str,
+        industry: Optional[str] = None,
+        risk_level: Optional[str] = None,
+        sort_by: str = "health_score",
+        descending: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Every business of a user with its latest scores and data period.
+
+        One LATERAL query (each side reads the top row of the per-business
+        composite index): inline on Postgres, through the business_portfolio
+        function on Supabase, sorted here. Missing values sort last either way.
+        """
+        if sort_by not in PORTFOLIO_SORT_COLUMNS:
+            raise ValueError(f"Unsupported sort column: {sort_by}")
+        if self.db.supports_sql:
+            return await self._portfolio_sql(user_id, industry, risk_level, sort_by, descending)
+        return await self._portfolio_rpc(user_id, industry, risk_level, sort_by, descending)
+
+    async def _portfolio_sql(
+        self,
+        user_id: str,
+        industry: Optional[str],
+        risk_level: Optional[str],
+        sort_by: str,
+        descending: bool
+    ) -> List[Dict[str, Any]]:
+        params: List[Any] = [user_id]
+        conditions = ["b.user_id = $1"]
+        if industry:
+            params.append(industry)
+            conditions.append(f"b.industry = ${len(params)}")
+        if risk_level:
+            params.append(risk_level)
+            conditions.append(f"a.risk_level = ${len(params)}")
+        query = f"""
+            SELECT b.id, b.business_name, b.industry,
+                   a.health_score, a.credit_score, a.risk_level, a.created_at AS last_analysis_at,
+                   f.period_start AS last_period_start, f.period_end AS last_period_end
+            FROM businesses b
+            LEFT JOIN LATERAL (
+                SELECT health_score, credit_score, risk_level, created_at
+                FROM analysis_results
+                WHERE business_id = b.id
+                ORDER BY created_at DESC, id DESC
+                LIMIT 1
+            ) a ON true
+            LEFT JOIN LATERAL (
+                SELECT period_start, period_end
+                FROM financial_data
+                WHERE business_id = b.id
+                ORDER BY period_end DESC
+                LIMIT 1
+            ) f ON true
+            WHERE {' AND '.join(conditions)}
+            ORDER BY {PORTFOLIO_SORT_COLUMNS[sort_by]} {'DESC' if descending else 'ASC'} NULLS LAST, b.id
+        """
+        return await self.db.fetch(query, *params)
+
+    async def _portfolio_rpc(
+        self,
+        user_id: str,
+        industry: Optional[str],
+        risk_level: Optional[str],
+        sort_by: str,
+        descending: bool
+    ) -> List[Dict[str, Any]]:
+        rows = await self.db.call('business_portfolio', {
+            'p_user_id': user_id,
+            'p_industry': industry,
+            'p_risk_level': risk_level
+        }) or []
+        rows.sort(key=lambda row: row['id'])
+        present = [row for row in rows if row[sort_by] is not None]
+        present.sort(key=lambda row: row[sort_by], reverse=descending)
+        return present + [row for row in rows if row[sort_by] is None]
+
+class FinancialDataRepository(Repository):
+    table = "financial_data"
+    summary_columns = "id, period_start, period_end, total_revenue, total_expenses, net_profit, cash_balance"
+
+    async def recent(
+        self,
+        business_id: str,
+        limit: int,
+        period_start: Optional[str] = None,
+        period_end: Optional[str] = None,
+        columns: str = "*"
+    ) -> List[Dict[str, Any]]:
+        """Most recent periods first"""
+        filters = [('business_id', 'eq', business_id)]
+        if period_start:
+            filters.append(('period_start', 'gte', period_start))
+        if period_end:
+            filters.append(('period_end', 'lte', period_end))
+        return await self.db.select(self.table, columns, filters, [('period_end', True)], limit)
+
+    async def latest(self, business_id: str, columns: str = "*") -> Optional[Dict[str, Any]]:
+        rows = await self.recent(business_id, limit=1, columns=columns)
+        return rows[0] if rows else None
+
+class FinancialRollupRepository(Repository):
+    """Aggregates maintained in the database by the financial_data_rollups trigger"""
+
+    table = "financial_rollups"
+    granularities = ("month", "quarter", "year")
+    list_columns = (
+        "period_start, period_end, total_revenue, total_expenses, gross_profit, "
+        "net_profit, closing_cash_balance, source_periods"
+    )
+
+    async def series(
+        self,
+        business_id: str,
+        granularity: str,
+        limit: int,
+        period_start: Optional[str] = None,
+        period_end: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Latest `limit` buckets in chronological order"""
+        filters = [('business_id', 'eq', business_id), ('granularity', 'eq', granularity)]
+        if period_start:
+            filters.append(('period_start', 'gte', period_start))
+        if period_end:
+            filters.append(('period_end', 'lte', period_end))
+        rows = await self.db.select(self.table, self.list_columns, filters, [('period_start', True)], limit)
+        return rows[::-1]
+
+class DocumentRepository(Repository):
+    table = "uploaded_documents"
+    # extracted_data holds the full parse result (including PDF text)
+    list_columns = "id, business_id, file_name, file_type, file_size, upload_status, processed_at, created_at"
+
+class AnalysisRepository(Repository):
+    table = "analysis_results"
+    list_columns = "id, business_id, analysis_type, health_score, credit_score, risk_level, insights_status, created_at"
+    insights_columns = "id, insights, insights_status"
+
+    async def latest(self, business_id: str, columns: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        await write_behind.wait_for_rows(self.table, 'business_id', business_id)
+        rows = await self.list({'business_id': business_id}, 1, columns or self.detail_columns)
+        return rows[0] if rows else None
+
+    async def latest_cached(self, business_id: str) -> Optional[Dict[str, Any]]:
+        """Latest full analysis through the read-through cache"""
+        # A queued analysis invalidates the cached one when it is flushed
+        await write_behind.wait_for_rows(self.table, 'business_id', business_id)
+        return await cache.get_or_load("latest_analysis", business_id, lambda: self.latest(business_id))
+
+    async def get_insights(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        return await self.get(analysis_id, self.insights_columns)
+
+    async def create(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        created = await super().create(record)
+        await cache.invalidate("latest_analysis", record['business_id'])
+        return created
+
+    async def create_many(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        created = await super().create_many(records)
+        for business_id in {record['business_id'] for record in records}:
+            await cache.invalidate("latest_analysis", business_id)
+        return created
+
+    async def update(self, record_id: str, values: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Deferred insights land on an existing row, which may be the cached latest one
+        updated = await super().update(record_id, values)
+        if updated:
+            await cache.invalidate("latest_analysis", updated['business_id'])
+        return updated
+
+class ForecastRepository(Repository):
+    table = "forecasts"
+    list_columns = "id, business_id, forecast_type, forecast_period, confidence_level, methodology, created_at"
+
+class ReportRepository(Repository):
+    table = "reports"
+    list_columns = "id, business_id, report_type, report_name, language, file_path, created_at"
+
+class BankingConnectionRepository(Repository):
+    table = "banking_connections"
+    list_columns = "id, business_id, provider, institution_name, connection_status, last_sync, created_at"
+
+    async def active_for_business(self, business_id: str) -> List[Dict[str, Any]]:
+        """Every active connection, oldest first (detail columns include the encrypted token)"""
+        return await self.db.select(
+            self.table,
+            self.detail_columns,
+            {'business_id': business_id, 'connection_status': 'active'},
+            [('created_at', False)]
+        )
+
+    async def active_for_reference(self, provider: str, column: str, value: str) -> List[Dict[str, Any]]:
+        """Active connections a webhook refers to (Plaid item_id, Razorpay account_id)"""
+        return await self.db.select(
+            self.table,
+            "id",
+            {'provider': provider, column: value, 'connection_status': 'active'}
+        )
+
+    async def latest_for_business(self, business_id: str) -> Optional[Dict[str, Any]]:
+        """Most recent connection of any status, without the access token"""
+        rows = await self.list({'business_id': business_id}, 1)
+        return rows[0] if rows else None
+
+class BankingTransactionRepository(Repository):
+    table = "banking_transactions"
+    # Unique key of the partitioned table (includes the partition column)
+    conflict_columns = ("connection_id", "transaction_id", "transaction_date")
+    REMOVE_CHUNK_SIZE = 200  # ids per delete, keeps PostgREST URLs short
+    list_columns = (
+        "id, connection_id, transaction_id, transaction_date, amount, currency, "
+        "description, category, transaction_type, balance, account_id, merchant"
+    )
+
+    async def upsert(self, records: List[Dict[str, Any]]) -> int:
+        """Insert new transactions and refresh changed ones; returns rows written"""
+        if not records:
+            return 0
+        return await self.db.upsert_many(self.table, records, self.conflict_columns)
+
+    async def remove(self, connection_id: str, transaction_ids: List[str]) -> int:
+        """Delete a connection's transactions by provider id, whatever their date"""
+        removed = 0
+        for start in range(0, len(transaction_ids), self.REMOVE_CHUNK_SIZE):
+            rows = await self.db.delete(self.table, [
+                ('connection_id', 'eq', connection_id),
+                ('transaction_id', 'in', transaction_ids[start:start + self.REMOVE_CHUNK_SIZE])
+            ])
+            removed += len(rows)
+        return removed
+
+    async def in_range(
+        self,
+        connection_ids: List[str],
+        start_date: str,
+        end_date: str,
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """Newest first; the date bounds prune partitions"""
+        return await self.db.select(
+            self.table,
+            self.list_columns,
+            [
+                ('connection_id', 'in', connection_ids),
+                ('transaction_date', 'gte', start_date),
+                ('transaction_date', 'lte', end_date)
+            ],
+            [('transaction_date', True), ('id', True)],
+            limit
+        )
+
+# Singleton instances
+business_repository = BusinessRepository()
+financial_data_repository = FinancialDataRepository()
+financial_rollup_repository = FinancialRollupRepository()
+document_repository = DocumentRepository()
+analysis_repository = AnalysisRepository()
+forecast_repository = ForecastRepository()
+report_repository = ReportRepository()
+banking_connection_repository = BankingConnectionRepository()
+banking_transaction_repository = BankingTransactionRepository()
@@ -9,6 +9,7 @@ from .reports import router as reports_router
 from .business import router as business_router
 from .banking import router as banking_router
 from .insights import router as insights_router
+from .translations import router as translations_router
 
 __all__ = [
     "auth_router",
@@ -18,5 +19,6 @@ __all__ = [
     "reports_router",
     "business_router",
     "banking_router",
-    "insights_router"
+    "insights_router",
+    "translations_router"
 ]
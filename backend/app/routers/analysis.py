@@ -1,55 +1,127 @@
 """
 Financial analysis router
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Request, Response, Header
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
 from datetime import datetime
+import asyncio
+import logging
 from app.security import get_current_user
-from app.database import get_supabase
+from app.repositories import (
+    business_repository,
+    financial_data_repository,
+    financial_rollup_repository,
+    analysis_repository
+)
 from app.services.financial_calculator import financial_calculator
 from app.services.llm_service import llm_service
+from app.pagination import clamp_page_size
+from app.write_behind import write_behind, PendingWrite
+from app.idempotency import idempotency, REPLAYED_HEADER
+from app.sse import format_sse, SSE_HEADERS
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Analyses whose AI insights are being generated by this worker
+_pending_insights: Dict[str, asyncio.Event] = {}
+
+INSIGHTS_STREAM_TIMEOUT = 180  # seconds
+INSIGHTS_POLL_INTERVAL = 2  # seconds between database checks
+
 class AnalysisRequest(BaseModel):
     business_id: str
     period_start: Optional[str] = None
     period_end: Optional[str] = None
+    defer_ai_insights: bool = False  # Return calculator results now, AI insights later
+
+async def _generate_ai_insights(saved: PendingWrite, latest_data: Dict[str, Any], business_info: Dict[str, Any]):
+    """Background phase: run the LLM analysis and store it on the analysis row"""
+    analysis_id = saved.id
+    try:
+        ai_analysis = await llm_service.analyze_financial_health(latest_data, business_info)
+        # The row is written behind the response; it must exist before it can be updated
+        await saved.durable()
+        if ai_analysis.get('success'):
+            update = {"insights": ai_analysis.get('analysis', {}), "insights_status": "completed"}
+        else:
+            update = {"insights": {}, "insights_status": "failed"}
+        await analysis_repository.update(analysis_id, update)
+    except Exception as e:
+        logger.error(f"Deferred AI insights failed for analysis {analysis_id}: {str(e)}")
+        try:
+            await analysis_repository.update(analysis_id, {"insights_status": "failed"})
+        except Exception:
+            pass
+    finally:
+        event = _pending_insights.pop(analysis_id, None)
+        if event:
+            event.set()
+
+async def _get_insights_record(analysis_id: str) -> Optional[Dict[str, Any]]:
+    """Load AI insight fields of an analysis"""
+    return await analysis_repository.get_insights(analysis_id)
+
+def _format_insights_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "analysis_id": record['id'],
+        "status": record.get('insights_status') or "completed",
+        "ai_insights": record.get('insights') or {}
+    }
 
 @router.post("/financial-health")
 async def analyze_financial_health(
     request: AnalysisRequest,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
     current_user: Dict = Depends(get_current_user)
 ):
-    """Analyze overall financial health"""
+    """Analyze overall financial health
+
+    With ``defer_ai_insights`` the calculator results are returned
+    immediately and AI insights are generated in the background; fetch them
+    from ``/analysis/{analysis_id}/insights`` (or its ``/stream`` SSE variant).
+    Retries sent with the same ``Idempotency-Key`` header get the first
+    response back instead of a new analysis.
+    """
+    result, replayed = await idempotency.run(
+        f"analysis:{current_user['user_id']}",
+        idempotency_key,
+        request.dict(),
+        lambda: _analyze_financial_health(request, background_tasks)
+    )
+    if replayed:
+        response.headers[REPLAYED_HEADER] = "true"
+    return result
+
+async def _analyze_financial_health(request: AnalysisRequest, background_tasks: BackgroundTasks) -> Dict[str, Any]:
     try:
-        supabase = get_supabase()
-        
         # Get business info
-        business = supabase.table('businesses').select('*').eq('id', request.business_id).single().execute()
-        if not business.data:
+        business = await business_repository.get_cached(request.business_id)
+        if not business:
             raise HTTPException(status_code=404, detail="Business not found")
         
         # Get financial data
-        query = supabase.table('financial_data').select('*').eq('business_id', request.business_id)
-        
-        if request.period_start:
-            query = query.gte('period_start', request.period_start)
-        if request.period_end:
-            query = query.lte('period_end', request.period_end)
-        
-        financial_records = query.order('period_end', desc=True).limit(12).execute()
+        financial_records = await financial_data_repository.recent(
+            request.business_id,
+            limit=12,
+            period_start=request.period_start,
+            period_end=request.period_end
+        )
         
-        if not financial_records.data:
+        if not financial_records:
             raise HTTPException(status_code=404, detail="No financial data found")
         
         # Use most recent record
-        latest_data = financial_records.data[0]
+        latest_data = financial_records[0]
         
         # Add historical data for growth calculations
-        if len(financial_records.data) > 1:
-            latest_data['historical_data'] = financial_records.data
+        if len(financial_records) > 1:
+            latest_data['historical_data'] = financial_records
         
         # Calculate ratios
         ratios = financial_calculator.calculate_financial_ratios(latest_data)
@@ -64,14 +136,24 @@ async def analyze_financial_health(
         # Benchmark against industry
         industry_comparison = financial_calculator.benchmark_against_industry(
             ratios,
-            business.data.get('industry', 'general')
+            business.get('industry', 'general')
         )
         
-        # Get AI insights
-        ai_analysis = await llm_service.analyze_financial_health(
-            latest_data,
-            business.data
-        )
+        # Get AI insights (skipped while the LLM circuit is open so the
+        # deterministic results above are returned without waiting)
+        ai_available = llm_service.is_available()
+        if not ai_available:
+            ai_analysis = {"success": False, "error": "AI service temporarily unavailable"}
+            insights_status = "unavailable"
+        elif request.defer_ai_insights:
+            ai_analysis = {"success": False}
+            insights_status = "pending"
+        else:
+            ai_analysis = await llm_service.analyze_financial_health(
+                latest_data,
+                business
+            )
+            insights_status = "completed" if ai_analysis.get('success') else "failed"
         
         # Prepare result
         analysis_result = {
@@ -81,6 +163,8 @@ async def analyze_financial_health(
             "financial_ratios": ratios,
             "industry_comparison": industry_comparison,
             "ai_insights": ai_analysis.get('analysis', {}) if ai_analysis.get('success') else {},
+            "ai_insights_available": bool(ai_analysis.get('success')),
+            "ai_insights_status": insights_status,
             "period": {
                 "start": latest_data.get('period_start'),
                 "end": latest_data.get('period_end')
@@ -95,13 +179,19 @@ async def analyze_financial_health(
             "credit_score": credit_score,
             "risk_level": risk_assessment['risk_level'],
             "insights": ai_analysis.get('analysis', {}),
+            "insights_status": insights_status,
             "recommendations": risk_assessment.get('recommendations', []),
             "financial_ratios": ratios,
             "benchmarks": industry_comparison,
             "created_at": datetime.utcnow().isoformat()
         }
         
-        supabase.table('analysis_results').insert(analysis_record).execute()
+        saved = write_behind.enqueue(analysis_repository, analysis_record)
+        analysis_result["analysis_id"] = saved.id
+        
+        if insights_status == "pending":
+            _pending_insights[saved.id] = asyncio.Event()
+            background_tasks.add_task(_generate_ai_insights, saved, latest_data, business)
         
         return {
             "success": True,
@@ -113,29 +203,98 @@ async def analyze_financial_health(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/{analysis_id}/insights")
+async def get_analysis_insights(
+    analysis_id: str,
+    current_user: Dict = Depends(get_current_user)
+):
+    """Poll for the AI insights of an analysis (status: pending, completed, failed, unavailable)"""
+    try:
+        record = await _get_insights_record(analysis_id)
+        if not record:
+            raise HTTPException(status_code=404, detail="Analysis not found")
+        
+        return {
+            "success": True,
+            **_format_insights_record(record)
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{analysis_id}/insights/stream")
+async def stream_analysis_insights(
+    analysis_id: str,
+    http_request: Request,
+    current_user: Dict = Depends(get_current_user)
+):
+    """Server-Sent Events variant of the insights poll.
+
+    Sends ``pending`` heartbeats until the insights are ready, then a single
+    ``insights`` event and closes.
+    """
+    try:
+        record = await _get_insights_record(analysis_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not record:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    
+    async def event_stream():
+        current = record
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + INSIGHTS_STREAM_TIMEOUT
+        while (current.get('insights_status') or "completed") == "pending":
+            if loop.time() >= deadline:
+                yield format_sse("timeout", {"analysis_id": analysis_id, "status": "pending"})
+                return
+            yield format_sse("pending", {"analysis_id": analysis_id, "status": "pending"})
+            
+            # Wake immediately if this worker finishes the job, otherwise re-check the row
+            event = _pending_insights.get(analysis_id)
+            try:
+                if event:
+                    await asyncio.wait_for(event.wait(), timeout=INSIGHTS_POLL_INTERVAL)
+                else:
+                    await asyncio.sleep(INSIGHTS_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            
+            if await http_request.is_disconnected():
+                return
+            current = await _get_insights_record(analysis_id) or current
+        
+        yield format_sse("insights", {"success": True, **_format_insights_record(current)})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
 @router.get("/history/{business_id}")
 async def get_analysis_history(
     business_id: str,
     limit: int = 10,
+    cursor: Optional[str] = None,
     current_user: Dict = Depends(get_current_user)
 ):
-    """Get analysis history"""
+    """Get analysis history, newest first (pass next_cursor back for the next page)"""
     try:
-        supabase = get_supabase()
-        
-        response = supabase.table('analysis_results')\
-            .select('*')\
-            .eq('business_id', business_id)\
-            .order('created_at', desc=True)\
-            .limit(limit)\
-            .execute()
+        page = await analysis_repository.page_for_business(business_id, clamp_page_size(limit), cursor)
         
         return {
             "success": True,
-            "analyses": response.data,
-            "count": len(response.data)
+            "analyses": page["items"],
+            "count": len(page["items"]),
+            "next_cursor": page["next_cursor"],
+            "has_more": page["has_more"]
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -146,28 +305,20 @@ async def get_financial_ratios(
 ):
     """Get detailed financial ratios"""
     try:
-        supabase = get_supabase()
-        
         # Get latest financial data
-        financial_record = supabase.table('financial_data')\
-            .select('*')\
-            .eq('business_id', business_id)\
-            .order('period_end', desc=True)\
-            .limit(1)\
-            .single()\
-            .execute()
-        
-        if not financial_record.data:
+        financial_record = await financial_data_repository.latest(business_id)
+        
+        if not financial_record:
             raise HTTPException(status_code=404, detail="No financial data found")
         
-        ratios = financial_calculator.calculate_financial_ratios(financial_record.data)
+        ratios = financial_calculator.calculate_financial_ratios(financial_record)
         
         return {
             "success": True,
             "ratios": ratios,
             "period": {
-                "start": financial_record.data.get('period_start'),
-                "end": financial_record.data.get('period_end')
+                "start": financial_record.get('period_start'),
+                "end": financial_record.get('period_end')
             }
         }
         
@@ -175,3 +326,62 @@ async def get_financial_ratios(
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/rollups/{business_id}")
+async def get_financial_rollups(
+    business_id: str,
+    granularity: str = "month",
+    period_start: Optional[str] = None,
+    period_end: Optional[str] = None,
+    limit: Optional[int] = None,
+    current_user: Dict = Depends(get_current_user)
+):
+    """Precomputed monthly, quarterly or annual totals for trend charts, oldest first"""
+    try:
+        if granularity not in financial_rollup_repository.granularities:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid granularity. Allowed: {list(financial_rollup_repository.granularities)}"
+            )
+        
+        rollups = await financial_rollup_repository.series(
+            business_id,
+            granularity,
+            clamp_page_size(limit),
+            period_start=period_start,
+            period_end=period_end
+        )
+        
+        return {
+            "success": True,
+            "granularity": granularity,
+            "rollups": rollups,
+            "count": len(rollups)
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{analysis_id}")
+async def get_analysis(
+    analysis_id: str,
+    current_user: Dict = Depends(get_current_user)
+):
+    """Get a stored analysis with its ratios, benchmarks and insights"""
+    try:
+        analysis = await analysis_repository.get(analysis_id)
+        
+        if not analysis:
+            raise HTTPException(status_code=404, detail="Analysis not found")
+        
+        return {
+            "success": True,
+            "analysis": analysis
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
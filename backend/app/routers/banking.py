@@ -1,13 +1,16 @@
 """
 Banking integration router
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
+import json
 from app.security import get_current_user
-from app.database import get_supabase
+from app.repositories import banking_connection_repository, banking_transaction_repository
 from app.services.banking_service import banking_service
+from app.services.transaction_sync import transaction_sync
+from app.sync_jobs import sync_jobs
 
 router = APIRouter()
 
@@ -44,51 +47,180 @@ async def exchange_plaid_token(
     
     if result.get('success'):
         # Save connection to database
-        supabase = get_supabase()
         connection_data = {
             "business_id": request.business_id,
             "provider": "plaid",
             "access_token_encrypted": result['access_token'],
+            "item_id": result.get('item_id'),
             "connection_status": "active",
             "created_at": datetime.utcnow().isoformat()
         }
-        supabase.table('banking_connections').insert(connection_data).execute()
+        await banking_connection_repository.create(connection_data)
         return {"success": True, "message": "Bank connected successfully"}
     else:
         raise HTTPException(status_code=500, detail=result.get('error'))
 
+MAX_TRANSACTIONS = 5000
+
+def _format_transaction(row: Dict[str, Any], connection: Dict[str, Any]) -> Dict[str, Any]:
+    """Stored row -> API shape, attributed to its bank connection"""
+    return {
+        "transaction_id": row.get("transaction_id"),
+        "date": row.get("transaction_date"),
+        "amount": row.get("amount"),
+        "currency": row.get("currency"),
+        "description": row.get("description"),
+        "category": row.get("category"),
+        "type": row.get("transaction_type"),
+        "merchant": row.get("merchant"),
+        "account_id": row.get("account_id"),
+        "connection_id": connection['id'],
+        "provider": connection.get("provider"),
+        "institution_name": connection.get("institution_name")
+    }
+
+def _connection_status(connection: Dict[str, Any], sync: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-account sync outcome, so one failing bank does not hide the others"""
+    if not sync.get('success'):
+        status = "failed"
+    elif sync.get('skipped'):
+        status = "fresh"
+    else:
+        status = "synced"
+    return {
+        "connection_id": connection['id'],
+        "provider": connection.get("provider"),
+        "institution_name": connection.get("institution_name"),
+        "status": status,
+        "last_sync": connection.get('last_sync'),
+        "error": sync.get('error')
+    }
+
+@router.post("/sync/{business_id}")
+async def sync_transactions(
+    business_id: str,
+    current_user: Dict = Depends(get_current_user)
+):
+    """Pull transaction changes for every active bank account into the local store"""
+    try:
+        connections = await banking_connection_repository.active_for_business(business_id)
+        
+        if not connections:
+            raise HTTPException(status_code=404, detail="No banking connection found")
+        
+        syncs = await transaction_sync.refresh_all(connections, force=True)
+        statuses = [_connection_status(connection, syncs[connection['id']]) for connection in connections]
+        
+        if all(status['status'] == "failed" for status in statuses):
+            raise HTTPException(status_code=502, detail=statuses[0]['error'])
+        
+        return {"success": True, "connections": statuses}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/transactions/{business_id}")
 async def get_transactions(
     business_id: str,
     days: int = 30,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit: int = 500,
     current_user: Dict = Depends(get_current_user)
 ):
-    """Get banking transactions"""
+    """Get banking transactions across all active accounts, newest first.
+    
+    Served from the local store; accounts whose last sync is stale are
+    refreshed concurrently first, and failures are reported per account.
+    """
     try:
-        supabase = get_supabase()
-        
-        # Get banking connection
-        connection = supabase.table('banking_connections')\
-            .select('*')\
-            .eq('business_id', business_id)\
-            .eq('connection_status', 'active')\
-            .limit(1)\
-            .execute()
+        connections = await banking_connection_repository.active_for_business(business_id)
         
-        if not connection.data:
+        if not connections:
             return {"success": True, "transactions": [], "message": "No banking connection found"}
         
-        # Get transactions from Plaid
-        end_date = datetime.now().strftime("%Y-%m-%d")
-        start_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        syncs = await transaction_sync.refresh_all(connections)
+        
+        end_date = end_date or datetime.now().strftime("%Y-%m-%d")
+        start_date = start_date or (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
         
-        result = await banking_service.get_plaid_transactions(
-            encrypted_access_token=connection.data[0]['access_token_encrypted'],
-            start_date=start_date,
-            end_date=end_date
+        by_id = {connection['id']: connection for connection in connections}
+        rows = await banking_transaction_repository.in_range(
+            list(by_id), start_date, end_date, min(max(limit, 1), MAX_TRANSACTIONS)
         )
+        transactions = [_format_transaction(row, by_id[row['connection_id']]) for row in rows]
         
-        return result
+        return {
+            "success": True,
+            "transactions": transactions,
+            "total_count": len(transactions),
+            "connections": [_connection_status(connection, syncs[connection['id']]) for connection in connections]
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ============= WEBHOOKS =============
+# Providers push change notifications; the sync runs on the local job queue
+# and reads keep being served from the local store.
+
+def _parse_webhook(body: bytes) -> Dict[str, Any]:
+    try:
+        return json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
+
+@router.post("/webhooks/plaid")
+async def plaid_webhook(
+    request: Request,
+    plaid_verification: Optional[str] = Header(None)
+):
+    """Plaid TRANSACTIONS webhook: queue an incremental sync for the item"""
+    try:
+        body = await request.body()
+        if not plaid_verification or not await banking_service.verify_plaid_webhook(body, plaid_verification):
+            raise HTTPException(status_code=401, detail="Invalid webhook signature")
+        
+        event = _parse_webhook(body)
+        if event.get("webhook_type") != "TRANSACTIONS" or not event.get("item_id"):
+            return {"success": True, "queued": 0}
+        
+        connections = await banking_connection_repository.active_for_reference("plaid", "item_id", event["item_id"])
+        queued = sum(sync_jobs.schedule(connection['id']) for connection in connections)
+        return {"success": True, "queued": queued}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/webhooks/razorpay")
+async def razorpay_webhook(
+    request: Request,
+    x_razorpay_signature: Optional[str] = Header(None)
+):
+    """Razorpay transaction.* webhook: queue a statement sync for the account"""
+    try:
+        body = await request.body()
+        if not x_razorpay_signature or not banking_service.verify_razorpay_webhook(body, x_razorpay_signature):
+            raise HTTPException(status_code=401, detail="Invalid webhook signature")
+        
+        event = _parse_webhook(body)
+        if not str(event.get("event", "")).startswith("transaction."):
+            return {"success": True, "queued": 0}
+        
+        entity = ((event.get("payload") or {}).get("transaction") or {}).get("entity") or {}
+        account_id = entity.get("account_number") or event.get("account_id")
+        if not account_id:
+            return {"success": True, "queued": 0}
+        
+        connections = await banking_connection_repository.active_for_reference("razorpay", "account_id", account_id)
+        queued = sum(sync_jobs.schedule(connection['id']) for connection in connections)
+        return {"success": True, "queued": queued}
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -6,7 +6,7 @@ from pydantic import BaseModel
 from typing import Dict, Any, Optional
 from datetime import datetime
 from app.security import get_current_user
-from app.database import get_supabase
+from app.repositories import business_repository, PORTFOLIO_SORT_COLUMNS
 
 router = APIRouter()
 
@@ -31,18 +31,16 @@ async def create_business(
 ):
     """Create new business profile"""
     try:
-        supabase = get_supabase()
-        
         business_data = business.dict()
         business_data['user_id'] = current_user['user_id']
         business_data['created_at'] = datetime.utcnow().isoformat()
         business_data['updated_at'] = datetime.utcnow().isoformat()
         
-        response = supabase.table('businesses').insert(business_data).execute()
+        created = await business_repository.create(business_data)
         
         return {
             "success": True,
-            "business": response.data[0] if response.data else business_data
+            "business": created or business_data
         }
         
     except Exception as e:
@@ -52,20 +50,51 @@ async def create_business(
 async def get_businesses(current_user: Dict = Depends(get_current_user)):
     """Get all businesses for current user"""
     try:
-        supabase = get_supabase()
+        businesses = await business_repository.list_for_user(current_user['user_id'])
+        
+        return {
+            "success": True,
+            "businesses": businesses,
+            "count": len(businesses)
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/portfolio")
+async def get_portfolio(
+    industry: Optional[str] = None,
+    risk_level: Optional[str] = None,
+    sort_by: str = "health_score",
+    order: str = "desc",
+    current_user: Dict = Depends(get_current_user)
+):
+    """All businesses of the current user with their latest scores and data period"""
+    try:
+        if sort_by not in PORTFOLIO_SORT_COLUMNS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid sort_by. Allowed: {list(PORTFOLIO_SORT_COLUMNS)}"
+            )
+        if order not in ("asc", "desc"):
+            raise HTTPException(status_code=400, detail="Invalid order. Allowed: asc, desc")
         
-        response = supabase.table('businesses')\
-            .select('*')\
-            .eq('user_id', current_user['user_id'])\
-            .order('created_at', desc=True)\
-            .execute()
+        businesses = await business_repository.portfolio(
+            current_user['user_id'],
+            industry=industry,
+            risk_level=risk_level,
+            sort_by=sort_by,
+            descending=order == "desc"
+        )
         
         return {
             "success": True,
-            "businesses": response.data,
-            "count": len(response.data)
+            "businesses": businesses,
+            "count": len(businesses)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -76,20 +105,14 @@ async def get_business(
 ):
     """Get business by ID"""
     try:
-        supabase = get_supabase()
+        business = await business_repository.get(business_id)
         
-        response = supabase.table('businesses')\
-            .select('*')\
-            .eq('id', business_id)\
-            .single()\
-            .execute()
-        
-        if not response.data:
+        if not business:
             raise HTTPException(status_code=404, detail="Business not found")
         
         return {
             "success": True,
-            "business": response.data
+            "business": business
         }
         
     except HTTPException:
@@ -105,19 +128,14 @@ async def update_business(
 ):
     """Update business profile"""
     try:
-        supabase = get_supabase()
-        
         business_data = business.dict(exclude_unset=True)
         business_data['updated_at'] = datetime.utcnow().isoformat()
         
-        response = supabase.table('businesses')\
-            .update(business_data)\
-            .eq('id', business_id)\
-            .execute()
+        updated = await business_repository.update(business_id, business_data)
         
         return {
             "success": True,
-            "business": response.data[0] if response.data else business_data
+            "business": updated or business_data
         }
         
     except Exception as e:
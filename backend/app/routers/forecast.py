@@ -1,12 +1,15 @@
 """
 Financial forecasting router
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response, Header
 from pydantic import BaseModel
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 from app.security import get_current_user
-from app.database import get_supabase
+from app.repositories import financial_data_repository, forecast_repository
+from app.pagination import clamp_page_size
+from app.write_behind import write_behind
+from app.idempotency import idempotency, REPLAYED_HEADER
 from app.services.llm_service import llm_service
 
 router = APIRouter()
@@ -19,21 +22,31 @@ class ForecastRequest(BaseModel):
 @router.post("/generate")
 async def generate_forecast(
     request: ForecastRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
     current_user: Dict = Depends(get_current_user)
 ):
-    """Generate financial forecast"""
+    """Generate financial forecast (retries with the same Idempotency-Key replay the first response)"""
+    result, replayed = await idempotency.run(
+        f"forecast:{current_user['user_id']}",
+        idempotency_key,
+        request.dict(),
+        lambda: _generate_forecast(request)
+    )
+    if replayed:
+        response.headers[REPLAYED_HEADER] = "true"
+    return result
+
+async def _generate_forecast(request: ForecastRequest) -> Dict[str, Any]:
     try:
-        supabase = get_supabase()
-        
         # Get historical financial data
-        financial_data = supabase.table('financial_data')\
-            .select('*')\
-            .eq('business_id', request.business_id)\
-            .order('period_end', desc=True)\
-            .limit(24)\
-            .execute()
+        financial_data = await financial_data_repository.recent(
+            request.business_id,
+            limit=24,
+            columns="period_end, total_revenue, total_expenses, net_profit"
+        )
         
-        if not financial_data.data or len(financial_data.data) < 3:
+        if len(financial_data) < 3:
             raise HTTPException(
                 status_code=400,
                 detail="Insufficient historical data for forecasting (minimum 3 periods required)"
@@ -47,7 +60,7 @@ async def generate_forecast(
                 "profit": record.get('net_profit', 0),
                 "period": record.get('period_end')
             }
-            for record in financial_data.data
+            for record in financial_data
         ]
         
         # Generate forecast using LLM
@@ -56,6 +69,8 @@ async def generate_forecast(
             forecast_period=request.forecast_period
         )
         
+        if forecast_result.get('circuit_open'):
+            raise HTTPException(status_code=503, detail="AI service temporarily unavailable, please retry shortly")
         if not forecast_result.get('success'):
             raise HTTPException(status_code=500, detail="Forecast generation failed")
         
@@ -70,10 +85,11 @@ async def generate_forecast(
             "created_at": datetime.utcnow().isoformat()
         }
         
-        supabase.table('forecasts').insert(forecast_record).execute()
+        saved = write_behind.enqueue(forecast_repository, forecast_record)
         
         return {
             "success": True,
+            "forecast_id": saved.id,
             "forecast": forecast_result.get('content'),
             "period": request.forecast_period,
             "historical_periods": len(historical_records)
@@ -88,24 +104,44 @@ async def generate_forecast(
 async def get_forecast_history(
     business_id: str,
     limit: int = 10,
+    cursor: Optional[str] = None,
+    current_user: Dict = Depends(get_current_user)
+):
+    """Get forecast history, newest first (pass next_cursor back for the next page)"""
+    try:
+        page = await forecast_repository.page_for_business(business_id, clamp_page_size(limit), cursor)
+        
+        return {
+            "success": True,
+            "forecasts": page["items"],
+            "count": len(page["items"]),
+            "next_cursor": page["next_cursor"],
+            "has_more": page["has_more"]
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{forecast_id}")
+async def get_forecast(
+    forecast_id: str,
     current_user: Dict = Depends(get_current_user)
 ):
-    """Get forecast history"""
+    """Get a forecast with its full data"""
     try:
-        supabase = get_supabase()
+        forecast = await forecast_repository.get(forecast_id)
         
-        response = supabase.table('forecasts')\
-            .select('*')\
-            .eq('business_id', business_id)\
-            .order('created_at', desc=True)\
-            .limit(limit)\
-            .execute()
+        if not forecast:
+            raise HTTPException(status_code=404, detail="Forecast not found")
         
         return {
             "success": True,
-            "forecasts": response.data,
-            "count": len(response.data)
+            "forecast": forecast
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,12 +1,17 @@
 """
 AI Insights router (Chat interface)
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
+import logging
 from app.security import get_current_user
-from app.database import get_supabase
+from app.context import load_business_context
 from app.services.llm_service import llm_service
+from app.sse import format_sse, SSE_HEADERS
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -17,6 +22,13 @@ class ChatMessage(BaseModel):
 class ChatHistory(BaseModel):
     messages: List[Dict[str, str]]
 
+async def _get_chat_context(business_id: Optional[str]) -> Dict[str, Any]:
+    """Business profile, latest scores and period revenue for the chat prompt"""
+    if not business_id:
+        return {}
+    context = await load_business_context(business_id)
+    return context.to_prompt_context()
+
 @router.post("/chat")
 async def chat_with_ai(
     request: ChatMessage,
@@ -25,29 +37,7 @@ async def chat_with_ai(
     """Chat with AI financial advisor"""
     try:
         # Get business context if provided
-        business_context = {}
-        if request.business_id:
-            supabase = get_supabase()
-            
-            # Get business info
-            business = supabase.table('businesses').select('*').eq('id', request.business_id).single().execute()
-            if business.data:
-                business_context = business.data
-            
-            # Get latest analysis
-            analysis = supabase.table('analysis_results')\
-                .select('*')\
-                .eq('business_id', request.business_id)\
-                .order('created_at', desc=True)\
-                .limit(1)\
-                .execute()
-            
-            if analysis.data:
-                business_context.update({
-                    'health_score': analysis.data[0].get('health_score'),
-                    'credit_score': analysis.data[0].get('credit_score'),
-                    'risk_level': analysis.data[0].get('risk_level')
-                })
+        business_context = await _get_chat_context(request.business_id)
         
         # Generate AI response
         response = await llm_service.chat_response(
@@ -60,16 +50,66 @@ async def chat_with_ai(
             return {
                 "success": True,
                 "message": response.get('content'),
-                "model": response.get('model')
+                "model": response.get('model'),
+                "prompt_stats": response.get('prompt_stats', {})
             }
         else:
-            raise HTTPException(status_code=500, detail=response.get('error'))
+            raise HTTPException(status_code=503 if response.get('circuit_open') else 500, detail=response.get('error'))
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/chat/stream")
+async def stream_chat_with_ai(
+    request: ChatMessage,
+    http_request: Request,
+    current_user: Dict = Depends(get_current_user)
+):
+    """Chat with AI financial advisor, streaming tokens as Server-Sent Events.
+
+    Emits ``token`` events while the answer is generated and a final ``done``
+    event with the full message, model and usage (or an ``error`` event).
+    """
+    try:
+        business_context = await _get_chat_context(request.business_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def event_stream():
+        stream = llm_service.stream_chat_response(
+            user_message=request.message,
+            conversation_history=[],
+            business_context=business_context
+        )
+        try:
+            async for event in stream:
+                if await http_request.is_disconnected():
+                    logger.info("Chat stream client disconnected, cancelling upstream request")
+                    break
+                
+                event_type = event.pop("event")
+                if event_type == "done":
+                    yield format_sse("done", {
+                        "success": True,
+                        "message": event.get("content"),
+                        "model": event.get("model"),
+                        "usage": event.get("usage", {}),
+                        "prompt_stats": event.get("prompt_stats", {})
+                    })
+                else:
+                    yield format_sse(event_type, event)
+        finally:
+            # Closes the upstream OpenRouter connection on disconnect/cancel
+            await stream.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
 @router.post("/recommendations")
 async def get_recommendations(
     business_id: str,
@@ -77,24 +117,17 @@ async def get_recommendations(
 ):
     """Get AI-generated business recommendations"""
     try:
-        supabase = get_supabase()
-        
         # Get business info and latest analysis
-        business = supabase.table('businesses').select('*').eq('id', business_id).single().execute()
-        analysis = supabase.table('analysis_results')\
-            .select('*')\
-            .eq('business_id', business_id)\
-            .order('created_at', desc=True)\
-            .limit(1)\
-            .execute()
+        context = await load_business_context(business_id)
+        business, analysis = context.business, context.analysis
         
-        if not business.data:
+        if not business:
             raise HTTPException(status_code=404, detail="Business not found")
         
         # Prepare business context
         business_context = {
-            "industry": business.data.get('industry'),
-            "situation": f"Health Score: {analysis.data[0].get('health_score', 'N/A')}, Risk: {analysis.data[0].get('risk_level', 'Unknown')}" if analysis.data else "No analysis available",
+            "industry": business.get('industry'),
+            "situation": f"Health Score: {analysis.get('health_score', 'N/A')}, Risk: {analysis.get('risk_level', 'Unknown')}" if analysis else "No analysis available",
             "goals": "Improve financial health and profitability"
         }
         
@@ -107,7 +140,7 @@ async def get_recommendations(
                 "recommendations": recommendations.get('content')
             }
         else:
-            raise HTTPException(status_code=500, detail=recommendations.get('error'))
+            raise HTTPException(status_code=503 if recommendations.get('circuit_open') else 500, detail=recommendations.get('error'))
         
     except HTTPException:
         raise
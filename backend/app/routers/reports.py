@@ -1,12 +1,16 @@
 """
 Reports generation router
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response, Header
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
 from datetime import datetime
 from app.security import get_current_user
-from app.database import get_supabase
+from app.context import load_business_context
+from app.repositories import report_repository
+from app.pagination import clamp_page_size
+from app.write_behind import write_behind
+from app.idempotency import idempotency, REPLAYED_HEADER
 from app.services.translation_service import translation_service
 
 router = APIRouter()
@@ -20,31 +24,38 @@ class ReportRequest(BaseModel):
 @router.post("/generate")
 async def generate_report(
     request: ReportRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
     current_user: Dict = Depends(get_current_user)
 ):
-    """Generate financial report"""
+    """Generate financial report (retries with the same Idempotency-Key replay the first response)"""
+    result, replayed = await idempotency.run(
+        f"report:{current_user['user_id']}",
+        idempotency_key,
+        request.dict(),
+        lambda: _generate_report(request)
+    )
+    if replayed:
+        response.headers[REPLAYED_HEADER] = "true"
+    return result
+
+async def _generate_report(request: ReportRequest) -> Dict[str, Any]:
     try:
-        supabase = get_supabase()
-        
         # Get business and analysis data
-        business = supabase.table('businesses').select('*').eq('id', request.business_id).single().execute()
-        analysis = supabase.table('analysis_results')\
-            .select('*')\
-            .eq('business_id', request.business_id)\
-            .order('created_at', desc=True)\
-            .limit(1)\
-            .execute()
+        context = await load_business_context(request.business_id)
+        business, analysis = context.business, context.analysis
         
-        if not business.data:
+        if not business:
             raise HTTPException(status_code=404, detail="Business not found")
         
         # Prepare report data
         report_data = {
-            "business_name": business.data.get('business_name'),
-            "industry": business.data.get('industry'),
+            "business_name": business.get('business_name'),
+            "industry": business.get('industry'),
             "generated_date": datetime.utcnow().isoformat(),
             "report_type": request.report_type,
-            "analysis": analysis.data[0] if analysis.data else {},
+            "analysis": analysis or {},
+            "financial_period": context.financial_period or {},
             "language": request.language
         }
         
@@ -64,12 +75,34 @@ async def generate_report(
             "created_at": datetime.utcnow().isoformat()
         }
         
-        db_response = supabase.table('reports').insert(report_record).execute()
+        saved = write_behind.enqueue(report_repository, report_record)
         
         return {
             "success": True,
             "report": report_data,
-            "report_id": db_response.data[0]['id'] if db_response.data else None
+            "report_id": saved.id
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/detail/{report_id}")
+async def get_report(
+    report_id: str,
+    current_user: Dict = Depends(get_current_user)
+):
+    """Get a report with its full content"""
+    try:
+        report = await report_repository.get(report_id)
+        
+        if not report:
+            raise HTTPException(status_code=404, detail="Report not found")
+        
+        return {
+            "success": True,
+            "report": report
         }
         
     except HTTPException:
@@ -80,23 +113,23 @@ async def generate_report(
 @router.get("/{business_id}")
 async def get_reports(
     business_id: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     current_user: Dict = Depends(get_current_user)
 ):
-    """Get all reports for business"""
+    """Get reports for business, newest first (pass next_cursor back for the next page)"""
     try:
-        supabase = get_supabase()
-        
-        response = supabase.table('reports')\
-            .select('*')\
-            .eq('business_id', business_id)\
-            .order('created_at', desc=True)\
-            .execute()
+        page = await report_repository.page_for_business(business_id, clamp_page_size(limit), cursor)
         
         return {
             "success": True,
-            "reports": response.data,
-            "count": len(response.data)
+            "reports": page["items"],
+            "count": len(page["items"]),
+            "next_cursor": page["next_cursor"],
+            "has_more": page["has_more"]
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,103 @@
+"""
+Translations router (language packs, static lookups, translation memory)
+"""
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+from typing import Dict, Any, List, Optional
+import asyncio
+from app.security import get_current_user, require_admin
+from app.services.translation_service import translation_service
+
+router = APIRouter()
+
+class TranslationMemoryImport(BaseModel):
+    entries: List[Dict[str, Any]]  # source_text, target_language, translated_text[, glossary_version]
+
+class StaticLookupRequest(BaseModel):
+    texts: List[str]
+    language: str
+
+# Packs only change on deploy; clients revalidate cheaply with If-None-Match
+LANGUAGE_PACK_CACHE_CONTROL = "public, max-age=300, must-revalidate"
+
+@router.get("/packs/{language}")
+async def get_language_pack(language: str, if_none_match: Optional[str] = Header(None)):
+    """All static UI translations for a language (ETag cached)"""
+    pack = translation_service.get_language_pack(language)
+    if not pack:
+        raise HTTPException(status_code=404, detail="Language pack not found")
+
+    headers = {"ETag": pack["etag"], "Cache-Control": LANGUAGE_PACK_CACHE_CONTROL}
+    if if_none_match and pack["etag"] in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    return JSONResponse(
+        content={
+            "success": True,
+            "language": language,
+            "translations": pack["translations"]
+        },
+        headers=headers
+    )
+
+@router.post("/lookup")
+async def lookup_static_translations(request: StaticLookupRequest):
+    """Translate many UI labels from the static table in one call"""
+    if request.language not in translation_service.supported_languages:
+        raise HTTPException(status_code=400, detail="Unsupported language")
+
+    translations = translation_service.get_static_translations(request.texts, request.language)
+    return {
+        "success": True,
+        "language": request.language,
+        "translations": translations,
+        "missing": [text for text, value in translations.items() if value is None]
+    }
+
+@router.get("/memory/metrics")
+async def get_translation_memory_metrics(current_user: Dict = Depends(get_current_user)):
+    """Translation memory hit rates and size"""
+    try:
+        metrics = await asyncio.to_thread(translation_service.memory.get_metrics)
+        return {
+            "success": True,
+            "metrics": metrics
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/memory/export")
+async def export_translation_memory(
+    language: Optional[str] = None,
+    current_user: Dict = Depends(get_current_user)
+):
+    """Export stored translations (optionally for one language)"""
+    try:
+        entries = await asyncio.to_thread(translation_service.memory.export_entries, language)
+        return {
+            "success": True,
+            "entries": entries,
+            "count": len(entries)
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/memory/import")
+async def import_translation_memory(
+    request: TranslationMemoryImport,
+    current_user: Dict = Depends(require_admin)
+):
+    """Seed the translation memory with reviewed translations (admin only)"""
+    try:
+        imported = await asyncio.to_thread(translation_service.memory.import_entries, request.entries)
+        return {
+            "success": True,
+            "imported": imported,
+            "skipped": len(request.entries) - imported
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -8,7 +8,8 @@ import os
 import uuid
 from datetime import datetime
 from app.security import get_current_user, validate_file_type, validate_file_size
-from app.database import get_supabase
+from app.repositories import document_repository
+from app.pagination import clamp_page_size
 from app.services.data_processor import data_processor
 from app.services.pdf_parser import pdf_parser
 from app.config import settings
@@ -55,15 +56,12 @@ async def upload_document(
         if not result.get("success"):
             raise HTTPException(status_code=400, detail=result.get("error", "Processing failed"))
         
-        # Store in database
-        supabase = get_supabase()
-        
         # Generate unique file path
         file_id = str(uuid.uuid4())
         file_path = f"{settings.UPLOAD_DIR}/{current_user['user_id']}/{file_id}{file_ext}"
         
         # Save to Supabase storage (optional)
-        # storage_response = supabase.storage.from_('documents').upload(file_path, file_content)
+        # storage_response = get_supabase().storage.from_('documents').upload(file_path, file_content)
         
         # Save metadata to database
         doc_data = {
@@ -79,7 +77,7 @@ async def upload_document(
             "created_at": datetime.utcnow().isoformat()
         }
         
-        db_response = supabase.table('uploaded_documents').insert(doc_data).execute()
+        await document_repository.create(doc_data)
         
         return {
             "success": True,
@@ -97,28 +95,27 @@ async def upload_document(
 @router.get("/documents")
 async def get_uploaded_documents(
     business_id: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     current_user: Dict = Depends(get_current_user)
 ):
-    """Get all uploaded documents"""
+    """Get uploaded documents, newest first (pass next_cursor back for the next page)"""
     try:
-        supabase = get_supabase()
-        
-        query = supabase.table('uploaded_documents').select('*')
-        
-        if business_id:
-            query = query.eq('business_id', business_id)
-        else:
-            # Get all documents for user's businesses
-            query = query.eq('business_id', current_user['user_id'])
-        
-        response = query.order('created_at', desc=True).execute()
+        # Without business_id, documents uploaded without one are keyed by the user id
+        page = await document_repository.page_for_business(
+            business_id or current_user['user_id'], clamp_page_size(limit), cursor
+        )
         
         return {
             "success": True,
-            "documents": response.data,
-            "count": len(response.data)
+            "documents": page["items"],
+            "count": len(page["items"]),
+            "next_cursor": page["next_cursor"],
+            "has_more": page["has_more"]
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -129,16 +126,14 @@ async def get_document(
 ):
     """Get specific document details"""
     try:
-        supabase = get_supabase()
+        document = await document_repository.get(document_id)
         
-        response = supabase.table('uploaded_documents').select('*').eq('id', document_id).single().execute()
-        
-        if not response.data:
+        if not document:
             raise HTTPException(status_code=404, detail="Document not found")
         
         return {
             "success": True,
-            "document": response.data
+            "document": document
         }
         
     except HTTPException:
@@ -153,9 +148,7 @@ async def delete_document(
 ):
     """Delete uploaded document"""
     try:
-        supabase = get_supabase()
-        
-        response = supabase.table('uploaded_documents').delete().eq('id', document_id).execute()
+        await document_repository.delete(document_id)
         
         return {
             "success": True,
@@ -82,6 +82,15 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         "role": payload.get("role", "user")
     }
 
+async def require_admin(current_user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
+    """Authenticated user with the admin role"""
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return current_user
+
 def encrypt_sensitive_data(data: str) -> str:
     """Encrypt sensitive data (banking tokens, API keys, etc.)"""
     if not data:
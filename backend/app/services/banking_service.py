@@ -1,15 +1,31 @@
 """
 Banking API integration service (Plaid for international, Razorpay for India)
 """
+import asyncio
+import hashlib
+import hmac
+import itertools
 import logging
-from typing import Dict, Any, List, Optional
+import time
+from collections import deque
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, Deque, List, Optional, Tuple
 from datetime import datetime, timedelta
 import httpx
+from jose import jwt
 from app.config import settings
 from app.security import encrypt_sensitive_data, decrypt_sensitive_data
 
 logger = logging.getLogger(__name__)
 
+PLAID_SYNC_PAGE_SIZE = 500  # /transactions/sync maximum
+PLAID_SYNC_MAX_RESTARTS = 3
+RAZORPAY_PAGE_SIZE = 100  # /transactions maximum
+PLAID_WEBHOOK_MAX_AGE_SECONDS = 300  # Plaid's recommended replay window
+PLAID_WEBHOOK_KEY_TTL_SECONDS = 300  # re-fetch cached keys so a rotation's expired_at is seen
+
+class BankingAPIError(Exception):
+    """Provider returned an error or is not configured"""
+
 class BankingService:
     """Banking API integration service"""
     
@@ -24,6 +40,12 @@ class BankingService:
         self.razorpay_key_id = settings.RAZORPAY_KEY_ID
         self.razorpay_key_secret = settings.RAZORPAY_KEY_SECRET
         self.razorpay_base_url = "https://api.razorpay.com/v1"
+        
+        # Pages fetched at once per statement
+        self.page_concurrency = settings.BANKING_PAGE_CONCURRENCY
+        
+        # Plaid webhook verification keys: key id -> (JWK, monotonic time fetched)
+        self._plaid_webhook_keys: Dict[str, Tuple[Dict[str, Any], float]] = {}
     
     def _get_plaid_url(self) -> str:
         """Get Plaid API URL based on environment"""
@@ -32,6 +54,9 @@ class BankingService:
             "development": "https://development.plaid.com",
             "production": "https://production.plaid.com"
         }
+        if settings.PLAID_BASE_URL:
+            # Explicit override, e.g. a local mock server
+            return settings.PLAID_BASE_URL.rstrip("/")
         return urls.get(self.plaid_env, urls["sandbox"])
     
     # ============= PLAID INTEGRATION =============
@@ -56,6 +81,8 @@ class BankingService:
                 "country_codes": ["US", "CA", "GB", "IN"],
                 "language": "en",
             }
+            if settings.PLAID_WEBHOOK_URL:
+                payload["webhook"] = settings.PLAID_WEBHOOK_URL
             
             async with httpx.AsyncClient(timeout=30.0) as client:
                 response = await client.post(
@@ -160,127 +187,139 @@ class BankingService:
                 "error": str(e)
             }
     
-    async def get_plaid_transactions(
+    @staticmethod
+    def _format_plaid_transaction(txn: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "transaction_id": txn.get("transaction_id"),
+            "date": txn.get("date"),
+            "amount": txn.get("amount"),
+            "description": txn.get("name"),
+            "category": txn.get("category", ["Uncategorized"])[0] if txn.get("category") else "Uncategorized",
+            # Plaid reports one or the other; unofficial codes cover e.g. crypto
+            "currency": txn.get("iso_currency_code") or txn.get("unofficial_currency_code"),
+            "merchant": txn.get("merchant_name"),
+            "account_id": txn.get("account_id")
+        }
+    
+    async def sync_plaid_transactions(
         self,
         encrypted_access_token: str,
-        start_date: str,
-        end_date: str
-    ) -> Dict[str, Any]:
-        """Get transactions from Plaid"""
-        try:
-            access_token = decrypt_sensitive_data(encrypted_access_token)
-            
-            payload = {
-                "client_id": self.plaid_client_id,
-                "secret": self.plaid_secret,
-                "access_token": access_token,
-                "start_date": start_date,
-                "end_date": end_date,
-                "options": {
-                    "count": 500,
-                    "offset": 0
+        cursor: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream transaction changes since `cursor` from Plaid /transactions/sync, a page at a time.
+        
+        Each page carries added, modified, removed and next_cursor; store the
+        last page's cursor only once every page has been applied. If Plaid
+        reports a mutation during pagination the run restarts from `cursor`,
+        so pages already yielded come again and applying them must be
+        idempotent; the first page of a restarted run has `restarted` set.
+        Without a cursor the full available history is added.
+        """
+        access_token = decrypt_sensitive_data(encrypted_access_token)
+        restarts = 0
+        restarted = False
+        next_cursor = cursor
+        
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            while True:
+                payload = {
+                    "client_id": self.plaid_client_id,
+                    "secret": self.plaid_secret,
+                    "access_token": access_token,
+                    "count": PLAID_SYNC_PAGE_SIZE
                 }
-            }
-            
-            async with httpx.AsyncClient(timeout=30.0) as client:
+                if next_cursor:
+                    payload["cursor"] = next_cursor
+                
                 response = await client.post(
-                    f"{self.plaid_base_url}/transactions/get",
+                    f"{self.plaid_base_url}/transactions/sync",
                     json=payload
                 )
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    transactions = result.get("transactions", [])
-                    
-                    # Format transactions
-                    formatted_txns = []
-                    for txn in transactions:
-                        formatted_txns.append({
-                            "transaction_id": txn.get("transaction_id"),
-                            "date": txn.get("date"),
-                            "amount": txn.get("amount"),
-                            "description": txn.get("name"),
-                            "category": txn.get("category", ["Uncategorized"])[0] if txn.get("category") else "Uncategorized",
-                            "merchant": txn.get("merchant_name"),
-                            "account_id": txn.get("account_id")
-                        })
-                    
-                    return {
-                        "success": True,
-                        "transactions": formatted_txns,
-                        "total_count": result.get("total_transactions", len(formatted_txns))
-                    }
-                else:
-                    logger.error(f"Plaid transactions error: {response.text}")
-                    return {
-                        "success": False,
-                        "error": f"API error: {response.status_code}"
-                    }
-                    
-        except Exception as e:
-            logger.error(f"Plaid transactions retrieval error: {str(e)}")
-            return {
-                "success": False,
-                "error": str(e)
-            }
+                if response.status_code != 200:
+                    try:
+                        error_code = response.json().get("error_code")
+                    except ValueError:
+                        error_code = None
+                    if error_code == "TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION":
+                        if restarts >= PLAID_SYNC_MAX_RESTARTS:
+                            raise BankingAPIError("Transactions kept changing during pagination; retry later")
+                        # Plaid requires restarting the whole run from the original cursor
+                        restarts += 1
+                        restarted = True
+                        next_cursor = cursor
+                        continue
+                    logger.error(f"Plaid transactions sync error: {response.text}")
+                    raise BankingAPIError(f"API error: {response.status_code}")
+                
+                result = response.json()
+                next_cursor = result.get("next_cursor")
+                yield {
+                    "added": [self._format_plaid_transaction(txn) for txn in result.get("added", [])],
+                    "modified": [self._format_plaid_transaction(txn) for txn in result.get("modified", [])],
+                    "removed": [txn.get("transaction_id") for txn in result.get("removed", [])],
+                    "next_cursor": next_cursor,
+                    "restarted": restarted
+                }
+                restarted = False
+                
+                if not result.get("has_more"):
+                    return
     
     # ============= RAZORPAY INTEGRATION =============
     
-    async def get_razorpay_account_statement(
+    async def iter_razorpay_transactions(
         self,
         account_id: str,
         from_date: str,
         to_date: str
-    ) -> Dict[str, Any]:
-        """Get account statement from Razorpay (for Indian businesses)"""
-        try:
-            if not self.razorpay_key_id or not self.razorpay_key_secret:
-                return {
-                    "success": False,
-                    "error": "Razorpay credentials not configured"
-                }
-            
-            params = {
-                "from": from_date,
-                "to": to_date,
-                "count": 100
-            }
-            
-            async with httpx.AsyncClient(timeout=30.0) as client:
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream every Razorpay transaction in the range, oldest page first"""
+        if not self.razorpay_key_id or not self.razorpay_key_secret:
+            raise BankingAPIError("Razorpay credentials not configured")
+        if not account_id:
+            # Without it RazorpayX returns every account's transactions
+            raise BankingAPIError("Razorpay connection has no account number")
+        
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            async def fetch_page(offset: int) -> Tuple[List[Dict[str, Any]], Optional[int]]:
                 response = await client.get(
                     f"{self.razorpay_base_url}/transactions",
-                    params=params,
+                    params={
+                        "account_number": account_id,
+                        "from": from_date,
+                        "to": to_date,
+                        "count": RAZORPAY_PAGE_SIZE,
+                        "skip": offset
+                    },
                     auth=(self.razorpay_key_id, self.razorpay_key_secret)
                 )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    transactions = result.get("items", [])
-                    
-                    # Format transactions
-                    formatted_txns = []
-                    for txn in transactions:
-                        formatted_txns.append({
-                            "transaction_id": txn.get("id"),
-                            "date": datetime.fromtimestamp(txn.get("created_at", 0)).strftime("%Y-%m-%d"),
-                            "amount": txn.get("amount", 0) / 100,  # Razorpay amounts are in paise
-                            "currency": txn.get("currency", "INR"),
-                            "description": txn.get("notes", {}).get("description", ""),
-                            "type": txn.get("type"),
-                            "status": txn.get("status")
-                        })
-                    
-                    return {
-                        "success": True,
-                        "transactions": formatted_txns,
-                        "count": len(formatted_txns)
-                    }
-                else:
+                if response.status_code != 200:
                     logger.error(f"Razorpay API error: {response.text}")
-                    return {
-                        "success": False,
-                        "error": f"API error: {response.status_code}"
-                    }
+                    raise BankingAPIError(f"API error: {response.status_code}")
+                transactions = [self._format_razorpay_transaction(txn) for txn in response.json().get("items", [])]
+                # Razorpay does not report a total
+                return transactions, None
+            
+            async for transaction in self._paginate(fetch_page, RAZORPAY_PAGE_SIZE):
+                yield transaction
+    
+    async def get_razorpay_account_statement(
+        self,
+        account_id: str,
+        from_date: str,
+        to_date: str
+    ) -> Dict[str, Any]:
+        """Get account statement from Razorpay (for Indian businesses)"""
+        try:
+            formatted_txns = [
+                txn async for txn in self.iter_razorpay_transactions(account_id, from_date, to_date)
+            ]
+            return {
+                "success": True,
+                "transactions": formatted_txns,
+                "count": len(formatted_txns)
+            }
                     
         except Exception as e:
             logger.error(f"Razorpay statement retrieval error: {str(e)}")
@@ -289,6 +328,117 @@ class BankingService:
                 "error": str(e)
             }
     
+    @staticmethod
+    def _format_razorpay_transaction(txn: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "transaction_id": txn.get("id"),
+            "date": datetime.fromtimestamp(txn.get("created_at", 0)).strftime("%Y-%m-%d"),
+            "amount": txn.get("amount", 0) / 100,  # Razorpay amounts are in paise
+            "currency": txn.get("currency", "INR"),
+            "description": (txn.get("notes") or {}).get("description", ""),
+            "type": txn.get("type"),
+            "status": txn.get("status"),
+            "account_id": txn.get("account_number")
+        }
+    
+    # ============= WEBHOOK VERIFICATION =============
+    
+    async def verify_plaid_webhook(self, body: bytes, verification_token: str) -> bool:
+        """Check the Plaid-Verification JWT: ES256 signature, age and body hash"""
+        try:
+            header = jwt.get_unverified_header(verification_token)
+            if header.get("alg") != "ES256":
+                return False
+            key = await self._get_plaid_webhook_key(header.get("kid"))
+            if key is None:
+                return False
+            claims = jwt.decode(verification_token, key, algorithms=["ES256"])
+            if time.time() - claims.get("iat", 0) > PLAID_WEBHOOK_MAX_AGE_SECONDS:
+                return False
+            return hmac.compare_digest(
+                str(claims.get("request_body_sha256", "")),
+                hashlib.sha256(body).hexdigest()
+            )
+        except Exception as e:
+            logger.warning(f"Plaid webhook verification failed: {str(e)}")
+            return False
+    
+    async def _get_plaid_webhook_key(self, key_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not key_id:
+            return None
+        cached = self._plaid_webhook_keys.get(key_id)
+        if cached and time.monotonic() - cached[1] < PLAID_WEBHOOK_KEY_TTL_SECONDS:
+            key = cached[0]
+        else:
+            async with httpx.AsyncClient(timeout=30.0) as client:
+                response = await client.post(
+                    f"{self.plaid_base_url}/webhook_verification_key/get",
+                    json={
+                        "client_id": self.plaid_client_id,
+                        "secret": self.plaid_secret,
+                        "key_id": key_id
+                    }
+                )
+            if response.status_code != 200:
+                logger.error(f"Plaid webhook key error: {response.text}")
+                return None
+            key = response.json().get("key")
+            self._plaid_webhook_keys[key_id] = (key, time.monotonic())
+        if key.get("expired_at"):
+            return None
+        return key
+    
+    def verify_razorpay_webhook(self, body: bytes, signature: str) -> bool:
+        """Check X-Razorpay-Signature (HMAC-SHA256 of the raw body with the webhook secret)"""
+        if not settings.RAZORPAY_WEBHOOK_SECRET:
+            logger.warning("Razorpay webhook received but RAZORPAY_WEBHOOK_SECRET is not set")
+            return False
+        expected = hmac.new(settings.RAZORPAY_WEBHOOK_SECRET.encode("utf-8"), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature)
+    
+    # ============= PAGINATION =============
+    
+    async def _paginate(
+        self,
+        fetch_page: Callable[[int], Awaitable[Tuple[List[Dict[str, Any]], Optional[int]]]],
+        page_size: int
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield items from every page, in page order.
+        
+        `fetch_page(offset)` returns (items, total). The first page is fetched
+        alone to learn the total; the rest are fetched up to
+        BANKING_PAGE_CONCURRENCY at a time. Without a total, pages are fetched
+        speculatively until one comes back short. At most that many pages are
+        held at once, however long the statement.
+        """
+        items, total = await fetch_page(0)
+        for item in items:
+            yield item
+        if (total is None and len(items) < page_size) or (total is not None and total <= page_size):
+            return
+        
+        offsets = iter(range(page_size, total, page_size)) if total is not None else itertools.count(page_size, page_size)
+        window: Deque[asyncio.Task] = deque()
+        try:
+            while True:
+                while len(window) < self.page_concurrency:
+                    offset = next(offsets, None)
+                    if offset is None:
+                        break
+                    window.append(asyncio.create_task(fetch_page(offset)))
+                if not window:
+                    return
+                items, _ = await window.popleft()
+                for item in items:
+                    yield item
+                if total is None and len(items) < page_size:
+                    return
+        finally:
+            # Pages past the end, or abandoned by the caller
+            for task in window:
+                task.cancel()
+            await asyncio.gather(*window, return_exceptions=True)
+    
     async def get_razorpay_balance(self) -> Dict[str, Any]:
         """Get Razorpay account balance"""
         try:
@@ -0,0 +1,130 @@
+"""
+Circuit breaker for upstream dependencies (OpenRouter models)
+"""
+import logging
+import time
+from collections import deque
+from enum import Enum
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"  # Calls flow normally
+    OPEN = "open"  # Calls fail fast until the cool-down expires
+    HALF_OPEN = "half_open"  # A few probe calls decide whether to close again
+
+class CircuitBreaker:
+    """Rolling error-rate and slow-call-rate circuit breaker.
+
+    The breaker opens when, over the last `window_size` calls (and at least
+    `min_calls`), the failure rate or the slow-call rate reaches its
+    threshold. After `open_seconds` it lets `half_open_max_calls` probes
+    through; a successful probe closes it, a failed one re-opens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_size: int = 50,
+        min_calls: int = 10,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 30.0,
+        slow_call_rate_threshold: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._outcomes: deque = deque(maxlen=window_size)  # (failed, slow)
+        self._times_opened = 0
+        self._rejected = 0
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state == CircuitState.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            return CircuitState.HALF_OPEN
+        return self._state
+
+    def is_open(self) -> bool:
+        """True while calls are being rejected outright"""
+        return self.state == CircuitState.OPEN
+
+    def allow_request(self) -> bool:
+        """Check whether a call may proceed (reserves a probe when half-open)"""
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.HALF_OPEN:
+            if self._state == CircuitState.OPEN:
+                logger.info(f"Circuit {self.name} half-open, probing")
+                self._state = CircuitState.HALF_OPEN
+                self._half_open_in_flight = 0
+            if self._half_open_in_flight < self.half_open_max_calls:
+                self._half_open_in_flight += 1
+                return True
+        self._rejected += 1
+        return False
+
+    def record_success(self, latency: float):
+        """Record a completed call"""
+        if self._state == CircuitState.HALF_OPEN:
+            logger.info(f"Circuit {self.name} closed after successful probe")
+            self._state = CircuitState.CLOSED
+            self._half_open_in_flight = 0
+            self._outcomes.clear()
+        self._outcomes.append((False, latency >= self.slow_call_seconds))
+        self._evaluate()
+
+    def record_failure(self):
+        """Record a failed call (timeout, connection error, 5xx)"""
+        if self._state == CircuitState.HALF_OPEN:
+            self._open()
+            return
+        self._outcomes.append((True, False))
+        self._evaluate()
+
+    def record_ignored(self):
+        """Call ended without a verdict (cancelled, rate limited)"""
+        if self._state == CircuitState.HALF_OPEN and self._half_open_in_flight > 0:
+            self._half_open_in_flight -= 1
+
+    def _evaluate(self):
+        if self._state != CircuitState.CLOSED or len(self._outcomes) < self.min_calls:
+            return
+        calls = len(self._outcomes)
+        failure_rate = sum(1 for failed, _ in self._outcomes if failed) / calls
+        slow_rate = sum(1 for _, slow in self._outcomes if slow) / calls
+        if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+            logger.warning(
+                f"Circuit {self.name} opened (failure rate {failure_rate:.0%}, slow-call rate {slow_rate:.0%})"
+            )
+            self._open()
+
+    def _open(self):
+        self._state = CircuitState.OPEN
+        self._opened_at = time.monotonic()
+        self._half_open_in_flight = 0
+        self._outcomes.clear()
+        self._times_opened += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """State and rolling rates"""
+        calls = len(self._outcomes)
+        return {
+            "state": self.state.value,
+            "calls_in_window": calls,
+            "failure_rate": sum(1 for failed, _ in self._outcomes if failed) / calls if calls else 0.0,
+            "slow_call_rate": sum(1 for _, slow in self._outcomes if slow) / calls if calls else 0.0,
+            "times_opened": self._times_opened,
+            "rejected": self._rejected
+        }
@@ -8,6 +8,25 @@ import statistics
 
 logger = logging.getLogger(__name__)
 
+# Fixed English strings emitted by assess_risk_level; pre-translated by the translation warm-up
+RISK_FACTOR_MESSAGES = {
+    "negative_profit": "Negative profit margins",
+    "low_profit": "Low profit margins",
+    "low_liquidity": "Liquidity concerns - current ratio below 1",
+    "moderate_liquidity": "Moderate liquidity - current ratio below 1.5",
+    "very_high_debt": "Very high debt levels",
+    "high_debt": "High debt levels",
+    "low_cash": "Low cash reserves (less than 1 month of expenses)"
+}
+
+# Keyword found in a risk factor -> mitigation recommendation
+RISK_RECOMMENDATION_MESSAGES = {
+    "profit": "Focus on cost reduction and revenue optimization",
+    "liquidity": "Improve cash collection and consider short-term financing",
+    "debt": "Develop debt reduction plan and avoid new borrowings",
+    "cash": "Build emergency cash reserves - target 3-6 months expenses"
+}
+
 class FinancialCalculator:
     """Calculate financial ratios, scores, and metrics"""
     
@@ -255,35 +274,35 @@ class FinancialCalculator:
         # Check profitability
         prof = ratios.get("profitability", {})
         if prof.get("net_profit_margin", 0) < 0:
-            risk_factors.append("Negative profit margins")
+            risk_factors.append(RISK_FACTOR_MESSAGES["negative_profit"])
             risk_score += 30
         elif prof.get("net_profit_margin", 0) < 5:
-            risk_factors.append("Low profit margins")
+            risk_factors.append(RISK_FACTOR_MESSAGES["low_profit"])
             risk_score += 15
         
         # Check liquidity
         liq = ratios.get("liquidity", {})
         if liq.get("current_ratio", 0) < 1:
-            risk_factors.append("Liquidity concerns - current ratio below 1")
+            risk_factors.append(RISK_FACTOR_MESSAGES["low_liquidity"])
             risk_score += 25
         elif liq.get("current_ratio", 0) < 1.5:
-            risk_factors.append("Moderate liquidity - current ratio below 1.5")
+            risk_factors.append(RISK_FACTOR_MESSAGES["moderate_liquidity"])
             risk_score += 10
         
         # Check leverage
         lev = ratios.get("leverage", {})
         if lev.get("debt_to_equity", 0) > 3:
-            risk_factors.append("Very high debt levels")
+            risk_factors.append(RISK_FACTOR_MESSAGES["very_high_debt"])
             risk_score += 30
         elif lev.get("debt_to_equity", 0) > 2:
-            risk_factors.append("High debt levels")
+            risk_factors.append(RISK_FACTOR_MESSAGES["high_debt"])
             risk_score += 20
         
         # Check cash position
         cash_balance = financial_data.get("cash_balance", 0)
         monthly_expenses = financial_data.get("total_expenses", 0) / 12
         if monthly_expenses > 0 and (cash_balance / monthly_expenses) < 1:
-            risk_factors.append("Low cash reserves (less than 1 month of expenses)")
+            risk_factors.append(RISK_FACTOR_MESSAGES["low_cash"])
             risk_score += 20
         
         # Determine risk level
@@ -306,17 +325,17 @@ class FinancialCalculator:
         recommendations = []
         
         for factor in risk_factors:
-            if "profit" in factor.lower():
-                recommendations.append("Focus on cost reduction and revenue optimization")
-            if "liquidity" in factor.lower():
-                recommendations.append("Improve cash collection and consider short-term financing")
-            if "debt" in factor.lower():
-                recommendations.append("Develop debt reduction plan and avoid new borrowings")
-            if "cash" in factor.lower():
-                recommendations.append("Build emergency cash reserves - target 3-6 months expenses")
+            for keyword, recommendation in RISK_RECOMMENDATION_MESSAGES.items():
+                if keyword in factor.lower():
+                    recommendations.append(recommendation)
         
         return list(set(recommendations))  # Remove duplicates
     
+    @staticmethod
+    def get_translatable_strings() -> List[str]:
+        """Every fixed English string the risk assessment can emit"""
+        return list(RISK_FACTOR_MESSAGES.values()) + list(RISK_RECOMMENDATION_MESSAGES.values())
+    
     def benchmark_against_industry(self, ratios: Dict[str, Any], industry: str) -> Dict[str, Any]:
         """Compare ratios against industry benchmarks"""
         benchmarks = self.industry_benchmarks.get(industry, self.industry_benchmarks.get("general", {}))
@@ -0,0 +1,114 @@
+"""
+Latency tracking and request hedging policy for upstream LLM calls
+"""
+import logging
+from collections import deque
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class LatencyTracker:
+    """Rolling window of observed upstream latencies per model"""
+
+    def __init__(self, window_size: int = 200, min_samples: int = 20):
+        self.window_size = window_size
+        self.min_samples = min_samples
+        self._samples: Dict[str, deque] = {}
+
+    def record(self, model: str, seconds: float):
+        """Record the latency of a successful call"""
+        if model not in self._samples:
+            self._samples[model] = deque(maxlen=self.window_size)
+        self._samples[model].append(seconds)
+
+    def percentile(self, model: str, q: float) -> Optional[float]:
+        """Latency percentile for `model`, or None until enough samples exist"""
+        samples = self._samples.get(model)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Sample count and p50/p95/p99 per model"""
+        metrics = {}
+        for model, samples in self._samples.items():
+            ordered = sorted(samples)
+            metrics[model] = {
+                "samples": len(ordered),
+                "p50": ordered[int(0.50 * (len(ordered) - 1))],
+                "p95": ordered[int(0.95 * (len(ordered) - 1))],
+                "p99": ordered[int(0.99 * (len(ordered) - 1))]
+            }
+        return metrics
+
+class HedgingPolicy:
+    """Decide when to hedge a slow request onto the fallback model.
+
+    The hedge delay is the primary model's observed latency percentile
+    (p95 by default), clamped to a minimum, with a fixed default until enough
+    samples exist. Hedges are capped to a fraction of recent requests so a
+    slow provider can at most add `budget_ratio` extra cost.
+    """
+
+    def __init__(
+        self,
+        latency: LatencyTracker,
+        enabled: bool,
+        percentile: float,
+        min_delay: float,
+        default_delay: float,
+        budget_ratio: float,
+        budget_window: int = 200
+    ):
+        self.latency = latency
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.default_delay = default_delay
+        self.budget_ratio = budget_ratio
+        self._recent: deque = deque(maxlen=budget_window)  # True for hedged requests
+
+        self._requests = 0
+        self._hedged = 0
+        self._hedge_wins = 0
+        self._budget_denied = 0
+
+    def hedge_delay(self, model: str) -> float:
+        """Seconds to wait on the primary model before hedging"""
+        observed = self.latency.percentile(model, self.percentile)
+        if observed is None:
+            return self.default_delay
+        return max(self.min_delay, observed)
+
+    def try_acquire_budget(self) -> bool:
+        """Check whether one more hedge keeps the recent hedge rate within budget"""
+        hedged_recently = sum(self._recent)
+        if hedged_recently + 1 > self.budget_ratio * len(self._recent):
+            self._budget_denied += 1
+            return False
+        return True
+
+    def record_request(self, hedged: bool):
+        """Count a request that was eligible for hedging"""
+        self._requests += 1
+        self._recent.append(hedged)
+        if hedged:
+            self._hedged += 1
+
+    def record_hedge_win(self):
+        """The hedged request answered before the primary"""
+        self._hedge_wins += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Hedge rate, win rate and budget usage"""
+        return {
+            "enabled": self.enabled,
+            "requests": self._requests,
+            "hedged": self._hedged,
+            "hedge_rate": self._hedged / self._requests if self._requests else 0.0,
+            "recent_hedge_rate": sum(self._recent) / len(self._recent) if self._recent else 0.0,
+            "hedge_wins": self._hedge_wins,
+            "budget_denied": self._budget_denied,
+            "budget_ratio": self.budget_ratio
+        }
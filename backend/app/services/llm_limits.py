@@ -0,0 +1,237 @@
+"""
+Admission control for upstream LLM calls
+Concurrency limits, token-bucket rate limiting and priority scheduling
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Dict, Any, List, Optional, AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+class Priority(IntEnum):
+    """Scheduling class of an LLM request (lower value is served first)"""
+    INTERACTIVE = 0  # A user is waiting on the answer (chat)
+    STANDARD = 1
+    BATCH = 2  # Analysis, forecasts, translations
+
+class AdmissionTimeout(Exception):
+    """Raised when a request waited longer than the queue timeout"""
+
+class TokenBucket:
+    """Continuously refilling token bucket"""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        if self.refill_per_second <= 0:
+            return float("inf")
+        return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount: float):
+        """Take tokens (caller checked availability with wait_time)"""
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+class AdmissionController:
+    """Admit LLM requests under global/per-model concurrency and RPM/TPM limits.
+
+    Waiters are served in priority order. A waiter blocked only by its own
+    model (per-model limit or a 429 cool-down) does not hold up requests for
+    other models; a waiter blocked by a shared limit holds up everyone behind it.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_concurrency_per_model: int,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        queue_timeout: float
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_concurrency_per_model = max_concurrency_per_model
+        self.queue_timeout = queue_timeout
+        self.request_bucket = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.token_bucket = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+
+        self._active = 0
+        self._active_per_model: Dict[str, int] = {}
+        self._blocked_until: Dict[str, float] = {}
+        self._waiters: List[list] = []  # heap of [priority, seq, model, tokens, future]
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_at = 0.0
+
+        # Metrics
+        self._admitted = 0
+        self._timeouts = 0
+        self._rate_limited = 0
+        self._max_queue_depth = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._recent_waits: deque = deque(maxlen=500)
+
+    async def acquire(self, model: str, priority: Priority = Priority.STANDARD, tokens: int = 0) -> float:
+        """Wait for admission and return the time spent queued (seconds)"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        entry = [int(priority), next(self._seq), model, tokens, future]
+        heapq.heappush(self._waiters, entry)
+        self._max_queue_depth = max(self._max_queue_depth, len(self._waiters))
+        started = time.monotonic()
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Admitted in the same tick we gave up - hand the slot back
+                self.release(model)
+            else:
+                future.cancel()
+                self._remove_waiter(entry)
+            if isinstance(e, asyncio.TimeoutError):
+                self._timeouts += 1
+                raise AdmissionTimeout(f"LLM request for {model} queued longer than {self.queue_timeout}s")
+            raise
+
+        waited = time.monotonic() - started
+        self._admitted += 1
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+        self._recent_waits.append(waited)
+        return waited
+
+    def release(self, model: str):
+        """Return a concurrency slot"""
+        self._active = max(0, self._active - 1)
+        self._active_per_model[model] = max(0, self._active_per_model.get(model, 1) - 1)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, model: str, priority: Priority = Priority.STANDARD, tokens: int = 0) -> AsyncIterator[float]:
+        """Hold an admission slot for the duration of the block"""
+        waited = await self.acquire(model, priority, tokens)
+        try:
+            yield waited
+        finally:
+            self.release(model)
+
+    def penalize(self, model: str, delay: float):
+        """Block new admissions for `model` for `delay` seconds (e.g. after a 429)"""
+        self._rate_limited += 1
+        until = time.monotonic() + delay
+        if until > self._blocked_until.get(model, 0):
+            self._blocked_until[model] = until
+        logger.warning(f"LLM model {model} rate limited, pausing admissions for {delay:.1f}s")
+
+    def _remove_waiter(self, entry: list):
+        try:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+        except ValueError:
+            pass
+        self._dispatch()
+
+    def _dispatch(self):
+        """Admit as many queued requests as the limits allow"""
+        now = time.monotonic()
+        next_check: Optional[float] = None
+
+        for entry in sorted(self._waiters):
+            _, _, model, tokens, future = entry
+            if future.done():
+                continue
+
+            # Shared limits: nobody behind this waiter may overtake it
+            if self._active >= self.max_concurrency:
+                break
+
+            # Model-specific limits: let other models through
+            blocked_until = self._blocked_until.get(model, 0)
+            if blocked_until > now:
+                next_check = min(next_check or blocked_until, blocked_until)
+                continue
+            if self._active_per_model.get(model, 0) >= self.max_concurrency_per_model:
+                continue
+
+            wait = max(self.request_bucket.wait_time(1), self.token_bucket.wait_time(tokens))
+            if wait > 0:
+                next_check = min(next_check or now + wait, now + wait)
+                break
+
+            self.request_bucket.consume(1)
+            self.token_bucket.consume(tokens)
+            self._active += 1
+            self._active_per_model[model] = self._active_per_model.get(model, 0) + 1
+            self._waiters.remove(entry)
+            future.set_result(True)
+
+        heapq.heapify(self._waiters)
+        if next_check is not None and self._waiters:
+            self._schedule(next_check)
+
+    def _schedule(self, at: float):
+        """Re-run dispatch when a time-based limit frees up"""
+        if self._timer is not None and not self._timer.cancelled() and self._timer_at <= at:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        loop = asyncio.get_running_loop()
+        self._timer_at = at
+        self._timer = loop.call_later(max(0.0, at - time.monotonic()), self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth, wait time and limiter state"""
+        waits = sorted(self._recent_waits)
+        depth_by_priority = {p.name.lower(): 0 for p in Priority}
+        for entry in self._waiters:
+            depth_by_priority[Priority(entry[0]).name.lower()] += 1
+
+        def percentile(q: float) -> float:
+            if not waits:
+                return 0.0
+            return waits[min(len(waits) - 1, int(q * len(waits)))]
+
+        return {
+            "queue_depth": len(self._waiters),
+            "queue_depth_by_priority": depth_by_priority,
+            "max_queue_depth": self._max_queue_depth,
+            "active": self._active,
+            "active_per_model": {m: n for m, n in self._active_per_model.items() if n},
+            "admitted": self._admitted,
+            "timeouts": self._timeouts,
+            "rate_limited": self._rate_limited,
+            "wait_seconds": {
+                "avg": self._total_wait / self._admitted if self._admitted else 0.0,
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "max": self._max_wait
+            },
+            "request_tokens_available": round(self.request_bucket.tokens, 2),
+            "llm_tokens_available": round(self.token_bucket.tokens, 2)
+        }
@@ -3,13 +3,32 @@ LLM Service using OpenRouter API
 Supports GPT-4, Claude, and other models
 """
 import asyncio
+import json
 import logging
-from typing import List, Dict, Any, Optional
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import List, Dict, Any, Optional, AsyncIterator
 import httpx
 from app.config import settings
+from app.services.llm_limits import AdmissionController, AdmissionTimeout, Priority
+from app.services.llm_hedging import LatencyTracker, HedgingPolicy
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.prompt_builder import PromptBuilder, estimate_tokens, estimate_messages_tokens, fit_series_to_budget
 
 logger = logging.getLogger(__name__)
 
+LANGUAGE_NAMES = {
+    "hi": "Hindi",
+    "te": "Telugu",
+    "ta": "Tamil",
+    "kn": "Kannada",
+    "mr": "Marathi",
+    "gu": "Gujarati",
+    "bn": "Bengali"
+}
+
 class LLMService:
     """Service for interacting with LLMs via OpenRouter"""
     
@@ -18,72 +37,445 @@ class LLMService:
         self.api_key = settings.OPENROUTER_API_KEY
         self.default_model = settings.DEFAULT_MODEL
         self.fallback_model = settings.FALLBACK_MODEL
+        self.admission = AdmissionController(
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            max_concurrency_per_model=settings.LLM_MAX_CONCURRENCY_PER_MODEL,
+            requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+            tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+            queue_timeout=settings.LLM_QUEUE_TIMEOUT
+        )
+        self.latency = LatencyTracker()
+        self.hedging = HedgingPolicy(
+            latency=self.latency,
+            enabled=settings.LLM_HEDGING_ENABLED,
+            percentile=settings.LLM_HEDGE_PERCENTILE,
+            min_delay=settings.LLM_HEDGE_MIN_DELAY,
+            default_delay=settings.LLM_HEDGE_DEFAULT_DELAY,
+            budget_ratio=settings.LLM_HEDGE_BUDGET_RATIO
+        )
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._prompt_calls = 0
+        self._prompt_tokens = 0
+        self._prompt_tokens_saved = 0
+    
+    def _get_headers(self) -> Dict[str, str]:
+        """Build OpenRouter request headers"""
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://sme-financial-compass.app",
+            "X-Title": "SME Financial Compass"
+        }
+
+    def _parse_json_content(self, content: str) -> Any:
+        """Parse JSON from an LLM response, unwrapping markdown code fences"""
+        if "```json" in content:
+            content = content.split("```json")[1].split("```")[0].strip()
+        elif "```" in content:
+            content = content.split("```")[1].split("```")[0].strip()
+        return json.loads(content)
+
+    def _build_messages(self, prompt: Optional[str], system_prompt: Optional[str]) -> List[Dict[str, str]]:
+        """Wrap a single prompt (and optional system prompt) as chat messages"""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt or ""})
+        return messages
+
+    def _estimate_request_tokens(self, messages: List[Dict[str, str]], max_tokens: int) -> int:
+        """Token cost of a request for the tokens-per-minute bucket"""
+        return estimate_messages_tokens(messages) + max_tokens
+
+    def _with_prompt_stats(self, result: Dict[str, Any], built_prompt: Dict[str, Any]) -> Dict[str, Any]:
+        """Attach prompt size/savings of a built prompt to a result and aggregate them"""
+        self._prompt_calls += 1
+        self._prompt_tokens += built_prompt["estimated_tokens"]
+        self._prompt_tokens_saved += built_prompt["tokens_saved"]
+        logger.info(
+            f"LLM prompt ~{built_prompt['estimated_tokens']} tokens "
+            f"({built_prompt['tokens_saved']} saved by prompt budgeting)"
+        )
+        result["prompt_stats"] = {
+            "estimated_tokens": built_prompt["estimated_tokens"],
+            "tokens_saved": built_prompt["tokens_saved"]
+        }
+        return result
+
+    def _get_retry_delay(self, response: httpx.Response, attempt: int) -> float:
+        """Delay before retrying a 429, honouring Retry-After when present"""
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(retry_after)
+                    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+                except (TypeError, ValueError):
+                    pass
+        
+        # Exponential backoff with jitter
+        delay = min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _get_breaker(self, model: str) -> CircuitBreaker:
+        """Circuit breaker for a model"""
+        if model not in self.breakers:
+            self.breakers[model] = CircuitBreaker(
+                name=model,
+                window_size=settings.LLM_BREAKER_WINDOW,
+                min_calls=settings.LLM_BREAKER_MIN_CALLS,
+                failure_rate_threshold=settings.LLM_BREAKER_FAILURE_RATE,
+                slow_call_seconds=settings.LLM_BREAKER_SLOW_CALL_SECONDS,
+                slow_call_rate_threshold=settings.LLM_BREAKER_SLOW_CALL_RATE,
+                open_seconds=settings.LLM_BREAKER_OPEN_SECONDS
+            )
+        return self.breakers[model]
+
+    def _record_outcome(self, breaker: CircuitBreaker, status_code: int, elapsed: float):
+        """Feed an HTTP outcome to the model's circuit breaker"""
+        if status_code == 200:
+            breaker.record_success(elapsed)
+        elif status_code >= 500 or status_code == 408:
+            breaker.record_failure()
+        else:
+            # Rate limits and client errors say nothing about provider health
+            breaker.record_ignored()
+
+    def _get_timeout(self, model: str) -> httpx.Timeout:
+        """Read timeout adapted to the model's observed p99 latency"""
+        p99 = self.latency.percentile(model, 0.99)
+        if p99 is None:
+            read_timeout = settings.LLM_TIMEOUT_MAX
+        else:
+            read_timeout = min(
+                settings.LLM_TIMEOUT_MAX,
+                max(settings.LLM_TIMEOUT_MIN, p99 * settings.LLM_TIMEOUT_MULTIPLIER)
+            )
+        return httpx.Timeout(read_timeout, connect=10.0)
+
+    def is_available(self) -> bool:
+        """False while both the default and fallback model circuits are open"""
+        return not (
+            self._get_breaker(self.default_model).is_open()
+            and self._get_breaker(self.fallback_model).is_open()
+        )
+        
+    async def _request_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        priority: Priority
+    ) -> Dict[str, Any]:
+        """Call one model, retrying rate-limit responses after backoff"""
+        breaker = self._get_breaker(model)
+        if not breaker.allow_request():
+            return {
+                "success": False,
+                "error": f"AI service temporarily unavailable ({model} circuit open)",
+                "circuit_open": True
+            }
+        
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        estimated_tokens = self._estimate_request_tokens(messages, max_tokens)
+        
+        try:
+            for attempt in range(settings.LLM_MAX_RETRIES + 1):
+                async with self.admission.slot(model, priority, estimated_tokens):
+                    started = time.monotonic()
+                    async with httpx.AsyncClient(timeout=self._get_timeout(model)) as client:
+                        response = await client.post(
+                            f"{self.base_url}/chat/completions",
+                            headers=self._get_headers(),
+                            json=payload
+                        )
+                    elapsed = time.monotonic() - started
+                
+                if response.status_code != 429:
+                    break
+                
+                # Rate limited: back off on this model rather than piling onto the fallback
+                delay = self._get_retry_delay(response, attempt)
+                self.admission.penalize(model, delay)
+        except httpx.TransportError:
+            # Timeouts and connection failures
+            breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled (hedge loser, client gone) or never admitted
+            breaker.record_ignored()
+            raise
+        
+        self._record_outcome(breaker, response.status_code, elapsed)
+        
+        if response.status_code == 200:
+            self.latency.record(model, elapsed)
+            result = response.json()
+            return {
+                "success": True,
+                "content": result["choices"][0]["message"]["content"],
+                "model": result.get("model", model),
+                "usage": result.get("usage", {})
+            }
+        elif response.status_code == 429:
+            logger.error(f"OpenRouter rate limit persisted after {settings.LLM_MAX_RETRIES} retries")
+            return {
+                "success": False,
+                "error": "API error: 429 (rate limited)",
+                "status_code": 429
+            }
+        else:
+            logger.error(f"OpenRouter API error: {response.status_code} - {response.text}")
+            return {
+                "success": False,
+                "error": f"API error: {response.status_code}",
+                "status_code": response.status_code
+            }
+
+    async def _hedged_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        priority: Priority
+    ) -> Dict[str, Any]:
+        """Race the fallback model against a slow primary and keep the first success"""
+        primary = asyncio.create_task(
+            self._request_completion(model, messages, temperature, max_tokens, priority)
+        )
+        hedge = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.hedging.hedge_delay(model))
+            if done or not self.hedging.try_acquire_budget():
+                self.hedging.record_request(hedged=False)
+                return await primary
+            
+            logger.info(f"Hedging slow {model} request onto {self.fallback_model}")
+            self.hedging.record_request(hedged=True)
+            hedge = asyncio.create_task(
+                self._request_completion(self.fallback_model, messages, temperature, max_tokens, priority)
+            )
+            
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().get("success"):
+                        if task is hedge:
+                            self.hedging.record_hedge_win()
+                        return task.result()
+            
+            # Both failed: report the primary's outcome, the fallback was already tried
+            result = primary.result()
+            result["fallback_tried"] = True
+            return result
+        finally:
+            # Cancel the loser (and both if our caller was cancelled)
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
         
     async def generate_completion(
         self,
-        prompt: str,
+        prompt: Optional[str] = None,
         model: Optional[str] = None,
         temperature: float = 0.7,
         max_tokens: int = 2000,
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        priority: Priority = Priority.STANDARD,
+        messages: Optional[List[Dict[str, str]]] = None
     ) -> Dict[str, Any]:
-        """Generate LLM completion"""
+        """Generate LLM completion from a prompt or a full chat message array"""
         try:
             model_to_use = model or self.default_model
             
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            messages.append({"role": "user", "content": prompt})
+            if messages is None:
+                messages = self._build_messages(prompt, system_prompt)
             
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://sme-financial-compass.app",
-                "X-Title": "SME Financial Compass"
-            }
+            if self.hedging.enabled and model_to_use != self.fallback_model:
+                result = await self._hedged_completion(model_to_use, messages, temperature, max_tokens, priority)
+            else:
+                result = await self._request_completion(model_to_use, messages, temperature, max_tokens, priority)
             
-            payload = {
-                "model": model_to_use,
-                "messages": messages,
-                "temperature": temperature,
-                "max_tokens": max_tokens
-            }
+            if result["success"]:
+                return result
             
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=payload
+            # Try fallback model (rate limits are retried on the same model instead)
+            status_code = result.pop("status_code", None)
+            fallback_tried = result.pop("fallback_tried", False)
+            if status_code != 429 and not fallback_tried and model_to_use != self.fallback_model:
+                return await self.generate_completion(
+                    prompt, self.fallback_model, temperature, max_tokens, system_prompt, priority, messages
                 )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    return {
-                        "success": True,
-                        "content": result["choices"][0]["message"]["content"],
-                        "model": result.get("model", model_to_use),
-                        "usage": result.get("usage", {})
-                    }
-                else:
-                    logger.error(f"OpenRouter API error: {response.status_code} - {response.text}")
-                    # Try fallback model
-                    if model_to_use != self.fallback_model:
-                        return await self.generate_completion(
-                            prompt, self.fallback_model, temperature, max_tokens, system_prompt
-                        )
-                    return {
-                        "success": False,
-                        "error": f"API error: {response.status_code}"
-                    }
+            return result
                     
+        except AdmissionTimeout as e:
+            logger.error(f"LLM admission timeout: {str(e)}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
         except Exception as e:
             logger.error(f"LLM generation error: {str(e)}")
             return {
                 "success": False,
                 "error": str(e)
             }
-    
+
+    async def stream_completion(
+        self,
+        prompt: Optional[str] = None,
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        system_prompt: Optional[str] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        messages: Optional[List[Dict[str, str]]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream LLM completion tokens as they are generated.
+
+        Yields ``{"event": "token", "content": ...}`` for every content delta and
+        finishes with a single ``done`` event carrying the full text, model and
+        usage, or an ``error`` event. Closing the generator early (e.g. when the
+        client disconnects) closes the upstream connection as well.
+        """
+        model_to_use = model or self.default_model
+
+        if messages is None:
+            messages = self._build_messages(prompt, system_prompt)
+
+        payload = {
+            "model": model_to_use,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+            "usage": {"include": True}
+        }
+        estimated_tokens = self._estimate_request_tokens(messages, max_tokens)
+
+        content_parts: List[str] = []
+        usage: Dict[str, Any] = {}
+        response_model = model_to_use
+
+        breaker = self._get_breaker(model_to_use)
+        if not breaker.allow_request():
+            if model_to_use != self.fallback_model:
+                async for event in self.stream_completion(
+                    prompt, self.fallback_model, temperature, max_tokens, system_prompt, priority, messages
+                ):
+                    yield event
+                return
+            yield {"event": "error", "error": "AI service temporarily unavailable", "circuit_open": True}
+            return
+
+        try:
+            for attempt in range(settings.LLM_MAX_RETRIES + 1):
+                status_error = None
+                retry_delay = None
+                async with self.admission.slot(model_to_use, priority, estimated_tokens):
+                    started = time.monotonic()
+                    async with httpx.AsyncClient(timeout=self._get_timeout(model_to_use)) as client:
+                        async with client.stream(
+                            "POST",
+                            f"{self.base_url}/chat/completions",
+                            headers=self._get_headers(),
+                            json=payload
+                        ) as response:
+                            status_code = response.status_code
+                            if response.status_code == 429:
+                                retry_delay = self._get_retry_delay(response, attempt)
+                                status_error = "API error: 429 (rate limited)"
+                            elif response.status_code != 200:
+                                body = await response.aread()
+                                logger.error(f"OpenRouter streaming error: {response.status_code} - {body.decode(errors='replace')}")
+                                status_error = f"API error: {response.status_code}"
+                            else:
+                                async for line in response.aiter_lines():
+                                    # SSE comments (": OPENROUTER PROCESSING") and blank keep-alives
+                                    if not line or not line.startswith("data:"):
+                                        continue
+                                    data = line[len("data:"):].strip()
+                                    if data == "[DONE]":
+                                        break
+                                    try:
+                                        chunk = json.loads(data)
+                                    except json.JSONDecodeError:
+                                        continue
+
+                                    if chunk.get("error"):
+                                        breaker.record_failure()
+                                        yield {
+                                            "event": "error",
+                                            "error": chunk["error"].get("message", "Streaming error")
+                                        }
+                                        return
+
+                                    response_model = chunk.get("model", response_model)
+                                    if chunk.get("usage"):
+                                        usage = chunk["usage"]
+
+                                    choices = chunk.get("choices") or []
+                                    if choices:
+                                        delta = choices[0].get("delta", {}).get("content")
+                                        if delta:
+                                            content_parts.append(delta)
+                                            yield {"event": "token", "content": delta}
+
+                if retry_delay is None:
+                    break
+                self.admission.penalize(model_to_use, retry_delay)
+
+            elapsed = time.monotonic() - started
+            self._record_outcome(breaker, status_code, elapsed)
+            if status_code == 200:
+                self.latency.record(model_to_use, elapsed)
+
+            if status_error:
+                # Nothing has been sent to the caller yet, so the fallback
+                # model can take over transparently (not for rate limits)
+                if retry_delay is None and model_to_use != self.fallback_model:
+                    async for event in self.stream_completion(
+                        prompt, self.fallback_model, temperature, max_tokens, system_prompt, priority, messages
+                    ):
+                        yield event
+                    return
+                yield {"event": "error", "error": status_error}
+                return
+
+            yield {
+                "event": "done",
+                "content": "".join(content_parts),
+                "model": response_model,
+                "usage": usage
+            }
+
+        except (asyncio.CancelledError, GeneratorExit):
+            logger.info("LLM stream cancelled by caller")
+            breaker.record_ignored()
+            raise
+        except AdmissionTimeout as e:
+            logger.error(f"LLM admission timeout: {str(e)}")
+            breaker.record_ignored()
+            yield {"event": "error", "error": str(e)}
+        except httpx.TransportError as e:
+            logger.error(f"LLM streaming error: {str(e)}")
+            breaker.record_failure()
+            yield {"event": "error", "error": str(e)}
+        except Exception as e:
+            logger.error(f"LLM streaming error: {str(e)}")
+            breaker.record_ignored()
+            yield {"event": "error", "error": str(e)}
+
     async def analyze_financial_health(self, financial_data: Dict[str, Any], business_info: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze financial health using LLM"""
         system_prompt = """You are an expert financial analyst specializing in SME financial health assessment.
@@ -122,21 +514,13 @@ class LLMService:
             prompt=prompt,
             system_prompt=system_prompt,
             temperature=0.5,
-            max_tokens=2500
+            max_tokens=2500,
+            priority=Priority.BATCH
         )
         
         if result["success"]:
             try:
-                import json
-                # Try to parse JSON from response
-                content = result["content"]
-                # Extract JSON if wrapped in markdown
-                if "```json" in content:
-                    content = content.split("```json")[1].split("```")[0].strip()
-                elif "```" in content:
-                    content = content.split("```")[1].split("```")[0].strip()
-                
-                parsed_result = json.loads(content)
+                parsed_result = self._parse_json_content(result["content"])
                 return {
                     "success": True,
                     "analysis": parsed_result
@@ -158,14 +542,25 @@ class LLMService:
         """Generate financial forecast using LLM"""
         system_prompt = """You are a financial forecasting expert. Analyze historical trends and generate realistic forecasts."""
         
-        # Prepare historical data summary
-        data_summary = "\n".join([
-            f"Period {i+1}: Revenue ₹{d.get('revenue', 0):,.2f}, Expenses ₹{d.get('expenses', 0):,.2f}"
-            for i, d in enumerate(historical_data[-12:])  # Last 12 periods
+        # Savings are measured against the block the uncompressed prompt
+        # actually sent: the last 12 periods, one verbose line each
+        verbose_summary = "\n".join([
+            f"Period {i+1}: Revenue ₹{d.get('revenue', 0) or 0:,.2f}, Expenses ₹{d.get('expenses', 0) or 0:,.2f}"
+            for i, d in enumerate(historical_data[-12:])
         ])
         
+        # Oldest period first so trends read naturally
+        if all(d.get('period') for d in historical_data):
+            historical_data = sorted(historical_data, key=lambda d: str(d['period']))
+        
+        # Compress the history into a compact table (summarising older
+        # periods if needed) so the prompt stays within budget
+        columns = [("period", "period"), ("revenue", "revenue_inr"), ("expenses", "expenses_inr"), ("profit", "profit_inr")]
+        data_block = fit_series_to_budget(historical_data, columns, settings.LLM_FORECAST_DATA_TOKEN_BUDGET)
+        data_summary = data_block["text"]
+        
         prompt = f"""
-        Based on this historical financial data:
+        Based on this historical financial data (K = thousand, M = million):
         
         {data_summary}
         
@@ -180,14 +575,20 @@ class LLMService:
         Provide realistic, data-driven forecasts. Format as JSON.
         """
         
+        built_prompt = PromptBuilder(settings.LLM_PROMPT_TOKEN_BUDGET)\
+            .system(system_prompt)\
+            .user(prompt)\
+            .record_compression(verbose_summary, data_summary)\
+            .build()
+        
         result = await self.generate_completion(
-            prompt=prompt,
-            system_prompt=system_prompt,
+            messages=built_prompt["messages"],
             temperature=0.3,
-            max_tokens=2000
+            max_tokens=2000,
+            priority=Priority.BATCH
         )
         
-        return result
+        return self._with_prompt_stats(result, built_prompt)
     
     async def generate_recommendations(self, business_context: Dict[str, Any]) -> Dict[str, Any]:
         """Generate business recommendations"""
@@ -220,17 +621,7 @@ class LLMService:
     
     async def translate_content(self, content: str, target_language: str) -> Dict[str, Any]:
         """Translate content to target language"""
-        language_map = {
-            "hi": "Hindi",
-            "te": "Telugu",
-            "ta": "Tamil",
-            "kn": "Kannada",
-            "mr": "Marathi",
-            "gu": "Gujarati",
-            "bn": "Bengali"
-        }
-        
-        target_lang_name = language_map.get(target_language, target_language)
+        target_lang_name = LANGUAGE_NAMES.get(target_language, target_language)
         
         prompt = f"""
         Translate the following financial/business content to {target_lang_name}.
@@ -245,40 +636,123 @@ class LLMService:
         result = await self.generate_completion(
             prompt=prompt,
             temperature=0.3,
-            max_tokens=3000
+            max_tokens=3000,
+            priority=Priority.BATCH
         )
         
         return result
+
+    async def translate_segments(self, segments: List[str], target_language: str) -> Dict[str, Any]:
+        """Translate several numbered segments in one request.
+
+        Returns ``translations`` as a list aligned with `segments`; entries
+        the model did not return are None so callers can fall back per segment.
+        """
+        target_lang_name = LANGUAGE_NAMES.get(target_language, target_language)
+        numbered = {str(i + 1): segment for i, segment in enumerate(segments)}
+        
+        prompt = f"""
+        Translate every value of the following JSON object from English to {target_lang_name}.
+        Maintain professional financial terminology and accuracy.
+        Keep the keys exactly as they are and return only a JSON object with the same keys.
+        
+        {json.dumps(numbered, ensure_ascii=False)}
+        """
+        
+        # Indic scripts need several times more tokens than the English source
+        source_tokens = sum(estimate_tokens(segment) for segment in segments)
+        result = await self.generate_completion(
+            prompt=prompt,
+            temperature=0.3,
+            max_tokens=min(4000, source_tokens * 4 + 200),
+            priority=Priority.BATCH
+        )
+        
+        if not result.get("success"):
+            return result
+        
+        try:
+            parsed = self._parse_json_content(result["content"])
+        except json.JSONDecodeError:
+            return {"success": False, "error": "Translation response was not valid JSON"}
+        if not isinstance(parsed, dict):
+            return {"success": False, "error": "Translation response was not a JSON object"}
+        
+        translations = []
+        for key in numbered:
+            value = parsed.get(key)
+            translations.append(value.strip() if isinstance(value, str) and value.strip() else None)
+        
+        return {
+            "success": True,
+            "translations": translations,
+            "model": result.get("model")
+        }
     
-    async def chat_response(self, user_message: str, conversation_history: List[Dict[str, str]], business_context: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate conversational response for insights chat"""
+    def _build_chat_prompt(self, user_message: str, conversation_history: List[Dict[str, str]], business_context: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the insights chat message array within the chat token budget"""
         system_prompt = f"""You are a friendly financial advisor assistant for SME Financial Compass.
         Help business owners understand their financials and make better decisions.
         
         Business Context:
         - Industry: {business_context.get('industry', 'General')}
-        - Revenue: ₹{business_context.get('revenue', 0):,.0f}
+        - Revenue: ₹{business_context.get('revenue', 0) or 0:,.0f}
         - Health Score: {business_context.get('health_score', 'N/A')}
         
         Be concise, helpful, and action-oriented. Use simple language."""
         
-        # Build message history
-        messages = []
-        for msg in conversation_history[-5:]:  # Last 5 messages
-            messages.append(msg)
-        messages.append({"role": "user", "content": user_message})
-        
-        # Convert to prompt
-        conversation = "\n".join([f"{m['role']}: {m['content']}" for m in messages])
-        
+        # Prior turns are sent as real messages, newest kept first
+        return PromptBuilder(settings.LLM_CHAT_TOKEN_BUDGET)\
+            .system(system_prompt)\
+            .history(conversation_history)\
+            .user(user_message)\
+            .build()
+
+    async def chat_response(self, user_message: str, conversation_history: List[Dict[str, str]], business_context: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate conversational response for insights chat"""
+        built_prompt = self._build_chat_prompt(user_message, conversation_history, business_context)
+
         result = await self.generate_completion(
-            prompt=conversation,
-            system_prompt=system_prompt,
+            messages=built_prompt["messages"],
             temperature=0.7,
-            max_tokens=500
+            max_tokens=500,
+            priority=Priority.INTERACTIVE
         )
-        
-        return result
+
+        return self._with_prompt_stats(result, built_prompt)
+
+    async def stream_chat_response(self, user_message: str, conversation_history: List[Dict[str, str]], business_context: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Stream conversational response for insights chat token by token"""
+        built_prompt = self._build_chat_prompt(user_message, conversation_history, business_context)
+
+        async for event in self.stream_completion(
+            messages=built_prompt["messages"],
+            temperature=0.7,
+            max_tokens=500
+        ):
+            if event["event"] == "done":
+                event = self._with_prompt_stats(event, built_prompt)
+            yield event
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Operational metrics for upstream LLM calls"""
+        return {
+            "admission": self.admission.get_metrics(),
+            "latency": self.latency.get_metrics(),
+            "hedging": self.hedging.get_metrics(),
+            "prompts": {
+                "budgeted_calls": self._prompt_calls,
+                "estimated_tokens": self._prompt_tokens,
+                "tokens_saved": self._prompt_tokens_saved
+            },
+            "circuit_breakers": {
+                model: {
+                    **breaker.get_metrics(),
+                    "read_timeout": self._get_timeout(model).read
+                }
+                for model, breaker in self.breakers.items()
+            }
+        }
 
 # Singleton instance
 llm_service = LLMService()
@@ -0,0 +1,162 @@
+"""
+Token-budgeted prompt assembly for LLM calls
+Local token estimation, numeric history compression and chat message arrays
+"""
+import logging
+import math
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Role/formatting tokens added by the chat template for every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Estimate the token count of `text` without a tokenizer.
+
+    English and numbers average ~4 characters per token; Indic scripts
+    tokenise far less efficiently, so non-ASCII characters count one each.
+    """
+    if not text:
+        return 0
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+def estimate_messages_tokens(messages: List[Dict[str, str]]) -> int:
+    """Estimate the prompt tokens of a chat message array"""
+    return sum(estimate_tokens(m.get("content")) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+def format_compact_number(value: Any) -> str:
+    """Render a number in as few characters as possible (1.25M, 830K, 42)"""
+    try:
+        number = float(value or 0)
+    except (TypeError, ValueError):
+        return str(value)
+    magnitude = abs(number)
+    if magnitude >= 1_000_000_000:
+        return f"{number / 1_000_000_000:.2f}B"
+    if magnitude >= 1_000_000:
+        return f"{number / 1_000_000:.2f}M"
+    if magnitude >= 10_000:
+        return f"{number / 1_000:.0f}K"
+    return f"{number:.0f}"
+
+def format_series_table(rows: List[Dict[str, Any]], columns: List[Tuple[str, str]]) -> str:
+    """Pipe-separated table of `rows`; columns are (key, label) pairs"""
+    lines = ["|".join(label for _, label in columns)]
+    for row in rows:
+        lines.append("|".join(
+            format_compact_number(row.get(key)) if isinstance(row.get(key), (int, float)) else str(row.get(key, ""))
+            for key, _ in columns
+        ))
+    return "\n".join(lines)
+
+def summarize_series(rows: List[Dict[str, Any]], columns: List[Tuple[str, str]]) -> str:
+    """One-line statistical summary of numeric columns (avg, range, trend)"""
+    if not rows:
+        return ""
+    label_key, _ = columns[0]
+    parts = [f"{len(rows)} periods {rows[0].get(label_key, '?')}..{rows[-1].get(label_key, '?')}"]
+    for key, label in columns[1:]:
+        values = [float(r.get(key) or 0) for r in rows]
+        average = sum(values) / len(values)
+        trend = ""
+        if len(values) > 1 and values[0] > 0 and values[-1] > 0:
+            trend = f", trend {((values[-1] / values[0]) ** (1 / (len(values) - 1)) - 1) * 100:+.1f}%/period"
+        elif len(values) > 1:
+            # A compound rate is undefined across zero (e.g. profit turning to loss)
+            change = (values[-1] - values[0]) / (len(values) - 1)
+            trend = f", change {'+' if change >= 0 else '-'}{format_compact_number(abs(change))}/period"
+        parts.append(
+            f"{label} avg {format_compact_number(average)}, "
+            f"range {format_compact_number(min(values))}-{format_compact_number(max(values))}{trend}"
+        )
+    return "; ".join(parts)
+
+def fit_series_to_budget(
+    rows: List[Dict[str, Any]],
+    columns: List[Tuple[str, str]],
+    token_budget: int,
+    min_table_rows: int = 3
+) -> Dict[str, Any]:
+    """Compress an ordered numeric history to fit `token_budget` tokens.
+
+    Uses a full compact table when it fits; otherwise summarises the oldest
+    periods and keeps as many recent periods as possible in the table.
+    """
+    table = format_series_table(rows, columns)
+    if estimate_tokens(table) <= token_budget or len(rows) <= min_table_rows:
+        return {"text": table, "table_rows": len(rows), "summarized_rows": 0}
+
+    keep = len(rows) // 2
+    while keep >= min_table_rows:
+        older, recent = rows[:-keep], rows[-keep:]
+        text = f"Earlier: {summarize_series(older, columns)}\nRecent:\n{format_series_table(recent, columns)}"
+        if estimate_tokens(text) <= token_budget:
+            return {"text": text, "table_rows": keep, "summarized_rows": len(older)}
+        keep //= 2
+
+    return {"text": f"Summary: {summarize_series(rows, columns)}", "table_rows": 0, "summarized_rows": len(rows)}
+
+class PromptBuilder:
+    """Assemble a chat message array within a prompt token budget.
+
+    System and current user messages are always kept; conversation history
+    is added newest-first while it fits. `tokens_saved` compares the result
+    with the naive prompt (full history, uncompressed data blocks).
+    """
+
+    def __init__(self, token_budget: int):
+        self.token_budget = token_budget
+        self._system: Optional[str] = None
+        self._history: List[Dict[str, str]] = []
+        self._user: Optional[str] = None
+        self._compression_savings = 0
+
+    def system(self, content: str) -> "PromptBuilder":
+        self._system = content
+        return self
+
+    def history(self, messages: List[Dict[str, str]]) -> "PromptBuilder":
+        self._history = [
+            {"role": m["role"], "content": m["content"]}
+            for m in messages
+            if m.get("role") in ("user", "assistant") and m.get("content")
+        ]
+        return self
+
+    def user(self, content: str) -> "PromptBuilder":
+        self._user = content
+        return self
+
+    def record_compression(self, original_text: str, compressed_text: str) -> "PromptBuilder":
+        """Account for a data block that was compressed before being added"""
+        self._compression_savings += max(0, estimate_tokens(original_text) - estimate_tokens(compressed_text))
+        return self
+
+    def build(self) -> Dict[str, Any]:
+        """Return the messages plus estimated and saved token counts"""
+        head = [{"role": "system", "content": self._system}] if self._system else []
+        tail = [{"role": "user", "content": self._user}] if self._user else []
+
+        available = self.token_budget - estimate_messages_tokens(head + tail)
+        kept: List[Dict[str, str]] = []
+        for message in reversed(self._history):
+            cost = estimate_messages_tokens([message])
+            if cost > available:
+                break
+            kept.insert(0, message)
+            available -= cost
+
+        messages = head + kept + tail
+        estimated = estimate_messages_tokens(messages)
+        original = estimate_messages_tokens(head + self._history + tail) + self._compression_savings
+        if estimated > self.token_budget:
+            logger.warning(f"Prompt of ~{estimated} tokens exceeds budget of {self.token_budget}")
+
+        return {
+            "messages": messages,
+            "estimated_tokens": estimated,
+            "tokens_saved": original - estimated,
+            "history_dropped": len(self._history) - len(kept)
+        }
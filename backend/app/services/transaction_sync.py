@@ -0,0 +1,184 @@
+"""
+Bank transaction sync
+Applies provider changes to banking_transactions (Plaid via a cursor per
+connection, Razorpay by streaming the statement since the last sync), so
+reads are served from the local table
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
+from app.config import settings
+from app.repositories import banking_connection_repository, banking_transaction_repository
+from app.data_access import UPSERT_CHUNK_SIZE
+from app.services.banking_service import banking_service
+
+logger = logging.getLogger(__name__)
+
+INITIAL_STATEMENT_DAYS = 90  # history pulled on a statement provider's first sync
+
+class TransactionSyncService:
+    """Provider -> banking_transactions, at most one sync per connection at a time"""
+
+    def __init__(self, max_age_seconds: int, timeout_seconds: float):
+        self.max_age = timedelta(seconds=max_age_seconds)
+        self.timeout = timeout_seconds
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def to_row(connection_id: str, transaction: Dict[str, Any]) -> Dict[str, Any]:
+        """Formatted provider transaction -> banking_transactions row"""
+        amount = transaction.get("amount") or 0
+        row = {
+            "connection_id": connection_id,
+            "transaction_id": transaction["transaction_id"],
+            "transaction_date": transaction["date"],
+            "amount": amount,
+            "description": transaction.get("description"),
+            "category": transaction.get("category"),
+            "account_id": transaction.get("account_id"),
+            "merchant": transaction.get("merchant"),
+            # Razorpay reports a type; Plaid amounts are positive for money leaving the account
+            "transaction_type": transaction.get("type") or ("debit" if amount > 0 else "credit")
+        }
+        if transaction.get("currency"):
+            row["currency"] = transaction["currency"]
+        return row
+
+    def is_stale(self, connection: Dict[str, Any]) -> bool:
+        last_sync = connection.get('last_sync')
+        if not last_sync:
+            return True
+        synced_at = datetime.fromisoformat(str(last_sync).replace("Z", "+00:00"))
+        if synced_at.tzinfo is not None:
+            synced_at = synced_at.astimezone(timezone.utc).replace(tzinfo=None)
+        return datetime.utcnow() - synced_at > self.max_age
+
+    async def sync_connection(self, connection: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply provider changes since the stored cursor (shared by concurrent callers)"""
+        connection_id = connection['id']
+        task = self._in_flight.get(connection_id)
+        if task is None:
+            task = asyncio.create_task(self._sync(connection))
+            self._in_flight[connection_id] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(connection_id, None))
+        return await asyncio.shield(task)
+
+    async def _sync(self, connection: Dict[str, Any]) -> Dict[str, Any]:
+        if connection.get('provider') == "razorpay":
+            return await self._sync_statement(connection)
+        return await self._sync_cursor(connection)
+
+    async def _sync_cursor(self, connection: Dict[str, Any]) -> Dict[str, Any]:
+        """Plaid: apply added/modified/removed since the stored cursor, page by page"""
+        added = modified = removed = written = deleted = 0
+        next_cursor = connection.get('sync_cursor')
+        try:
+            async for page in banking_service.sync_plaid_transactions(
+                encrypted_access_token=connection['access_token_encrypted'],
+                cursor=connection.get('sync_cursor')
+            ):
+                if page['restarted']:
+                    # Change counts start over with the replay; written and
+                    # deleted keep counting rows actually touched
+                    added = modified = removed = 0
+                # A modified transaction may have moved to another date (and so
+                # another partition key), so its stored row is replaced rather
+                # than upserted
+                modified_ids = [txn['transaction_id'] for txn in page['modified']]
+                deleted += await banking_transaction_repository.remove(connection['id'], page['removed'] + modified_ids)
+                rows = [self.to_row(connection['id'], txn) for txn in page['added'] + page['modified']]
+                written += await banking_transaction_repository.upsert(rows)
+                added += len(page['added'])
+                modified += len(page['modified'])
+                removed += len(page['removed'])
+                next_cursor = page['next_cursor']
+        except Exception as e:
+            logger.error(f"Transaction sync failed for connection {connection['id']}: {str(e)}")
+            return {"success": False, "error": str(e)}
+
+        # The cursor only advances once every page is stored, so a failed
+        # run is replayed from the same point next time
+        synced_at = datetime.utcnow().isoformat()
+        await banking_connection_repository.update(connection['id'], {
+            "last_sync": synced_at,
+            "sync_cursor": next_cursor
+        })
+        connection['last_sync'] = synced_at
+        connection['sync_cursor'] = next_cursor
+        return {
+            "success": True,
+            "added": added,
+            "modified": modified,
+            "removed": removed,
+            "written": written,
+            "deleted": deleted,
+            "last_sync": synced_at
+        }
+
+    async def _sync_statement(self, connection: Dict[str, Any]) -> Dict[str, Any]:
+        """Razorpay: stream the statement since the last sync and upsert it chunk by chunk"""
+        if connection.get('last_sync'):
+            # Overlap by a day; rows already stored are skipped by the upsert
+            start = datetime.fromisoformat(str(connection['last_sync'])[:10]) - timedelta(days=1)
+        else:
+            start = datetime.utcnow() - timedelta(days=INITIAL_STATEMENT_DAYS)
+        fetched = written = 0
+        chunk = []
+        try:
+            async for txn in banking_service.iter_razorpay_transactions(
+                account_id=connection.get('account_id'),
+                from_date=start.strftime("%Y-%m-%d"),
+                to_date=datetime.utcnow().strftime("%Y-%m-%d")
+            ):
+                chunk.append(self.to_row(connection['id'], txn))
+                if len(chunk) >= UPSERT_CHUNK_SIZE:
+                    written += await banking_transaction_repository.upsert(chunk)
+                    fetched += len(chunk)
+                    chunk = []
+        except Exception as e:
+            logger.error(f"Transaction sync failed for connection {connection['id']}: {str(e)}")
+            return {"success": False, "error": str(e)}
+        written += await banking_transaction_repository.upsert(chunk)
+        fetched += len(chunk)
+
+        synced_at = datetime.utcnow().isoformat()
+        await banking_connection_repository.update(connection['id'], {"last_sync": synced_at})
+        connection['last_sync'] = synced_at
+        return {"success": True, "added": fetched, "written": written, "last_sync": synced_at}
+
+    async def refresh_if_stale(self, connection: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Sync when the local copy is older than BANKING_SYNC_MAX_AGE_SECONDS, else None"""
+        if not self.is_stale(connection):
+            return None
+        return await self.sync_connection(connection)
+
+    async def refresh_all(self, connections: List[Dict[str, Any]], force: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Refresh several connections concurrently; result per connection id.
+
+        Only stale connections are synced unless `force`. Each one gets
+        BANKING_SYNC_TIMEOUT_SECONDS; a sync that runs over keeps going in
+        the background and is reported as failed here, without holding up
+        the others.
+        """
+        async def refresh(connection: Dict[str, Any]) -> Dict[str, Any]:
+            try:
+                result = await asyncio.wait_for(
+                    self.sync_connection(connection) if force else self.refresh_if_stale(connection),
+                    timeout=self.timeout
+                )
+            except asyncio.TimeoutError:
+                return {"success": False, "error": f"Sync timed out after {self.timeout:g}s"}
+            except Exception as e:
+                logger.error(f"Transaction sync failed for connection {connection['id']}: {str(e)}")
+                return {"success": False, "error": str(e)}
+            return result if result is not None else {"success": True, "skipped": True}
+
+        results = await asyncio.gather(*(refresh(connection) for connection in connections))
+        return {connection['id']: result for connection, result in zip(connections, results)}
+
+# Singleton instance
+transaction_sync = TransactionSyncService(
+    max_age_seconds=settings.BANKING_SYNC_MAX_AGE_SECONDS,
+    timeout_seconds=settings.BANKING_SYNC_TIMEOUT_SECONDS
+)
@@ -0,0 +1,242 @@
+"""
+Translation memory: in-process LRU backed by a persistent SQLite store
+Keyed by (normalized source hash, target language, glossary version)
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS translation_memory (
+    source_hash TEXT NOT NULL,
+    target_language TEXT NOT NULL,
+    glossary_version TEXT NOT NULL,
+    source_text TEXT NOT NULL,
+    translated_text TEXT NOT NULL,
+    origin TEXT NOT NULL DEFAULT 'llm',
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (source_hash, target_language, glossary_version)
+);
+"""
+
+# Reviewed translations are never overwritten by machine translations
+UPSERT_SQL = """
+INSERT INTO translation_memory
+    (source_hash, target_language, glossary_version, source_text, translated_text, origin, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (source_hash, target_language, glossary_version) DO UPDATE SET
+    translated_text = excluded.translated_text,
+    origin = excluded.origin,
+    updated_at = excluded.updated_at
+WHERE translation_memory.origin != 'reviewed' OR excluded.origin = 'reviewed'
+"""
+
+def normalize_source(text: str) -> str:
+    """Collapse whitespace so formatting differences share one entry"""
+    return " ".join(text.split())
+
+def source_hash(text: str) -> str:
+    """Stable key of a source string"""
+    return hashlib.sha256(normalize_source(text).encode("utf-8")).hexdigest()
+
+class TranslationMemory:
+    """Two-tier translation memory (LRU in front of SQLite)"""
+
+    def __init__(self, db_path: str, lru_size: int, glossary_version: str):
+        self.db_path = db_path
+        self.lru_size = lru_size
+        self.glossary_version = glossary_version
+        self._lru: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        # Guards the LRU and the connection; lookups also run in worker threads
+        self._lock = threading.RLock()
+
+        self._lru_hits = 0
+        self._store_hits = 0
+        self._misses = 0
+        self._writes = 0
+
+    def _get_connection(self) -> Optional[sqlite3.Connection]:
+        """Open the SQLite store on first use (None if persistence is disabled)"""
+        if not self.db_path:
+            return None
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA_SQL)
+        return self._conn
+
+    def _key(self, text: str, target_language: str, glossary_version: Optional[str] = None) -> Tuple[str, str, str]:
+        return (source_hash(text), target_language, glossary_version or self.glossary_version)
+
+    def _remember(self, key: Tuple[str, str, str], translation: str):
+        self._lru[key] = translation
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get_many(self, texts: List[str], target_language: str) -> Dict[str, str]:
+        """Look up translations; returns {source_text: translation} for hits only"""
+        with self._lock:
+            return self._get_many(texts, target_language)
+
+    def _get_many(self, texts: List[str], target_language: str) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        missing: Dict[Tuple[str, str, str], str] = {}
+
+        for text in dict.fromkeys(texts):
+            key = self._key(text, target_language)
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                found[text] = self._lru[key]
+                self._lru_hits += 1
+            else:
+                missing[key] = text
+
+        if missing:
+            conn = self._get_connection()
+            rows = []
+            if conn is not None:
+                hashes = [key[0] for key in missing]
+                # Stay below SQLite's bound-parameter limit
+                for i in range(0, len(hashes), 500):
+                    batch = hashes[i:i + 500]
+                    rows += conn.execute(
+                        f"SELECT source_hash, translated_text FROM translation_memory "
+                        f"WHERE target_language = ? AND glossary_version = ? "
+                        f"AND source_hash IN ({','.join('?' * len(batch))})",
+                        [target_language, self.glossary_version, *batch]
+                    ).fetchall()
+            for hash_value, translation in rows:
+                key = (hash_value, target_language, self.glossary_version)
+                found[missing.pop(key)] = translation
+                self._remember(key, translation)
+                self._store_hits += 1
+            self._misses += len(missing)
+
+        return found
+
+    def get(self, text: str, target_language: str) -> Optional[str]:
+        """Look up a single translation"""
+        return self.get_many([text], target_language).get(text)
+
+    def put_many(self, translations: Dict[str, str], target_language: str, origin: str = "llm",
+                 glossary_version: Optional[str] = None):
+        """Store {source_text: translation} pairs"""
+        if not translations:
+            return
+        now = datetime.utcnow().isoformat()
+        rows = []
+        with self._lock:
+            for text, translation in translations.items():
+                key = self._key(text, target_language, glossary_version)
+                if key[2] == self.glossary_version:
+                    self._remember(key, translation)
+                rows.append((key[0], key[1], key[2], normalize_source(text), translation, origin, now))
+
+            conn = self._get_connection()
+            if conn is not None:
+                with conn:
+                    conn.executemany(UPSERT_SQL, rows)
+        self._writes += len(rows)
+
+    def put(self, text: str, target_language: str, translation: str, origin: str = "llm"):
+        """Store a single translation"""
+        self.put_many({text: translation}, target_language, origin)
+
+    async def aget_many(self, texts: List[str], target_language: str) -> Dict[str, str]:
+        """get_many without blocking the event loop on the store"""
+        return await asyncio.to_thread(self.get_many, texts, target_language)
+
+    async def aput_many(self, translations: Dict[str, str], target_language: str, origin: str = "llm"):
+        """put_many without blocking the event loop on the store"""
+        await asyncio.to_thread(self.put_many, translations, target_language, origin)
+
+    def import_entries(self, entries: List[Dict[str, Any]], origin: str = "reviewed") -> int:
+        """Bulk-load translations, e.g. reviewed ones exported from another environment.
+
+        Each entry needs ``source_text``, ``target_language`` and
+        ``translated_text``; ``glossary_version`` defaults to the current one.
+        """
+        grouped: Dict[Tuple[str, str], Dict[str, str]] = {}
+        imported = 0
+        for entry in entries:
+            source, language, translated = (
+                entry.get("source_text"), entry.get("target_language"), entry.get("translated_text")
+            )
+            if not source or not language or not translated:
+                continue
+            version = str(entry.get("glossary_version") or self.glossary_version)
+            grouped.setdefault((language, version), {})[source] = translated
+            imported += 1
+
+        for (language, version), translations in grouped.items():
+            self.put_many(translations, language, origin, glossary_version=version)
+        return imported
+
+    def export_entries(self, target_language: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Dump stored translations in the import format"""
+        with self._lock:
+            conn = self._get_connection()
+            if conn is None:
+                return []
+            query = (
+                "SELECT source_text, target_language, translated_text, glossary_version, origin, updated_at "
+                "FROM translation_memory"
+            )
+            params: List[str] = []
+            if target_language:
+                query += " WHERE target_language = ?"
+                params.append(target_language)
+            rows = conn.execute(query + " ORDER BY target_language, source_text", params).fetchall()
+
+        return [
+            {
+                "source_text": row[0],
+                "target_language": row[1],
+                "translated_text": row[2],
+                "glossary_version": row[3],
+                "origin": row[4],
+                "updated_at": row[5]
+            }
+            for row in rows
+        ]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Hit rates per tier and sizes"""
+        lookups = self._lru_hits + self._store_hits + self._misses
+        store_entries = 0
+        with self._lock:
+            conn = self._get_connection()
+            if conn is not None:
+                store_entries = conn.execute("SELECT COUNT(*) FROM translation_memory").fetchone()[0]
+        return {
+            "lookups": lookups,
+            "lru_hits": self._lru_hits,
+            "store_hits": self._store_hits,
+            "misses": self._misses,
+            "hit_rate": (self._lru_hits + self._store_hits) / lookups if lookups else 0.0,
+            "writes": self._writes,
+            "lru_entries": len(self._lru),
+            "store_entries": store_entries,
+            "glossary_version": self.glossary_version
+        }
+
+# Singleton instance
+translation_memory = TranslationMemory(
+    db_path=settings.TRANSLATION_MEMORY_PATH,
+    lru_size=settings.TRANSLATION_MEMORY_LRU_SIZE,
+    glossary_version=settings.TRANSLATION_GLOSSARY_VERSION
+)
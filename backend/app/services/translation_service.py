@@ -1,9 +1,14 @@
 """
 Multilingual translation service
 """
+import asyncio
+import hashlib
+import json
 import logging
 from typing import Dict, Any, Optional, List
 from app.services.llm_service import llm_service
+from app.services.prompt_builder import estimate_tokens
+from app.services.translation_memory import translation_memory
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -13,7 +18,7 @@ class TranslationService:
     
     def __init__(self):
         self.supported_languages = settings.SUPPORTED_LANGUAGES
-        self.translations_cache = {}
+        self.memory = translation_memory
         
         # Static translations for common UI elements
         self.static_translations = {
@@ -186,6 +191,35 @@ class TranslationService:
                 "download": "ডাউনলোড"
             }
         }
+        
+        # Built once: normalized keys and English labels -> translation, per language
+        self.static_index = self._build_static_index()
+        self.language_pack_etags = {
+            language: self._compute_etag(translations)
+            for language, translations in self.static_translations.items()
+        }
+    
+    @staticmethod
+    def _normalize_label(text: str) -> str:
+        return " ".join(text.lower().replace("_", " ").split())
+    
+    @staticmethod
+    def _compute_etag(translations: Dict[str, str]) -> str:
+        payload = json.dumps(translations, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        return '"' + hashlib.sha256(payload).hexdigest()[:32] + '"'
+    
+    def _build_static_index(self) -> Dict[str, Dict[str, str]]:
+        """Map both keys ("health_score") and English labels ("Health Score") to each translation"""
+        en_translations = self.static_translations.get("en", {})
+        index: Dict[str, Dict[str, str]] = {}
+        for language, translations in self.static_translations.items():
+            lookup: Dict[str, str] = {}
+            for key, value in translations.items():
+                lookup[self._normalize_label(key)] = value
+                if key in en_translations:
+                    lookup.setdefault(self._normalize_label(en_translations[key]), value)
+            index[language] = lookup
+        return index
     
     async def translate(self, text: str, target_language: str, use_llm: bool = False) -> Dict[str, Any]:
         """Translate text to target language"""
@@ -211,10 +245,22 @@ class TranslationService:
                         "method": "static"
                     }
             
+            # Reuse earlier (or reviewed) translations
+            remembered = (await self.memory.aget_many([text], target_language)).get(text)
+            if remembered:
+                return {
+                    "success": True,
+                    "translated_text": remembered,
+                    "source_language": "en",
+                    "target_language": target_language,
+                    "method": "memory"
+                }
+            
             # Use LLM for dynamic content
             result = await llm_service.translate_content(text, target_language)
             
             if result.get("success"):
+                await self.memory.aput_many({text: result.get("content", text)}, target_language)
                 return {
                     "success": True,
                     "translated_text": result.get("content", text),
@@ -243,22 +289,110 @@ class TranslationService:
     
     def _get_static_translation(self, text: str, target_language: str) -> Optional[str]:
         """Get static translation if available"""
-        text_lower = text.lower().strip()
+        return self.static_index.get(target_language, {}).get(self._normalize_label(text))
+    
+    def get_static_translations(self, texts: List[str], target_language: str) -> Dict[str, Optional[str]]:
+        """Look up many UI labels at once; unknown labels map to None"""
+        lookup = self.static_index.get(target_language, {})
+        return {text: lookup.get(self._normalize_label(text)) for text in texts}
+    
+    def get_language_pack(self, language: str) -> Optional[Dict[str, Any]]:
+        """All static UI translations for a language with their ETag"""
+        if language not in self.static_translations:
+            return None
+        return {
+            "language": language,
+            "translations": self.static_translations[language],
+            "etag": self.language_pack_etags[language]
+        }
+    
+    def _chunk_segments(self, texts: List[str]) -> List[List[str]]:
+        """Split texts into size-capped batches for one LLM request each"""
+        chunks: List[List[str]] = []
+        current: List[str] = []
+        current_tokens = 0
+        for text in texts:
+            tokens = estimate_tokens(text)
+            if current and (
+                current_tokens + tokens > settings.TRANSLATION_BATCH_MAX_TOKENS
+                or len(current) >= settings.TRANSLATION_BATCH_MAX_SEGMENTS
+            ):
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append(text)
+            current_tokens += tokens
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    async def translate_batch(self, texts: List[str], target_language: str) -> Dict[str, Any]:
+        """Translate many strings with as few LLM calls as possible.
+
+        Strings already in the translation memory are served from it; the
+        remaining unique strings are packed into size-capped numbered batches
+        that are translated concurrently. Any segment that is missing from a response
+        (or whose batch failed) keeps its original text.
+        """
+        if target_language == "en" or target_language not in self.supported_languages:
+            return {"success": True, "translations": list(texts), "fallback_count": 0}
         
-        if target_language in self.static_translations:
-            translations = self.static_translations[target_language]
-            
-            # Direct match
-            if text_lower in translations:
-                return translations[text_lower]
-            
-            # Check English to target
-            en_translations = self.static_translations.get("en", {})
-            for en_key, en_value in en_translations.items():
-                if en_value.lower() == text_lower:
-                    return translations.get(en_key)
+        unique_texts = list(dict.fromkeys(t for t in texts if t and t.strip()))
+        translated: Dict[str, str] = await self.memory.aget_many(unique_texts, target_language)
+        
+        chunks = self._chunk_segments([t for t in unique_texts if t not in translated])
+        results = await asyncio.gather(
+            *[llm_service.translate_segments(chunk, target_language) for chunk in chunks],
+            return_exceptions=True
+        )
+        
+        fallback_count = 0
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, Exception) or not result.get("success"):
+                error = result if isinstance(result, Exception) else result.get("error")
+                logger.warning(f"Batch translation of {len(chunk)} segments failed: {error}")
+                fallback_count += len(chunk)
+                continue
+            new_translations = {
+                source: target for source, target in zip(chunk, result["translations"]) if target
+            }
+            fallback_count += len(chunk) - len(new_translations)
+            translated.update(new_translations)
+            await self.memory.aput_many(new_translations, target_language)
+        
+        return {
+            "success": True,
+            "translations": [translated.get(t, t) for t in texts],
+            "fallback_count": fallback_count,
+            "llm_calls": len(chunks)
+        }
+    
+    async def warm_up(self, texts: List[str], languages: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Pre-translate a fixed set of strings into the translation memory.
+
+        Strings already stored cost nothing, so re-running it is cheap.
+        """
+        languages = [
+            language for language in (languages or self.supported_languages)
+            if language != "en" and language in self.supported_languages
+        ]
+        results = await asyncio.gather(
+            *[self.translate_batch(texts, language) for language in languages],
+            return_exceptions=True
+        )
         
-        return None
+        summary: Dict[str, Any] = {}
+        for language, result in zip(languages, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Translation warm-up for {language} failed: {result}")
+                summary[language] = {"success": False, "error": str(result)}
+                continue
+            summary[language] = {
+                "success": True,
+                "strings": len(texts),
+                "llm_calls": result.get("llm_calls", 0),
+                "fallback_count": result["fallback_count"]
+            }
+        return summary
     
     async def translate_report(self, report_data: Dict[str, Any], target_language: str) -> Dict[str, Any]:
         """Translate entire report to target language"""
@@ -277,23 +411,49 @@ class TranslationService:
                 "recommendations", "insights", "analysis"
             ]
             
-            for field in fields_to_translate:
-                if field in report_data and isinstance(report_data[field], str):
-                    result = await self.translate(report_data[field], target_language, use_llm=True)
-                    if result.get("success"):
-                        translated_report[field] = result.get("translated_text")
+            # Collect every translatable string so the whole report goes out in one batch
+            string_fields = [
+                field for field in fields_to_translate
+                if isinstance(report_data.get(field), str)
+            ]
+            recommendations = report_data.get("recommendations")
+            recommendation_indexes = [
+                i for i, rec in enumerate(recommendations) if isinstance(rec, str)
+            ] if isinstance(recommendations, list) else []
+            
+            # Calculator-generated recommendations stored with the analysis
+            analysis = report_data.get("analysis")
+            analysis_recommendations = analysis.get("recommendations") if isinstance(analysis, dict) else None
+            analysis_indexes = [
+                i for i, rec in enumerate(analysis_recommendations) if isinstance(rec, str)
+            ] if isinstance(analysis_recommendations, list) else []
+            
+            segments = [report_data[field] for field in string_fields]
+            segments += [recommendations[i] for i in recommendation_indexes]
+            segments += [analysis_recommendations[i] for i in analysis_indexes]
+            
+            result = await self.translate_batch(segments, target_language)
+            translations = iter(result["translations"])
+            
+            for field in string_fields:
+                translated_report[field] = next(translations)
             
             # Translate list fields
-            if "recommendations" in report_data and isinstance(report_data["recommendations"], list):
-                translated_recommendations = []
-                for rec in report_data["recommendations"]:
-                    if isinstance(rec, str):
-                        result = await self.translate(rec, target_language, use_llm=True)
-                        translated_recommendations.append(result.get("translated_text", rec))
-                    else:
-                        translated_recommendations.append(rec)
+            if recommendation_indexes:
+                translated_recommendations = list(recommendations)
+                for i in recommendation_indexes:
+                    translated_recommendations[i] = next(translations)
                 translated_report["recommendations"] = translated_recommendations
             
+            if analysis_indexes:
+                translated_analysis_recommendations = list(analysis_recommendations)
+                for i in analysis_indexes:
+                    translated_analysis_recommendations[i] = next(translations)
+                translated_report["analysis"] = {
+                    **analysis,
+                    "recommendations": translated_analysis_recommendations
+                }
+            
             return {
                 "success": True,
                 "translated_report": translated_report,
@@ -0,0 +1,32 @@
+"""
+Translation warm-up: pre-translate the fixed strings the calculator emits
+Run offline with `python -m app.services.translation_warmup`
+"""
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional
+from app.config import settings
+from app.services.financial_calculator import FinancialCalculator
+from app.services.llm_service import llm_service
+from app.services.translation_service import translation_service
+
+logger = logging.getLogger(__name__)
+
+async def warm_up_translations(languages: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Store translations of every risk factor and recommendation in the translation memory"""
+    if not settings.OPENROUTER_API_KEY:
+        logger.info("Skipping translation warm-up: OPENROUTER_API_KEY not configured")
+        return {"success": False, "error": "OPENROUTER_API_KEY not configured"}
+    if not llm_service.is_available():
+        logger.info("Skipping translation warm-up: LLM circuit breakers are open")
+        return {"success": False, "error": "LLM service temporarily unavailable"}
+
+    texts = FinancialCalculator.get_translatable_strings()
+    summary = await translation_service.warm_up(texts, languages)
+    llm_calls = sum(result.get("llm_calls", 0) for result in summary.values())
+    logger.info(f"Translation warm-up finished: {len(texts)} strings, {len(summary)} languages, {llm_calls} LLM calls")
+    return {"success": True, "languages": summary}
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(warm_up_translations())
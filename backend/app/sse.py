@@ -0,0 +1,15 @@
+"""
+Server-Sent Events helpers
+"""
+import json
+from typing import Any, Dict
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no"  # Disable proxy buffering (nginx, Render)
+}
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format a single Server-Sent Event frame"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
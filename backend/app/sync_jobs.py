@@ -0,0 +1,110 @@
+"""
+Webhook-triggered transaction syncs
+Provider webhooks only name a connection; the sync itself runs here, off the
+request, with bursts for the same connection coalesced into one run
+"""
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Set
+from app.config import settings
+from app.repositories import banking_connection_repository
+from app.services.transaction_sync import transaction_sync
+
+logger = logging.getLogger(__name__)
+
+class SyncJobQueue:
+    """Per-connection sync jobs run by a small worker pool.
+
+    A request waits `debounce` seconds before it is queued, and further
+    requests for that connection in the meantime are dropped, so a burst of
+    webhooks becomes one sync. A request that arrives while the connection is
+    syncing schedules exactly one follow-up run. Jobs live in memory only: a
+    job lost at shutdown is picked up by the next webhook or stale read, and
+    the sync cursor only advances once changes are stored.
+    """
+
+    def __init__(self, workers: int, debounce: float):
+        self.workers = workers
+        self.debounce = debounce
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        # connection id -> debounce timer, until the job is picked up
+        self._scheduled: Dict[str, asyncio.TimerHandle] = {}
+        self._running: Set[str] = set()
+        self._rerun: Set[str] = set()
+        self._metrics = {"requested": 0, "coalesced": 0, "completed": 0, "failed": 0}
+
+    def _ensure_workers(self):
+        if not self._tasks or all(task.done() for task in self._tasks):
+            self._queue = asyncio.Queue()
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    def schedule(self, connection_id: str) -> bool:
+        """Request a sync; False when it was folded into one already pending"""
+        self._ensure_workers()
+        self._metrics["requested"] += 1
+        if connection_id in self._scheduled:
+            self._metrics["coalesced"] += 1
+            return False
+        if connection_id in self._running:
+            self._metrics["coalesced"] += 1
+            self._rerun.add(connection_id)
+            return False
+        self._delay(connection_id)
+        return True
+
+    def _delay(self, connection_id: str):
+        self._scheduled[connection_id] = asyncio.get_running_loop().call_later(
+            self.debounce, self._queue.put_nowait, connection_id
+        )
+
+    async def _work(self):
+        while True:
+            connection_id = await self._queue.get()
+            self._scheduled.pop(connection_id, None)
+            self._running.add(connection_id)
+            try:
+                await self._sync(connection_id)
+            except Exception as e:
+                self._metrics["failed"] += 1
+                logger.error(f"Webhook sync failed for connection {connection_id}: {str(e)}")
+            finally:
+                self._running.discard(connection_id)
+                if connection_id in self._rerun:
+                    self._rerun.discard(connection_id)
+                    self._delay(connection_id)
+
+    async def _sync(self, connection_id: str):
+        connection = await banking_connection_repository.get(connection_id)
+        if not connection or connection.get('connection_status') != 'active':
+            return
+        result = await transaction_sync.sync_connection(connection)
+        if result.get('success'):
+            self._metrics["completed"] += 1
+        else:
+            self._metrics["failed"] += 1
+
+    async def close(self):
+        """Stop the workers and drop pending jobs"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # After the workers, so a follow-up one of them just scheduled is dropped too
+        for timer in self._scheduled.values():
+            timer.cancel()
+        self._scheduled.clear()
+        self._rerun.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            **self._metrics,
+            "scheduled": len(self._scheduled),
+            "running": len(self._running)
+        }
+
+# Singleton instance
+sync_jobs = SyncJobQueue(
+    workers=settings.BANKING_SYNC_WORKERS,
+    debounce=settings.BANKING_WEBHOOK_DEBOUNCE_SECONDS
+)
@@ -0,0 +1,181 @@
+"""
+Write-behind persistence for generated results
+Analysis, forecast and report rows are queued with a client-side id and
+inserted in multi-row batches after the response is sent
+"""
+import asyncio
+import logging
+import uuid
+from typing import Dict, Any, List, Optional, Tuple
+from app.config import settings
+from app.data_access import is_transient_error
+
+logger = logging.getLogger(__name__)
+
+class PendingWrite:
+    """A queued row; `id` is usable immediately, `durable()` waits for the insert"""
+
+    def __init__(self, repository, record: Dict[str, Any]):
+        self.repository = repository
+        self.record = record
+        self.id = record['id']
+        self._future = asyncio.get_running_loop().create_future()
+
+    async def durable(self) -> Dict[str, Any]:
+        """Stored row once flushed; raises if the insert ultimately failed"""
+        return await asyncio.shield(self._future)
+
+    def _resolve(self, row: Dict[str, Any]):
+        if not self._future.done():
+            self._future.set_result(row)
+
+    def _fail(self, error: Exception):
+        if not self._future.done():
+            self._future.set_exception(error)
+            # Mark retrieved so writes nobody awaits are not logged as unhandled
+            self._future.exception()
+
+class WriteBehindQueue:
+    """Batches inserts by repository, flushed by size or interval.
+
+    Transient database errors are retried with exponential backoff; other
+    errors retry the batch row by row so one bad record does not drop the
+    rest. Rows still queued at shutdown are flushed by close().
+    """
+
+    RETRY_BACKOFF_SECONDS = 0.2
+
+    def __init__(self, batch_size: int, flush_interval: float, max_retries: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._queue: List[PendingWrite] = []
+        # (table, id) -> queued or in-flight write, for read-your-writes
+        self._pending: Dict[Tuple[str, str], PendingWrite] = {}
+        self._ready: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._metrics = {"queued": 0, "written": 0, "batches": 0, "retries": 0, "failed": 0}
+
+    def _ensure_worker(self):
+        if self._task is None or self._task.done():
+            self._ready = asyncio.Event()
+            self._full = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, repository, record: Dict[str, Any]) -> PendingWrite:
+        """Queue `record` for insertion through `repository.create_many`"""
+        self._ensure_worker()
+        record.setdefault('id', str(uuid.uuid4()))
+        write = PendingWrite(repository, record)
+        self._queue.append(write)
+        self._pending[(repository.table, write.id)] = write
+        self._metrics["queued"] += 1
+        self._ready.set()
+        if len(self._queue) >= self.batch_size:
+            self._full.set()
+        return write
+
+    async def wait_for(self, table: str, record_id: str) -> bool:
+        """Wait for a queued row of `table`; False if none is pending or it failed"""
+        write = self._pending.get((table, record_id))
+        if write is None:
+            return False
+        try:
+            await write.durable()
+            return True
+        except Exception:
+            return False
+
+    async def wait_for_rows(self, table: str, column: str, value: Any):
+        """Wait for queued rows of `table` whose `column` equals `value` (e.g. a business's results)"""
+        writes = [
+            write for (pending_table, _), write in list(self._pending.items())
+            if pending_table == table and write.record.get(column) == value
+        ]
+        if writes:
+            await asyncio.gather(*(write.durable() for write in writes), return_exceptions=True)
+
+    async def _run(self):
+        while not self._closing:
+            await self._ready.wait()
+            if not self._closing and len(self._queue) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush failed: {str(e)}")
+
+    async def flush(self):
+        """Write everything queued so far"""
+        if self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            while self._queue:
+                batch, self._queue = self._queue[:self.batch_size], self._queue[self.batch_size:]
+                if not self._queue:
+                    self._ready.clear()
+                self._full.clear()
+                groups: Dict[int, List[PendingWrite]] = {}
+                for write in batch:
+                    groups.setdefault(id(write.repository), []).append(write)
+                for writes in groups.values():
+                    await self._write(writes)
+
+    async def _write(self, writes: List[PendingWrite]):
+        repository = writes[0].repository
+        for attempt in range(self.max_retries + 1):
+            try:
+                rows = await repository.create_many([write.record for write in writes])
+                break
+            except Exception as e:
+                if is_transient_error(e) and attempt < self.max_retries:
+                    self._metrics["retries"] += 1
+                    await asyncio.sleep(self.RETRY_BACKOFF_SECONDS * 2 ** attempt)
+                    continue
+                if len(writes) > 1 and not is_transient_error(e):
+                    for write in writes:
+                        await self._write([write])
+                    return
+                logger.error(f"Write-behind insert into {repository.table} failed for {len(writes)} row(s): {str(e)}")
+                self._metrics["failed"] += len(writes)
+                for write in writes:
+                    self._pending.pop((repository.table, write.id), None)
+                    write._fail(e)
+                return
+
+        stored = {row.get('id'): row for row in rows}
+        self._metrics["batches"] += 1
+        self._metrics["written"] += len(writes)
+        for write in writes:
+            self._pending.pop((repository.table, write.id), None)
+            write._resolve(stored.get(write.id, write.record))
+
+    async def close(self):
+        """Stop the flusher and write what is still queued"""
+        if self._task is None:
+            return
+        # Let an in-progress batch finish instead of cancelling it mid-insert
+        self._closing = True
+        self._ready.set()
+        self._full.set()
+        await self._task
+        await self.flush()
+        self._task = None
+        self._closing = False
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {**self._metrics, "pending": len(self._queue)}
+
+# Singleton instance
+write_behind = WriteBehindQueue(
+    batch_size=settings.WRITE_BEHIND_BATCH_SIZE,
+    flush_interval=settings.WRITE_BEHIND_FLUSH_INTERVAL,
+    max_retries=settings.WRITE_BEHIND_MAX_RETRIES
+)
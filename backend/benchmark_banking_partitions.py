@@ -0,0 +1,151 @@
+"""
+Banking transactions layout benchmark
+Seeds synthetic transactions into the partitioned banking_transactions table
+and into an unpartitioned copy with the previous B-tree indexes, then times
+the date-range reads both layouts serve.
+Needs DATABASE_URL pointing at a local/scratch Postgres with SCHEMA_SQL applied;
+the seeded business, its transactions and the copy are removed afterwards
+(the empty monthly partitions are kept).
+
+    python benchmark_banking_partitions.py [--rows 1000000] [--connections 20] [--months 24] [--runs 20]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from datetime import date
+from app.data_access import db
+
+HEAP_TABLE = "benchmark_transactions_heap"
+
+def month_start(months_back: int) -> date:
+    today = date.today().replace(day=1)
+    month_index = today.year * 12 + today.month - 1 - months_back
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+async def seed(rows: int, connections: int, months: int) -> str:
+    business = await db.insert('businesses', {
+        "user_id": str(uuid.uuid4()),
+        "business_name": "Benchmark Merchant",
+        "industry": "retail"
+    })
+    for _ in range(connections):
+        await db.insert('banking_connections', {
+            "business_id": business['id'],
+            "provider": "plaid",
+            "connection_status": "active"
+        })
+
+    first_month = month_start(months - 1)
+    await db.fetch(
+        "SELECT create_banking_transactions_partition(month::date) "
+        "FROM generate_series($1::date, CURRENT_DATE, interval '1 month') AS month",
+        first_month
+    )
+    await db.fetch(f"DROP TABLE IF EXISTS {HEAP_TABLE}")
+    await db.fetch(f"CREATE TABLE {HEAP_TABLE} (LIKE banking_transactions INCLUDING DEFAULTS)")
+    await db.fetch(f"ALTER TABLE {HEAP_TABLE} ADD PRIMARY KEY (id), ADD UNIQUE (connection_id, transaction_id)")
+    await db.fetch(f"CREATE INDEX ON {HEAP_TABLE} (connection_id)")
+    await db.fetch(f"CREATE INDEX ON {HEAP_TABLE} (transaction_date)")
+
+    # Rows arrive in date order, round-robin over the connections
+    synthetic = """
+        SELECT gen_random_uuid(), connection.id, 'txn_' || series.n,
+               $2::date + ((series.n::float / $3) * (CURRENT_DATE - $2::date))::int,
+               round((random() * 20000 - 5000)::numeric, 2),
+               'INR', 'Synthetic transaction',
+               (ARRAY['sales', 'payroll', 'rent', 'utilities', 'supplies'])[1 + series.n % 5],
+               CASE WHEN series.n % 3 = 0 THEN 'debit' ELSE 'credit' END
+        FROM generate_series(1, $3) AS series(n)
+        JOIN (SELECT id, row_number() OVER (ORDER BY id) - 1 AS position
+              FROM banking_connections WHERE business_id = $1) AS connection
+          ON connection.position = series.n % $4
+    """
+    columns = "id, connection_id, transaction_id, transaction_date, amount, currency, description, category, transaction_type"
+    for table in ("banking_transactions", HEAP_TABLE):
+        await db.fetch(f"INSERT INTO {table} ({columns}) {synthetic}", business['id'], first_month, rows, connections)
+        await db.fetch(f"VACUUM ANALYZE {table}")
+    return business['id']
+
+async def measure(query: str, args: tuple, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await db.fetch(query, *args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+async def index_sizes() -> dict:
+    rows = await db.fetch("""
+        SELECT 'partitioned' AS layout, coalesce(sum(pg_relation_size(child.indexrelid)), 0) AS bytes, parent.relname AS index
+        FROM pg_index child
+        JOIN pg_inherits ON pg_inherits.inhrelid = child.indexrelid
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        WHERE parent.relname IN ('idx_banking_transactions_date_brin', 'idx_banking_transactions_connection_date')
+        GROUP BY parent.relname
+        UNION ALL
+        SELECT 'heap', pg_relation_size(indexrelid), indexrelid::regclass::text
+        FROM pg_index WHERE indrelid = $1::regclass AND NOT indisunique
+    """, HEAP_TABLE)
+    return {f"{row['layout']} {row['index']}": row['bytes'] for row in rows}
+
+async def main(rows: int, connections: int, months: int, runs: int):
+    await db.connect()
+    if not db.supports_sql:
+        raise SystemExit("This benchmark needs DATABASE_URL (direct Postgres)")
+    print(f"Seeding {rows:,} transactions over {months} months for {connections} connections...")
+    business_id = await seed(rows, connections, months)
+    try:
+        connection_id = (await db.select('banking_connections', 'id', {'business_id': business_id}, limit=1))[0]['id']
+        recent_month = month_start(1)
+        cases = [
+            (
+                "one connection, one month",
+                "SELECT transaction_date, amount, transaction_type, category FROM {table} "
+                "WHERE connection_id = $1 AND transaction_date >= $2 AND transaction_date < $2 + interval '1 month' "
+                "ORDER BY transaction_date DESC",
+                (connection_id, recent_month)
+            ),
+            (
+                "one connection, 90-day total",
+                "SELECT sum(amount) FROM {table} "
+                "WHERE connection_id = $1 AND transaction_date >= CURRENT_DATE - 90",
+                (connection_id,)
+            ),
+            (
+                "all connections, one month by category",
+                "SELECT category, sum(amount) FROM {table} "
+                "WHERE transaction_date >= $1 AND transaction_date < $1 + interval '1 month' GROUP BY category",
+                (recent_month,)
+            ),
+        ]
+        print(f"\n{'query':<42}{'heap ms':>10}{'partitioned ms':>16}")
+        for label, query, args in cases:
+            heap = await measure(query.format(table=HEAP_TABLE), args, runs)
+            partitioned = await measure(query.format(table="banking_transactions"), args, runs)
+            print(f"{label:<42}{heap:>10.2f}{partitioned:>16.2f}")
+
+        plan = await db.fetch(
+            "EXPLAIN SELECT sum(amount) FROM banking_transactions "
+            "WHERE transaction_date >= $1 AND transaction_date < $1 + interval '1 month'",
+            recent_month
+        )
+        scanned = {line for row in plan for line in row['QUERY PLAN'].split() if line.startswith('banking_transactions_y')}
+        print(f"\npartitions scanned for a one-month range: {len(scanned)}")
+        print("\nindex sizes:")
+        for name, size in (await index_sizes()).items():
+            print(f"  {name:<70}{size / 1024 / 1024:>8.2f} MB")
+    finally:
+        await db.fetch(f"DROP TABLE IF EXISTS {HEAP_TABLE}")
+        await db.delete('businesses', {'id': business_id})
+        await db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--connections", type=int, default=20)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.connections, args.months, args.runs))
@@ -0,0 +1,146 @@
+"""
+List-view benchmark
+Compares select('*') with the repository list projections on a seeded dataset,
+then times keyset pages at increasing depth.
+Needs DATABASE_URL (or Supabase credentials); the seeded business is deleted afterwards.
+
+    python benchmark_repositories.py [--documents 50] [--analyses 30] [--runs 20] [--deep-rows 2000]
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+from app.data_access import db
+from app.repositories import document_repository, analysis_repository, forecast_repository, report_repository
+
+def fake_pdf_text(pages: int) -> str:
+    words = ["revenue", "invoice", "GST", "payable", "receivable", "ledger", "balance", "total", "amount", "INR"]
+    return "\n".join(
+        " ".join(random.choice(words) for _ in range(400)) + f" {random.randint(1000, 999999)}"
+        for _ in range(pages)
+    )
+
+def fake_ratios() -> dict:
+    groups = ["profitability", "liquidity", "efficiency", "leverage", "growth"]
+    return {group: {f"ratio_{i}": round(random.uniform(0, 5), 4) for i in range(8)} for group in groups}
+
+async def seed(documents: int, analyses: int) -> str:
+    business = await db.insert('businesses', {
+        "user_id": str(uuid.uuid4()),
+        "business_name": "Benchmark Traders",
+        "industry": "retail"
+    })
+    business_id = business['id']
+    now = datetime.utcnow()
+
+    for i in range(documents):
+        await db.insert('uploaded_documents', {
+            "business_id": business_id,
+            "file_name": f"statement_{i}.pdf",
+            "file_type": ".pdf",
+            "file_size": random.randint(100_000, 2_000_000),
+            "upload_status": "processed",
+            "extracted_data": {"success": True, "text": fake_pdf_text(random.randint(5, 20)), "tables": []},
+            "created_at": (now - timedelta(days=i)).isoformat()
+        })
+    for i in range(analyses):
+        await db.insert('analysis_results', {
+            "business_id": business_id,
+            "analysis_type": "comprehensive",
+            "health_score": random.uniform(30, 90),
+            "credit_score": random.uniform(300, 900),
+            "risk_level": random.choice(["low", "medium", "high"]),
+            "insights": {"summary": fake_pdf_text(1)[:2000]},
+            "recommendations": ["Focus on cost reduction and revenue optimization"],
+            "financial_ratios": fake_ratios(),
+            "benchmarks": {"comparison": fake_ratios()},
+            "created_at": (now - timedelta(days=i)).isoformat()
+        })
+        await db.insert('forecasts', {
+            "business_id": business_id,
+            "forecast_type": "revenue",
+            "forecast_period": "6_months",
+            "forecast_data": {"monthly": [{"month": m, "revenue": random.randint(10**5, 10**6)} for m in range(6)],
+                              "narrative": fake_pdf_text(1)[:3000]},
+            "created_at": (now - timedelta(days=i)).isoformat()
+        })
+    return business_id
+
+async def seed_reports(business_id: str, count: int):
+    """Many small rows for the pagination depth check"""
+    now = datetime.utcnow()
+    for i in range(count):
+        await db.insert('reports', {
+            "business_id": business_id,
+            "report_type": "financial_health",
+            "report_name": f"Report {i}",
+            "created_at": (now - timedelta(minutes=i)).isoformat()
+        })
+
+async def measure(label: str, query, runs: int) -> dict:
+    timings = []
+    rows = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        rows = await query()
+        timings.append((time.perf_counter() - start) * 1000)
+    payload = len(json.dumps({"success": True, "items": rows, "count": len(rows)}, default=str))
+    return {"label": label, "rows": len(rows), "median_ms": statistics.median(timings), "payload_kb": payload / 1024}
+
+async def measure_depth(business_id: str, page_size: int, runs: int):
+    """Time each keyset page while walking the whole report list"""
+    cursor, timings = None, []
+    while True:
+        start = time.perf_counter()
+        for _ in range(runs):
+            page = await report_repository.page_for_business(business_id, page_size, cursor)
+        timings.append((time.perf_counter() - start) * 1000 / runs)
+        if not page["has_more"]:
+            break
+        cursor = page["next_cursor"]
+    print(f"\nkeyset pages of {page_size}: {len(timings)} pages, "
+          f"first {timings[0]:.2f} ms, middle {timings[len(timings) // 2]:.2f} ms, last {timings[-1]:.2f} ms")
+
+async def main(documents: int, analyses: int, runs: int, deep_rows: int):
+    await db.connect()
+    print(f"Backend: {db.backend.name}")
+    business_id = await seed(documents, analyses)
+    try:
+        cases = [
+            ("documents", 'uploaded_documents', document_repository, documents),
+            ("analysis history", 'analysis_results', analysis_repository, 10),
+            ("forecast history", 'forecasts', forecast_repository, 10),
+        ]
+        print(f"{'list view':<18}{'query':<12}{'rows':>6}{'median ms':>12}{'payload KB':>13}")
+        for name, table, repository, limit in cases:
+            async def select_all():
+                return await db.select(table, '*', {'business_id': business_id}, [('created_at', True)], limit)
+
+            async def projected():
+                return (await repository.page_for_business(business_id, limit))["items"]
+
+            before = await measure("select *", select_all, runs)
+            after = await measure("projected", projected, runs)
+            for result in (before, after):
+                print(f"{name:<18}{result['label']:<12}{result['rows']:>6}"
+                      f"{result['median_ms']:>12.2f}{result['payload_kb']:>13.1f}")
+
+        if deep_rows:
+            await seed_reports(business_id, deep_rows)
+            await measure_depth(business_id, 20, runs)
+    finally:
+        await db.delete('businesses', {'id': business_id})
+        await db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--analyses", type=int, default=30)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--deep-rows", type=int, default=2000, help="reports seeded for the pagination depth check")
+    args = parser.parse_args()
+    asyncio.run(main(args.documents, args.analyses, args.runs, args.deep_rows))
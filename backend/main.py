@@ -7,9 +7,11 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from contextlib import asynccontextmanager
 import uvicorn
+import asyncio
 import logging
 
 from app.config import settings
+from app.security import require_admin
 from app.routers import (
     auth_router,
     upload_router,
@@ -18,9 +20,15 @@ from app.routers import (
     reports_router,
     business_router,
     banking_router,
-    insights_router
+    insights_router,
+    translations_router
 )
-from app.database import init_db
+from app.database import init_db, close_db, maintain_banking_partitions
+from app.cache import cache
+from app.write_behind import write_behind
+from app.sync_jobs import sync_jobs
+from app.services.llm_service import llm_service
+from app.services.translation_warmup import warm_up_translations
 
 # Configure logging
 logging.basicConfig(
@@ -35,10 +43,23 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Initializing database...")
     await init_db()
+    warmup_task = None
+    if settings.TRANSLATION_WARMUP_ON_STARTUP:
+        # Runs in the background so startup is not blocked on the LLM
+        warmup_task = asyncio.create_task(warm_up_translations())
+    partition_task = asyncio.create_task(maintain_banking_partitions())
     logger.info("Application started successfully")
     yield
     # Shutdown
     logger.info("Application shutting down...")
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    partition_task.cancel()
+    await sync_jobs.close()
+    # Queued result rows must reach the database before the pool closes
+    await write_behind.close()
+    await close_db()
+    await cache.close()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -68,6 +89,7 @@ app.include_router(reports_router, prefix="/api/reports", tags=["Reports"])
 app.include_router(business_router, prefix="/api/business", tags=["Business"])
 app.include_router(banking_router, prefix="/api/banking", tags=["Banking"])
 app.include_router(insights_router, prefix="/api/insights", tags=["Insights"])
+app.include_router(translations_router, prefix="/api/translations", tags=["Translations"])
 
 @app.get("/")
 async def root():
@@ -88,6 +110,38 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/api/metrics/llm", dependencies=[Depends(require_admin)])
+async def llm_metrics():
+    """Upstream LLM queue depth, wait times and limiter state"""
+    return {
+        "success": True,
+        "metrics": llm_service.get_metrics()
+    }
+
+@app.get("/api/metrics/cache", dependencies=[Depends(require_admin)])
+async def cache_metrics():
+    """Read-through cache hit rates per entity"""
+    return {
+        "success": True,
+        "metrics": cache.get_metrics()
+    }
+
+@app.get("/api/metrics/sync-jobs", dependencies=[Depends(require_admin)])
+async def sync_job_metrics():
+    """Webhook-triggered bank sync queue statistics"""
+    return {
+        "success": True,
+        "metrics": sync_jobs.get_metrics()
+    }
+
+@app.get("/api/metrics/write-behind", dependencies=[Depends(require_admin)])
+async def write_behind_metrics():
+    """Queued, written, retried and failed result inserts"""
+    return {
+        "success": True,
+        "metrics": write_behind.get_metrics()
+    }
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
@@ -0,0 +1,107 @@
+"""
+Mock Plaid server for the transaction sync
+Serves /transactions/sync from an in-memory change log, so the cursor engine
+can be exercised without Plaid credentials. Point the backend at it with
+PLAID_BASE_URL=http://localhost:8001 (any access token is accepted; store one
+with encrypt_sensitive_data on a banking_connections row).
+
+    python mock_plaid_server.py [--port 8001] [--transactions 1200]
+
+Change the data between syncs with:
+    POST /mock/add        {"count": 10}
+    POST /mock/modify     {"transaction_id": "...", "amount": 12.5, "date": "2026-01-31"}
+    POST /mock/remove     {"transaction_id": "..."}
+    POST /mock/mutate-next-page   {"after": 0}  (the next page requested with a cursor, after
+                                  `after` such pages, answers TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION)
+"""
+import argparse
+import random
+from datetime import date, timedelta
+from typing import Dict, Any, List, Optional
+import uvicorn
+from fastapi import FastAPI, Body
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Mock Plaid")
+
+# Each entry is (kind, transaction); a cursor is a position in this log
+change_log: List[tuple] = []
+transactions: Dict[str, Dict[str, Any]] = {}
+state = {"next_id": 0, "mutate_next_page": False, "mutate_after": 0}
+
+def new_transaction() -> Dict[str, Any]:
+    state["next_id"] += 1
+    name = random.choice(["Payroll", "Office rent", "Customer payment", "AWS", "Supplies"])
+    return {
+        "transaction_id": f"mock_txn_{state['next_id']}",
+        "account_id": "mock_account",
+        "date": str(date.today() - timedelta(days=random.randint(0, 365))),
+        "amount": round(random.uniform(-5000, 5000), 2),
+        "iso_currency_code": "USD",
+        "unofficial_currency_code": None,
+        "name": name,
+        "category": [random.choice(["Transfer", "Payment", "Service", "Shops"])],
+        "merchant_name": name
+    }
+
+def add(count: int):
+    for _ in range(count):
+        txn = new_transaction()
+        transactions[txn["transaction_id"]] = txn
+        change_log.append(("added", txn))
+
+@app.post("/transactions/sync")
+async def transactions_sync(payload: Dict[str, Any] = Body(...)):
+    if state["mutate_next_page"] and payload.get("cursor"):
+        if state["mutate_after"] > 0:
+            state["mutate_after"] -= 1
+        else:
+            state["mutate_next_page"] = False
+            return JSONResponse(status_code=400, content={
+                "error_type": "TRANSACTIONS_ERROR",
+                "error_code": "TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION"
+            })
+    position = int(payload.get("cursor") or 0)
+    count = min(int(payload.get("count", 100)), 500)
+    page = change_log[position:position + count]
+    next_position = position + len(page)
+    return {
+        "added": [txn for kind, txn in page if kind == "added"],
+        "modified": [txn for kind, txn in page if kind == "modified"],
+        "removed": [{"transaction_id": txn["transaction_id"]} for kind, txn in page if kind == "removed"],
+        "next_cursor": str(next_position),
+        "has_more": next_position < len(change_log)
+    }
+
+@app.post("/mock/add")
+async def mock_add(payload: Dict[str, Any] = Body(...)):
+    add(int(payload.get("count", 1)))
+    return {"transactions": len(transactions), "changes": len(change_log)}
+
+@app.post("/mock/modify")
+async def mock_modify(payload: Dict[str, Any] = Body(...)):
+    txn = dict(transactions[payload["transaction_id"]])
+    txn.update({key: value for key, value in payload.items() if key in ("amount", "date", "name")})
+    transactions[txn["transaction_id"]] = txn
+    change_log.append(("modified", txn))
+    return txn
+
+@app.post("/mock/remove")
+async def mock_remove(payload: Dict[str, Any] = Body(...)):
+    txn = transactions.pop(payload["transaction_id"])
+    change_log.append(("removed", txn))
+    return {"transactions": len(transactions)}
+
+@app.post("/mock/mutate-next-page")
+async def mock_mutate_next_page(payload: Optional[Dict[str, Any]] = Body(None)):
+    state["mutate_next_page"] = True
+    state["mutate_after"] = int((payload or {}).get("after", 0))
+    return {"armed": True, "after": state["mutate_after"]}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--transactions", type=int, default=1200)
+    args = parser.parse_args()
+    add(args.transactions)
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
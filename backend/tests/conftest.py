@@ -0,0 +1,85 @@
+"""
+Shared fixtures for tests against a throwaway Postgres
+Set TEST_DATABASE_URL to any Postgres you can create schemas in, e.g.
+
+    TEST_DATABASE_URL=postgresql://postgres@localhost/postgres python -m pytest
+
+Each run applies SCHEMA_SQL in a fresh schema and drops it afterwards;
+database tests are skipped when the variable is unset.
+"""
+import asyncio
+import os
+import uuid
+from urllib.parse import urlsplit, urlunsplit
+import pytest
+import pytest_asyncio
+from app.config import settings
+from app.data_access import db
+from app.database import SCHEMA_SQL
+
+EXTENSION_SQL = 'CREATE EXTENSION IF NOT EXISTS "uuid-ossp";'
+
+def _with_search_path(dsn: str, schema: str) -> str:
+    """asyncpg passes unknown DSN query parameters on as server settings"""
+    parts = urlsplit(dsn)
+    query = f"{parts.query}&" if parts.query else ""
+    return urlunsplit(parts._replace(query=f"{query}search_path={schema}%2Cpublic"))
+
+async def _create_schema(dsn: str, schema: str):
+    import asyncpg
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.execute(f'CREATE SCHEMA "{schema}"')
+        await conn.execute(f'SET search_path TO "{schema}", public')
+        try:
+            await conn.execute(EXTENSION_SQL)
+        except Exception:
+            # uuid-ossp is not installed everywhere; gen_random_uuid() is built in (PG 13+)
+            await conn.execute("CREATE FUNCTION uuid_generate_v4() RETURNS uuid AS 'SELECT gen_random_uuid()' LANGUAGE sql")
+        await conn.execute(SCHEMA_SQL.replace(EXTENSION_SQL, ""))
+    finally:
+        await conn.close()
+
+async def _drop_schema(dsn: str, schema: str):
+    import asyncpg
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.execute(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE')
+    finally:
+        await conn.close()
+
+@pytest.fixture(scope="session")
+def database_url():
+    """DSN of a fresh schema with SCHEMA_SQL applied"""
+    dsn = os.getenv("TEST_DATABASE_URL")
+    if not dsn:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    schema = f"sfc_test_{uuid.uuid4().hex[:8]}"
+    asyncio.run(_create_schema(dsn, schema))
+    try:
+        yield _with_search_path(dsn, schema)
+    finally:
+        asyncio.run(_drop_schema(dsn, schema))
+
+@pytest_asyncio.fixture
+async def database(database_url, monkeypatch):
+    """The application's `db`, connected to the test schema for one test"""
+    monkeypatch.setattr(settings, "DATABASE_URL", database_url)
+    db.backend = None
+    await db.connect()
+    try:
+        yield db
+    finally:
+        await db.close()
+        db.backend = None
+
+@pytest_asyncio.fixture
+async def business(database):
+    """A business row, deleted (with everything cascading from it) afterwards"""
+    row = await database.insert('businesses', {
+        "user_id": str(uuid.uuid4()),
+        "business_name": "Test Traders",
+        "industry": "retail"
+    })
+    yield row
+    await database.delete('businesses', {'id': row['id']})
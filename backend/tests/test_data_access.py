@@ -0,0 +1,131 @@
+"""
+asyncpg data-access layer against a throwaway Postgres (see conftest.py)
+"""
+import pytest
+from app.repositories import analysis_repository, banking_transaction_repository
+
+pytestmark = pytest.mark.asyncio
+
+async def test_codecs_round_trip(database, business):
+    row = await database.insert('analysis_results', {
+        "business_id": business['id'],
+        "analysis_type": "financial_health",
+        "health_score": 72.5,
+        "financial_ratios": {"liquidity": {"current_ratio": 1.8}, "flags": ["ok"]},
+        "created_at": "2026-03-01T10:15:00"
+    })
+    stored = await database.select_one('analysis_results', "*", {'id': row['id']})
+
+    # uuid -> str, jsonb -> dict, numeric -> float, timestamp -> ISO string
+    assert isinstance(stored['id'], str) and stored['business_id'] == business['id']
+    assert stored['financial_ratios'] == {"liquidity": {"current_ratio": 1.8}, "flags": ["ok"]}
+    assert stored['health_score'] == 72.5 and isinstance(stored['health_score'], float)
+    assert stored['created_at'] == "2026-03-01T10:15:00"
+
+    period = await database.insert('financial_data', {
+        "business_id": business['id'],
+        "period_start": "2026-01-01",
+        "period_end": "2026-03-31",
+        "total_revenue": 1250000.75
+    })
+    assert period['period_end'] == "2026-03-31"
+    assert period['total_revenue'] == 1250000.75
+
+async def test_select_filters_order_and_limit(database, business):
+    for score, risk in [(40, "high"), (65, "medium"), (80, "low"), (90, None)]:
+        await database.insert('analysis_results', {
+            "business_id": business['id'],
+            "analysis_type": "financial_health",
+            "health_score": score,
+            "risk_level": risk
+        })
+
+    rows = await database.select(
+        'analysis_results',
+        "health_score, risk_level",
+        [('business_id', 'eq', business['id']), ('health_score', 'gte', 65)],
+        [('health_score', True)]
+    )
+    assert [row['health_score'] for row in rows] == [90, 80, 65]
+
+    rows = await database.select(
+        'analysis_results', "risk_level",
+        [('business_id', 'eq', business['id']), ('risk_level', 'in', ["high", "low"])],
+        [('health_score', False)]
+    )
+    assert [row['risk_level'] for row in rows] == ["high", "low"]
+
+    rows = await database.select('analysis_results', "health_score", [
+        ('business_id', 'eq', business['id']), ('risk_level', 'is', None)
+    ])
+    assert [row['health_score'] for row in rows] == [90]
+
+    top = await database.select('analysis_results', "health_score", {'business_id': business['id']}, [('health_score', True)], 2)
+    assert len(top) == 2
+
+async def test_insert_many_groups_column_sets(database, business):
+    rows = await database.insert_many('analysis_results', [
+        {"business_id": business['id'], "analysis_type": "a", "health_score": 10},
+        {"business_id": business['id'], "analysis_type": "b"},
+        {"business_id": business['id'], "analysis_type": "c", "health_score": 30}
+    ])
+    assert sorted(row['analysis_type'] for row in rows) == ["a", "b", "c"]
+    assert all(row['id'] for row in rows)
+
+async def test_upsert_many_writes_only_changes(database, business):
+    connection = await database.insert('banking_connections', {
+        "business_id": business['id'],
+        "provider": "plaid",
+        "connection_status": "active"
+    })
+    rows = [
+        {
+            "connection_id": connection['id'],
+            "transaction_id": f"txn_{i}",
+            "transaction_date": f"2026-02-{i % 28 + 1:02d}",
+            "amount": float(i),
+            "transaction_type": "debit"
+        }
+        for i in range(1200)  # more than one chunk
+    ]
+
+    assert await banking_transaction_repository.upsert(rows) == 1200
+    assert await banking_transaction_repository.upsert(rows) == 0
+
+    rows[5] = {**rows[5], "amount": 999.0}
+    # Later duplicates of a key win
+    changed = await banking_transaction_repository.upsert(rows + [{**rows[6], "amount": 5.0}])
+    assert changed == 2
+
+    stored = await database.select('banking_transactions', "transaction_id, amount", [
+        ('connection_id', 'eq', connection['id']),
+        ('transaction_id', 'in', ["txn_5", "txn_6"])
+    ], [('transaction_id', False)])
+    assert [row['amount'] for row in stored] == [999.0, 5.0]
+    count = await database.fetch("SELECT count(*) AS n FROM banking_transactions WHERE connection_id = $1", connection['id'])
+    assert count[0]['n'] == 1200
+
+async def test_keyset_pages_cover_every_row_once(database, business):
+    # Shared timestamps force the id tie-breaker
+    await database.insert_many('analysis_results', [
+        {
+            "business_id": business['id'],
+            "analysis_type": "financial_health",
+            "created_at": f"2026-04-0{1 + i // 3}T09:00:00"
+        }
+        for i in range(8)
+    ])
+
+    seen, cursor = [], None
+    while True:
+        page = await analysis_repository.page({'business_id': business['id']}, 3, cursor)
+        seen.extend(page['items'])
+        if not page['has_more']:
+            assert page['next_cursor'] is None
+            break
+        cursor = page['next_cursor']
+
+    assert len(seen) == 8
+    assert len({row['id'] for row in seen}) == 8
+    keys = [(row['created_at'], row['id']) for row in seen]
+    assert keys == sorted(keys, reverse=True)
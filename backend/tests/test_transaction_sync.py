@@ -0,0 +1,133 @@
+"""
+Cursor-based Plaid sync against mock_plaid_server.py and a throwaway Postgres
+"""
+import socket
+import threading
+import time
+import httpx
+import pytest
+import pytest_asyncio
+import uvicorn
+import mock_plaid_server
+from app.security import encrypt_sensitive_data
+from app.services.banking_service import banking_service
+from app.services.transaction_sync import transaction_sync
+
+pytestmark = pytest.mark.asyncio
+
+@pytest.fixture
+def mock_plaid(monkeypatch):
+    """Base URL of a fresh mock Plaid server; banking_service points at it"""
+    mock_plaid_server.change_log.clear()
+    mock_plaid_server.transactions.clear()
+    mock_plaid_server.state.update({"next_id": 0, "mutate_next_page": False, "mutate_after": 0})
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(mock_plaid_server.app, host="127.0.0.1", port=port, loop="asyncio", log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            pytest.fail("mock Plaid server did not start")
+        time.sleep(0.02)
+
+    base_url = f"http://127.0.0.1:{port}"
+    monkeypatch.setattr(banking_service, "plaid_base_url", base_url)
+    yield base_url
+    server.should_exit = True
+    thread.join(timeout=10)
+
+@pytest_asyncio.fixture
+async def connection(database, business):
+    return await database.insert('banking_connections', {
+        "business_id": business['id'],
+        "provider": "plaid",
+        "item_id": "mock_item",
+        "connection_status": "active",
+        "access_token_encrypted": encrypt_sensitive_data("access-sandbox-mock")
+    })
+
+async def stored_transactions(database, connection_id):
+    rows = await database.select(
+        'banking_transactions',
+        "transaction_id, transaction_date, amount, currency, account_id, merchant",
+        {'connection_id': connection_id}
+    )
+    return {row['transaction_id']: row for row in rows}
+
+async def stored_cursor(database, connection_id):
+    row = await database.select_one('banking_connections', "sync_cursor, last_sync", {'id': connection_id})
+    return row['sync_cursor']
+
+async def test_cursor_sync_applies_each_change_once(database, connection, mock_plaid):
+    async with httpx.AsyncClient(base_url=mock_plaid) as client:
+        await client.post("/mock/add", json={"count": 1200})  # three /transactions/sync pages
+
+        # Initial sync: full history, cursor persisted
+        result = await transaction_sync.sync_connection(connection)
+        assert result['success'] and result['added'] == 1200 and result['written'] == 1200
+        stored = await stored_transactions(database, connection['id'])
+        assert len(stored) == 1200
+        assert {row['currency'] for row in stored.values()} == {"USD"}
+        assert {row['account_id'] for row in stored.values()} == {"mock_account"}
+        assert all(row['merchant'] for row in stored.values())
+        assert await stored_cursor(database, connection['id']) == "1200"
+
+        # Resume from the stored cursor: nothing new, nothing rewritten
+        result = await transaction_sync.sync_connection(connection)
+        assert (result['added'], result['modified'], result['removed'], result['written']) == (0, 0, 0, 0)
+
+        # Deltas: a modified transaction moves date, one is removed, two are added
+        await client.post("/mock/modify", json={"transaction_id": "mock_txn_5", "amount": 12.5, "date": "2025-12-31"})
+        await client.post("/mock/remove", json={"transaction_id": "mock_txn_6"})
+        await client.post("/mock/add", json={"count": 2})
+
+        # A fresh dict, as a later request would load it, resumes from the database cursor
+        reloaded = await database.select_one('banking_connections', "*", {'id': connection['id']})
+        result = await transaction_sync.sync_connection(reloaded)
+        assert (result['added'], result['modified'], result['removed']) == (2, 1, 1)
+
+        stored = await stored_transactions(database, connection['id'])
+        assert len(stored) == 1201
+        assert "mock_txn_6" not in stored
+        assert stored["mock_txn_5"]['transaction_date'] == "2025-12-31"
+        assert stored["mock_txn_5"]['amount'] == 12.5
+        assert {"mock_txn_1201", "mock_txn_1202"} <= set(stored)
+        assert await stored_cursor(database, connection['id']) == "1204"
+
+        # A mutation on the second page, after the first was applied, restarts the
+        # run from the stored cursor: page one is replayed and counted once
+        await client.post("/mock/modify", json={"transaction_id": "mock_txn_7", "amount": 99.0})
+        await client.post("/mock/add", json={"count": 600})
+        await client.post("/mock/mutate-next-page", json={"after": 1})
+        result = await transaction_sync.sync_connection(reloaded)
+        assert mock_plaid_server.state["mutate_next_page"] is False  # the restart happened
+        assert result['success']
+        assert (result['added'], result['modified'], result['removed']) == (600, 1, 0)
+        # Replayed adds are unchanged rows, so only the modified row is written again
+        assert result['written'] == 500 + 1 + 101
+
+        stored = await stored_transactions(database, connection['id'])
+        assert len(stored) == 1801
+        assert stored["mock_txn_7"]['amount'] == 99.0
+        assert await stored_cursor(database, connection['id']) == "1805"
+
+    duplicates = await database.fetch(
+        "SELECT transaction_id FROM banking_transactions WHERE connection_id = $1 "
+        "GROUP BY transaction_id HAVING count(*) > 1",
+        connection['id']
+    )
+    assert duplicates == []
+
+async def test_failed_sync_keeps_the_cursor(database, connection, mock_plaid, monkeypatch):
+    async with httpx.AsyncClient(base_url=mock_plaid) as client:
+        await client.post("/mock/add", json={"count": 10})
+    assert (await transaction_sync.sync_connection(connection))['success']
+
+    monkeypatch.setattr(banking_service, "plaid_base_url", mock_plaid + "/missing")
+    result = await transaction_sync.sync_connection(connection)
+    assert not result['success']
+    assert await stored_cursor(database, connection['id']) == "10"